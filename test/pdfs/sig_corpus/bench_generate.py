@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""Microbenchmarks for the building blocks of generate.py.
+
+Every benchmark calls one generator function on synthetic input, at sizes
+from tiny to very large: megabytes of page text, documents with hundreds
+of thousands of objects, files with thousands of startxref markers or a
+long tail after the last one. Results are written as JSON and can be
+compared against an earlier run, exiting with status 1 when a median
+regresses by more than a threshold:
+
+    python3 test/pdfs/sig_corpus/bench_generate.py --output before.json
+    # ...change generate.py...
+    python3 test/pdfs/sig_corpus/bench_generate.py --baseline before.json
+
+No checkout and no signer are needed: nothing is signed.
+"""
+
+import argparse
+import datetime
+import fnmatch
+import gc
+import hashlib
+import json
+import math
+import platform
+import sys
+import time
+from pathlib import Path
+
+CORPUS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(CORPUS_DIR))
+
+import generate  # noqa: E402
+
+# Bumped whenever the meaning of a field or a benchmark's input changes,
+# so that results are only compared with results of the same format.
+FORMAT = 1
+
+SIZES = ["tiny", "small", "large", "huge"]
+DEFAULT_SIZES = ["tiny", "small", "large"]
+
+TEXT_BYTES = {"tiny": 1 << 10, "small": 64 << 10, "large": 4 << 20, "huge": 64 << 20}
+FILE_BYTES = {"tiny": 16 << 10, "small": 1 << 20, "large": 64 << 20, "huge": 512 << 20}
+BUILD_SCALES = {
+    "tiny": "",
+    "small": "pages=32,objects=1000",
+    "large": "pages=500,objects=20000",
+    "huge": "pages=5000,objects=200000",
+}
+XREF_SECTIONS = {"tiny": 1, "small": 100, "large": 10_000, "huge": 100_000}
+
+# Each sample of a benchmark without a reset runs it this long at least,
+# so that microsecond calls are not lost in timer noise.
+MIN_SAMPLE_S = 0.02
+MAX_NUMBER = 1_000_000
+
+# Benchmarks whose baseline p50 is below this many milliseconds are still
+# compared, but never count as regressions: at a few microseconds per call,
+# cache and frequency effects alone move the median by a third between
+# identical runs.
+MIN_GATED_MS = 0.01
+
+# Words for synthetic page text: plain words, PDF string delimiters and
+# every character _escape_pdf_string replaces.
+_WORDS = (
+    "the signature covers every byte of the document except /Contents "
+    "(ByteRange) C:\\corpus\\signed.pdf leaf <- pdf-sign-ca -> verified "
+    "\u2014 \u2013 \u2018quoted\u2019 \u201cquoted\u201d \u2026 \u2192 "
+    "\u2190 \u00d7 \u2713 \u2717 caf\u00e9"
+).split(" ")
+
+
+def _page_text(length):
+    """Deterministic page text of ``length`` characters, in paragraphs of
+    words longer and shorter than a line."""
+    words = []
+    for i in range(4096):
+        words.append(_WORDS[(i * 7919) % len(_WORDS)])
+        if i % 97 == 96:
+            words.append("\n\n")
+    block = " ".join(words).replace(" \n\n ", "\n\n")
+    return (block * -(-length // len(block)))[:length]
+
+
+def _placeholder_file(length):
+    """A ``length``-byte file with a ByteRange placeholder and an 8 KB
+    /Contents hex string in the middle, as (pdf, byte_range_at,
+    hex_start, hex_end)."""
+    pdf = bytearray(b" " * length)
+    middle = max(0, length // 2 - 8192)
+    byte_range_at = middle
+    pdf[middle:middle + len(generate.BYTE_RANGE_PLACEHOLDER)] = (
+        generate.BYTE_RANGE_PLACEHOLDER
+    )
+    hex_start = byte_range_at + 64
+    return pdf, byte_range_at, hex_start, hex_start + 2 * 4096
+
+
+def _xref_sections(count, tail=0):
+    """A file of ``count`` incremental sections, each with its own xref
+    table and startxref marker, followed by ``tail`` bytes of whitespace."""
+    out = bytearray(b"%PDF-1.7\n")
+    for num in range(1, count + 1):
+        offset = len(out)
+        out += b"%d 0 obj\n<< >>\nendobj\n" % num
+        xref = len(out)
+        out += b"xref\n%d 1\n%010d 00000 n \n" % (num, offset)
+        out += b"trailer\n<< /Size %d >>\nstartxref\n%d\n%%%%EOF\n" % (num + 1, xref)
+    return bytes(out) + generate.TAIL_WHITESPACE * (tail // 6)
+
+
+# Every benchmark takes a size and returns (input_bytes, run, reset):
+# ``run`` is timed, ``reset``, if any, restores its input before every
+# sample and is not.
+
+
+def bench_wrap_lines(size):
+    text = _page_text(TEXT_BYTES[size])
+    return len(text), lambda: generate._wrap_lines(text), None
+
+
+def bench_escape_pdf_string(size):
+    text = _page_text(TEXT_BYTES[size])
+    return len(text), lambda: generate._escape_pdf_string(text), None
+
+
+def bench_content_stream_for(size):
+    text = _page_text(TEXT_BYTES[size])
+    return len(text), lambda: generate._content_stream_for(text), None
+
+
+def _bench_build(size, **layout):
+    scale = generate.parse_scale(BUILD_SCALES[size])
+    text = _page_text(TEXT_BYTES["tiny"])
+
+    def run():
+        return generate.PdfBuilder(text, scale=scale, **layout).build()
+
+    writer, _ = run()
+    return writer.pos, run, None
+
+
+def bench_build(size):
+    return _bench_build(size)
+
+
+def bench_build_xref_streams(size):
+    return _bench_build(size, xref_streams=True)
+
+
+def bench_patch_byte_range(size):
+    pdf, byte_range_at, hex_start, hex_end = _placeholder_file(FILE_BYTES[size])
+    byte_range = [0, hex_start - 1, hex_end + 1, len(pdf) - hex_end - 1]
+    end = byte_range_at + len(generate.BYTE_RANGE_PLACEHOLDER)
+
+    def reset():
+        pdf[byte_range_at:end] = generate.BYTE_RANGE_PLACEHOLDER
+
+    return (
+        len(pdf),
+        lambda: generate._patch_byte_range(pdf, byte_range_at, byte_range),
+        reset,
+    )
+
+
+def bench_splice_pkcs7(size):
+    pdf, _, hex_start, hex_end = _placeholder_file(FILE_BYTES[size])
+    der = hashlib.sha256(b"pkcs7").digest() * 64
+    return (
+        len(pdf),
+        lambda: generate._splice_pkcs7(pdf, hex_start, hex_end, der),
+        None,
+    )
+
+
+def bench_find_startxref(size):
+    pdf = _xref_sections(XREF_SECTIONS[size])
+    return len(pdf), lambda: generate._find_startxref(pdf), None
+
+
+def bench_find_startxref_tail(size):
+    pdf = _xref_sections(1, tail=FILE_BYTES[size])
+    return len(pdf), lambda: generate._find_startxref(pdf), None
+
+
+BENCHMARKS = {
+    "wrap_lines": ("_wrap_lines", bench_wrap_lines),
+    "escape_pdf_string": ("_escape_pdf_string", bench_escape_pdf_string),
+    "content_stream_for": ("_content_stream_for", bench_content_stream_for),
+    "build": ("PdfBuilder.build", bench_build),
+    "build_xref_streams": ("PdfBuilder.build", bench_build_xref_streams),
+    "patch_byte_range": ("_patch_byte_range", bench_patch_byte_range),
+    "splice_pkcs7": ("_splice_pkcs7", bench_splice_pkcs7),
+    "find_startxref": ("_find_startxref", bench_find_startxref),
+    "find_startxref_tail": ("_find_startxref", bench_find_startxref_tail),
+}
+
+
+def percentiles(samples):
+    """Nearest-rank percentiles, like bench_signatures.mjs."""
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+    return {
+        "count": len(ordered),
+        "p50": rank(0.5),
+        "p95": rank(0.95),
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def _calls_per_sample(run):
+    """Calls of ``run`` that take MIN_SAMPLE_S, found like timeit's
+    autorange by timing growing batches, so a slow first call does not
+    shrink every sample."""
+    number = 1
+    while number < MAX_NUMBER:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_S:
+            break
+        estimate = int(number * MIN_SAMPLE_S * 1.2 / (elapsed or 1e-9))
+        number = min(MAX_NUMBER, max(number * 2, estimate))
+    return number
+
+
+def measure(run, reset, iterations):
+    """Per-call milliseconds of ``iterations`` samples of ``run``, after
+    one warm-up call, and the number of calls in each sample."""
+    if reset:
+        reset()
+    run()
+    number = 1
+    if not reset:
+        number = _calls_per_sample(run)
+    samples = []
+    # Like timeit, keep the cyclic GC out of the timings. Collecting before
+    # every sample instead would also evict the caches a microsecond call
+    # runs from.
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            if reset:
+                reset()
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            samples.append((time.perf_counter() - start) * 1000 / number)
+    finally:
+        gc.enable()
+    return samples, number
+
+
+def compare_with_baseline(results, baseline_path, threshold):
+    """Compare p50s with an earlier run and return the number of benchmarks
+    slower by more than ``threshold``."""
+    baseline = json.loads(Path(baseline_path).read_text())
+    if baseline.get("format") != FORMAT:
+        raise SystemExit(
+            f"{baseline_path}: format {baseline.get('format')}, expected {FORMAT}"
+        )
+    previous = {entry["name"]: entry for entry in baseline["benchmarks"]}
+    regressions = 0
+    for entry in results["benchmarks"]:
+        old = previous.get(entry["name"])
+        if not old or old["input_bytes"] != entry["input_bytes"]:
+            continue
+        before, after = old["ms"]["p50"], entry["ms"]["p50"]
+        ratio = after / before if before else 1.0
+        if before < MIN_GATED_MS:
+            label = "too short"
+        elif ratio > threshold:
+            label = "REGRESSION"
+            regressions += 1
+        else:
+            label = "ok"
+        # The JSON result may be going to stdout.
+        print(
+            f"{label}  {entry['name']}  p50: "
+            f"{before:.4f} -> {after:.4f} ms (x{ratio:.2f})",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+def _sizes(text):
+    sizes = text.split(",")
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown size {', '.join(sorted(unknown))}; expected {', '.join(SIZES)}"
+        )
+    return [size for size in SIZES if size in sizes]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes",
+        type=_sizes,
+        default=DEFAULT_SIZES,
+        help=(
+            f"Comma-separated input sizes among {', '.join(SIZES)} "
+            f"(default: {','.join(DEFAULT_SIZES)})."
+        ),
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        metavar="GLOB",
+        help=(
+            "Only run benchmarks whose name (e.g. wrap_lines/large) matches "
+            "this shell-style glob. May be repeated."
+        ),
+    )
+    parser.add_argument(
+        "--iterations",
+        "-n",
+        type=int,
+        default=10,
+        help="Samples per benchmark (default: 10).",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=Path,
+        default=None,
+        help="Where to write the JSON result (default: stdout).",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="Earlier JSON result to compare against.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help=(
+            "p50 ratio over --baseline that counts as a regression (exit "
+            "code 1) (default: 1.25)."
+        ),
+    )
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="Print the names of the selected benchmarks and exit.",
+    )
+    args = parser.parse_args()
+    if args.iterations < 1:
+        parser.error("--iterations must be a positive integer")
+
+    selected = [
+        (f"{name}/{size}", function, bench, size)
+        for name, (function, bench) in BENCHMARKS.items()
+        for size in args.sizes
+        if not args.only
+        or any(fnmatch.fnmatchcase(f"{name}/{size}", glob) for glob in args.only)
+    ]
+    if not selected:
+        raise SystemExit("No benchmark selected")
+    if args.list:
+        print("\n".join(name for name, _, _, _ in selected))
+        return
+
+    results = {
+        "format": FORMAT,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": f"{sys.platform} {platform.machine()}",
+        "generator": hashlib.sha256(Path(generate.__file__).read_bytes()).hexdigest(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "iterations": args.iterations,
+        "benchmarks": [],
+    }
+    for name, function, bench, size in selected:
+        input_bytes, run, reset = bench(size)
+        samples, number = measure(run, reset, args.iterations)
+        entry = {
+            "name": name,
+            "function": function,
+            "size": size,
+            "input_bytes": input_bytes,
+            "number": number,
+            "ms": percentiles(samples),
+        }
+        results["benchmarks"].append(entry)
+        # Release the input before building the next one.
+        del run, reset
+        print(
+            f"{name}: {input_bytes} bytes, p50 {entry['ms']['p50']:.4f} ms",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        args.output.write_text(output)
+    else:
+        sys.stdout.write(output)
+
+    if args.baseline and compare_with_baseline(
+        results, args.baseline, args.threshold
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+/* Copyright 2026 Mozilla Foundation
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+// Benchmarks how fast pdf.js extracts and serves digital signatures for the
+// files produced by generate.py. Every file is loaded through the public API
+// under Node, over a range transport that counts the requests pdf.js makes,
+// and the signatures getter and `getSignatureData` are timed.
+//
+// Run `gulp generic-legacy` first, then from the pdf.js root:
+//
+//   node test/pdfs/sig_corpus/bench_signatures.mjs --output bench.json \
+//     test/pdfs/sig_corpus
+
+import fs from "fs";
+import os from "os";
+import { parseArgs } from "node:util";
+import path from "path";
+import { pathToFileURL } from "url";
+
+const __dirname = import.meta.dirname;
+
+const DEFAULT_PDFJS = path.join(
+  __dirname,
+  "../../../build/generic-legacy/build/pdf.mjs"
+);
+
+function parseOptions() {
+  const { values, positionals } = parseArgs({
+    allowPositionals: true,
+    options: {
+      baseline: { type: "string", default: "" },
+      help: { type: "boolean", short: "h", default: false },
+      iterations: { type: "string", short: "n", default: "10" },
+      output: { type: "string", short: "o", default: "" },
+      pdfjs: { type: "string", default: DEFAULT_PDFJS },
+      rangeChunkSize: { type: "string", default: "65536" },
+      threshold: { type: "string", default: "1.25" },
+    },
+  });
+
+  if (values.help || positionals.length === 0) {
+    console.log(
+      "Usage: bench_signatures.mjs [options] DIR_OR_PDF...\n\n" +
+        "  --baseline          Earlier JSON result to compare against.\n" +
+        "  --help, -h          Show this help message.\n" +
+        "  --iterations, -n    Document loads per file. [10]\n" +
+        "  --output, -o        Where to write the JSON result. [stdout]\n" +
+        "  --pdfjs             Path to the pdf.mjs build to benchmark.\n" +
+        "                      [build/generic-legacy/build/pdf.mjs]\n" +
+        "  --rangeChunkSize    Range request size used by pdf.js. [65536]\n" +
+        "  --threshold         p50 ratio over --baseline that counts as a\n" +
+        "                      regression (exit code 1). [1.25]\n"
+    );
+    process.exit(values.help ? 0 : 1);
+  }
+  if (!(parseInt(values.iterations, 10) > 0)) {
+    throw new Error("--iterations must be a positive integer.");
+  }
+  return {
+    baseline: values.baseline,
+    files: positionals.flatMap(listPdfs),
+    iterations: parseInt(values.iterations, 10),
+    output: values.output,
+    pdfjs: path.resolve(values.pdfjs),
+    rangeChunkSize: parseInt(values.rangeChunkSize, 10),
+    threshold: parseFloat(values.threshold),
+  };
+}
+
+function listPdfs(target) {
+  if (!fs.statSync(target).isDirectory()) {
+    return [target];
+  }
+  return fs
+    .readdirSync(target)
+    .filter(name => name.toLowerCase().endsWith(".pdf"))
+    .sort()
+    .map(name => path.join(target, name));
+}
+
+// Expected signature counts from the generator's manifest.json, if the file
+// sits next to one.
+function expectedSignatures(file) {
+  const manifest = path.join(path.dirname(file), "manifest.json");
+  try {
+    const { cases } = JSON.parse(fs.readFileSync(manifest, "utf8"));
+    return (
+      cases.find(c => c.file === path.basename(file))?.expected_signatures ??
+      null
+    );
+  } catch {
+    return null;
+  }
+}
+
+function percentiles(samples) {
+  if (samples.length === 0) {
+    return null;
+  }
+  const sorted = samples.toSorted((a, b) => a - b);
+  // Nearest-rank percentiles.
+  const rank = p => sorted[Math.max(0, Math.ceil(p * sorted.length) - 1)];
+  return {
+    count: sorted.length,
+    p50: rank(0.5),
+    p95: rank(0.95),
+    min: sorted[0],
+    max: sorted.at(-1),
+  };
+}
+
+async function time(fn) {
+  const start = process.hrtime.bigint();
+  const result = await fn();
+  return [Number(process.hrtime.bigint() - start) / 1e6, result];
+}
+
+async function benchmarkFile(pdfjsLib, file, options) {
+  // Answers range requests from memory and counts them, the way a network
+  // loader would see them.
+  class CountingRangeTransport extends pdfjsLib.PDFDataRangeTransport {
+    requests = 0;
+
+    bytes = 0;
+
+    constructor(data, initialData) {
+      super(data.length, initialData);
+      this.data = data;
+    }
+
+    requestDataRange(begin, end) {
+      this.requests++;
+      this.bytes += end - begin;
+      // Copy, since the chunk may be transferred to the worker, and reply
+      // asynchronously like a real response.
+      const chunk = this.data.slice(begin, end);
+      setTimeout(() => this.onDataRange(begin, chunk), 0);
+    }
+  }
+
+  const data = new Uint8Array(fs.readFileSync(file));
+  const documentParams = {
+    disableAutoFetch: true,
+    disableStream: true,
+    rangeChunkSize: options.rangeChunkSize,
+    verbosity: pdfjsLib.VerbosityLevel.ERRORS,
+  };
+  const samples = {
+    cold: { getSignatures: [], getSignatureData: [] },
+    warm: { getSignatureData: [] },
+    preloaded: { getSignatures: [] },
+  };
+  const requests = { load: [], getSignatures: [], getSignatureData: [] };
+  const bytes = { load: [], getSignatures: [], getSignatureData: [] };
+  let signatureCount = null;
+
+  for (let i = 0; i < options.iterations; i++) {
+    // Cold: the document starts without any data, so everything signature
+    // extraction needs has to be requested through the transport.
+    const transport = new CountingRangeTransport(data, null);
+    const loadingTask = pdfjsLib.getDocument({
+      ...documentParams,
+      range: transport,
+    });
+    const pdfDocument = await loadingTask.promise;
+    requests.load.push(transport.requests);
+    bytes.load.push(transport.bytes);
+
+    let [before, beforeBytes] = [transport.requests, transport.bytes];
+    const [ms, signatures] = await time(() => pdfDocument.getSignatures());
+    samples.cold.getSignatures.push(ms);
+    requests.getSignatures.push(transport.requests - before);
+    bytes.getSignatures.push(transport.bytes - beforeBytes);
+    signatureCount = signatures?.length ?? 0;
+
+    [before, beforeBytes] = [transport.requests, transport.bytes];
+    for (const { id } of signatures || []) {
+      const [dataMs] = await time(() => pdfDocument.getSignatureData(id));
+      samples.cold.getSignatureData.push(dataMs);
+    }
+    requests.getSignatureData.push(transport.requests - before);
+    bytes.getSignatureData.push(transport.bytes - beforeBytes);
+
+    // Warm: the signed spans are now resident in the worker.
+    for (const { id } of signatures || []) {
+      const [dataMs] = await time(() => pdfDocument.getSignatureData(id));
+      samples.warm.getSignatureData.push(dataMs);
+    }
+    await loadingTask.destroy();
+
+    // Preloaded: a fresh document whose bytes are all available up front, so
+    // the signatures getter only pays for parsing. (A second call on the
+    // same document would just return the API's cached promise.) pdf.js
+    // transfers the initial data to the worker, detaching its buffer, so it
+    // gets a copy of the file; the cold transports only ever hand out
+    // slices of `data`.
+    const preloadedTask = pdfjsLib.getDocument({
+      ...documentParams,
+      range: new CountingRangeTransport(data, data.slice()),
+    });
+    const preloadedDocument = await preloadedTask.promise;
+    const [preloadedMs] = await time(() => preloadedDocument.getSignatures());
+    samples.preloaded.getSignatures.push(preloadedMs);
+    await preloadedTask.destroy();
+  }
+
+  const expected = expectedSignatures(file);
+  const stats = (obj, fn) =>
+    Object.fromEntries(Object.entries(obj).map(([k, v]) => [k, fn(v)]));
+  return {
+    file: path.basename(file),
+    size: data.length,
+    signatures: signatureCount,
+    expectedSignatures: expected,
+    cold: stats(samples.cold, percentiles),
+    warm: stats(samples.warm, percentiles),
+    preloaded: stats(samples.preloaded, percentiles),
+    rangeRequests: stats(requests, percentiles),
+    rangeBytes: stats(bytes, percentiles),
+  };
+}
+
+// Compares cold p50 timings and range request counts against a baseline run,
+// returning the number of regressions above the threshold.
+function compareWithBaseline(results, baselinePath, threshold) {
+  const baseline = JSON.parse(fs.readFileSync(baselinePath, "utf8"));
+  const previous = new Map(baseline.files.map(r => [r.file, r]));
+  let regressions = 0;
+  for (const result of results.files) {
+    const old = previous.get(result.file);
+    if (!old) {
+      continue;
+    }
+    const metrics = [
+      ["getSignatures p50", r => r.cold.getSignatures?.p50],
+      ["getSignatureData p50", r => r.cold.getSignatureData?.p50],
+      ["getSignatures requests", r => r.rangeRequests.getSignatures?.p50],
+      ["getSignatureData requests", r => r.rangeRequests.getSignatureData?.p50],
+    ];
+    for (const [label, get] of metrics) {
+      const [before, after] = [get(old), get(result)];
+      if (!before || after === undefined) {
+        continue;
+      }
+      const ratio = after / before;
+      const regressed = ratio > threshold;
+      regressions += regressed;
+      console.log(
+        `${regressed ? "REGRESSION" : "ok"}  ${result.file}  ${label}: ` +
+          `${before.toFixed(2)} -> ${after.toFixed(2)} (x${ratio.toFixed(2)})`
+      );
+    }
+  }
+  return regressions;
+}
+
+const options = parseOptions();
+const pdfjsLib = await import(pathToFileURL(options.pdfjs));
+
+const results = {
+  pdfjs: { version: pdfjsLib.version, build: pdfjsLib.build },
+  node: process.version,
+  platform: `${os.platform()} ${os.arch()}`,
+  cpu: os.cpus()[0]?.model ?? null,
+  date: new Date().toISOString(),
+  iterations: options.iterations,
+  rangeChunkSize: options.rangeChunkSize,
+  files: [],
+};
+for (const file of options.files) {
+  const result = await benchmarkFile(pdfjsLib, file, options);
+  results.files.push(result);
+  let mismatch = "";
+  if (
+    result.expectedSignatures !== null &&
+    result.expectedSignatures !== result.signatures
+  ) {
+    mismatch = ` (EXPECTED ${result.expectedSignatures})`;
+    process.exitCode = 1;
+  }
+  console.error(
+    `${result.file}: ${result.signatures} signature(s)${mismatch}, ` +
+      `getSignatures p50 ${result.cold.getSignatures.p50.toFixed(2)} ms, ` +
+      `${result.rangeRequests.getSignatures.p50} range request(s)`
+  );
+}
+
+const json = JSON.stringify(results, null, 2) + "\n";
+if (options.output) {
+  fs.writeFileSync(options.output, json);
+} else {
+  process.stdout.write(json);
+}
+
+if (
+  options.baseline &&
+  compareWithBaseline(results, options.baseline, options.threshold) > 0
+) {
+  process.exitCode = 1;
+}
@@ -0,0 +1,95 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""Fixtures for the generate.py tests.
+
+Run from the pdf.js root:
+
+    python3 -m pytest test/pdfs/sig_corpus
+
+Most tests sign with a stub that needs no checkout; set
+MOZILLA_CENTRAL_SRC to a built mozilla-central checkout to also run the
+ones that check real PKCS#7 signatures.
+"""
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+CORPUS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(CORPUS_DIR))
+
+import generate  # noqa: E402
+
+# Same length as the placeholders pycms output is sized for.
+STUB_PKCS7_LEN = 1204
+
+
+class StubSigner:
+    """Returns a deterministic DER SEQUENCE derived from the spec text.
+
+    It is not a SignedData, so verify reports its PKCS#7 as "malformed",
+    but every /ByteRange, digest and layout is what a real signer gives.
+    """
+
+    def __init__(self):
+        self.specs = []
+
+    def identity(self):
+        return "stub"
+
+    def sign(self, spec_text):
+        self.specs.append(spec_text)
+        body = b""
+        seed = spec_text.encode("ascii")
+        while len(body) < STUB_PKCS7_LEN - 4:
+            seed = hashlib.sha256(seed).digest()
+            body += seed
+        body = body[:STUB_PKCS7_LEN - 4]
+        return b"\x30\x82" + len(body).to_bytes(2, "big") + body
+
+
+def _reset_signer(monkeypatch, signer):
+    monkeypatch.setattr(generate, "SIGNER", signer)
+    monkeypatch.setattr(generate, "CACHE", None)
+    monkeypatch.setattr(generate, "PROFILER", None)
+    monkeypatch.setattr(generate, "SPOOL_DIR", None)
+    monkeypatch.setattr(generate, "_signer_identity", None)
+    monkeypatch.setattr(generate, "_pkcs7_lens", {})
+
+
+@pytest.fixture
+def stub_signer(monkeypatch):
+    """Sign with StubSigner, without a cache, profiler or spool files."""
+    signer = StubSigner()
+    _reset_signer(monkeypatch, signer)
+    return signer
+
+
+@pytest.fixture
+def pycms_signer(monkeypatch):
+    """Sign with pycms from $MOZILLA_CENTRAL_SRC; skipped without it."""
+    if not os.environ.get("MOZILLA_CENTRAL_SRC"):
+        pytest.skip("MOZILLA_CENTRAL_SRC is not set")
+    firefox_dir = generate._resolve_mozilla_central_dir(None)
+    tools_dir = firefox_dir / "security/manager/tools"
+    monkeypatch.setattr(generate, "FIREFOX_DIR", firefox_dir)
+    monkeypatch.setattr(generate, "TOOLS_DIR", tools_dir)
+    monkeypatch.setattr(generate, "PYCMS", tools_dir / "pycms.py")
+    signer = generate.InProcessSigner()
+    _reset_signer(monkeypatch, signer)
+    return signer
+
+
+@pytest.fixture
+def case():
+    """The CASES entry with the given name."""
+    return lambda name: next(c for c in generate.CASES if c["name"] == name)
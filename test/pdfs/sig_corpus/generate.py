@@ -28,17 +28,51 @@ third_party/python. The checkout location is resolved in this order:
   1. The --mozilla-central CLI flag (highest priority).
   2. The MOZILLA_CENTRAL_SRC environment variable.
   3. /opt/mozilla/firefox (fallback default; will print a warning).
+
+With ``--signer standalone`` no checkout is needed once its keys and
+certificates have been exported with ``--export-signer-material``.
+
+``generate.py verify [PATH...]`` checks an existing corpus instead: every
+/ByteRange digest against its PKCS#7 messageDigest and the manifest.
+``generate.py inspect [PATH...]`` lists the revisions and /Sig dicts of
+any PDFs.
+
+Next to this script, verify.py and inspect_pdf.py hold those
+subcommands, resign.py, matrix.py and mutations.py the --resign,
+--matrix and --mutations cases, and profiling.py the --profile report.
 """
 
 import argparse
 import base64
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import fnmatch
 import hashlib
+import importlib
+import io
+import itertools
+import json
+import math
+import mmap
 import os
+import random
 import re
+import struct
+import shutil
 import subprocess
 import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
 from pathlib import Path
 
+import profiling
+
 CORPUS_DIR = Path(__file__).resolve().parent
 
 # Default location, used only when no CLI flag or env var overrides it.
@@ -65,8 +99,9 @@ def _resolve_mozilla_central_dir(cli_value):
 # Vendored Python modules pycms transitively imports.
 VENDORED_DEPS = ["ecdsa", "rsa", "pyasn1", "pyasn1_modules", "six"]
 
-# /Contents placeholder is sized so any single PKCS#7 we generate fits.
-# The blobs we mint are ~1.2 KB each, so 4 KB of payload = 8192 hex chars.
+# /Contents placeholder of a signature that is never filled in (the
+# unsupported-SubFilter case). Signed placeholders are sized to fit the
+# signer's output exactly, see pkcs7_len().
 PLACEHOLDER_PKCS7_LEN = 4096
 
 
@@ -76,25 +111,521 @@ def python_path_for_pycms():
     return os.pathsep.join(parts)
 
 
-def run_pycms(spec_text):
-    """Invoke pycms.py with the given spec, return raw DER bytes of the PKCS#7."""
-    env = os.environ.copy()
-    env["PYTHONPATH"] = python_path_for_pycms()
-    proc = subprocess.run(
-        [sys.executable, str(PYCMS)],
-        input=spec_text.encode("ascii"),
-        env=env,
-        capture_output=True,
-        check=False,
-    )
-    if proc.returncode != 0:
-        sys.stderr.write(proc.stderr.decode("utf-8", "replace"))
-        raise SystemExit(f"pycms.py failed for spec:\n{spec_text}")
-    pem = proc.stdout.decode("ascii")
+def _pem_to_der(pem):
     body = re.sub(r"(-----.*?-----|\s)", "", pem)
     return base64.b64decode(body)
 
 
+def pycms_identity():
+    """Hash of the pycms/pycert/pykey sources, which embed the test keys."""
+    h = hashlib.sha256()
+    for name in ("pycms.py", "pycert.py", "pykey.py"):
+        try:
+            h.update((TOOLS_DIR / name).read_bytes())
+        except FileNotFoundError:
+            h.update(name.encode("ascii"))
+    return h.hexdigest()
+
+
+class SubprocessSigner:
+    """Runs a fresh ``pycms.py`` interpreter for every signature."""
+
+    def identity(self):
+        return pycms_identity()
+
+    def sign(self, spec_text):
+        env = os.environ.copy()
+        env["PYTHONPATH"] = python_path_for_pycms()
+        proc = subprocess.run(
+            [sys.executable, str(PYCMS)],
+            input=spec_text.encode("ascii"),
+            env=env,
+            capture_output=True,
+            check=False,
+        )
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr.decode("utf-8", "replace"))
+            raise SystemExit(f"pycms.py failed for spec:\n{spec_text}")
+        return _pem_to_der(proc.stdout.decode("ascii"))
+
+
+class InProcessSigner:
+    """Imports pycms.py once and signs every spec in this interpreter.
+
+    Interpreter startup and the pyasn1/ecdsa/rsa imports dominate the
+    cost of a subprocess per signature, so this is the default mode.
+    """
+
+    def __init__(self):
+        self._pycms = None
+
+    def identity(self):
+        return pycms_identity()
+
+    def _load(self):
+        if self._pycms is None:
+            for part in reversed(python_path_for_pycms().split(os.pathsep)):
+                if part not in sys.path:
+                    sys.path.insert(0, part)
+            self._pycms = importlib.import_module("pycms")
+        return self._pycms
+
+    def sign(self, spec_text):
+        pycms = self._load()
+        try:
+            pem = pycms.CMS(io.StringIO(spec_text)).toPEM()
+        except Exception as ex:
+            raise SystemExit(
+                f"pycms failed ({ex!r}) for spec:\n{spec_text}"
+            ) from ex
+        return _pem_to_der(pem)
+
+
+# ---------------------------------------------------------------------
+# Standalone signer
+# ---------------------------------------------------------------------
+
+# Written by --export-signer-material, read by --signer standalone.
+SIGNER_MATERIAL = CORPUS_DIR / "signer_material.json"
+
+# DER contents of the digest algorithm OIDs pycms uses, with the hashlib
+# name and the PKCS#1 v1.5 DigestInfo prefix of each.
+_DIGEST_ALGORITHMS = {
+    bytes.fromhex("2b0e03021a"): (
+        "sha1",
+        bytes.fromhex("3021300906052b0e03021a05000414"),
+    ),
+    bytes.fromhex("608648016503040201"): (
+        "sha256",
+        bytes.fromhex("3031300d060960864801650304020105000420"),
+    ),
+}
+_MESSAGE_DIGEST_OID = bytes.fromhex("2a864886f70d010904")
+
+
+def _der_header(data, offset):
+    """(tag, header length, content length) of the DER element at
+    ``offset``."""
+    tag = data[offset]
+    length = data[offset + 1]
+    header = 2
+    if length & 0x80:
+        num_bytes = length & 0x7F
+        length = int.from_bytes(data[offset + 2:offset + 2 + num_bytes], "big")
+        header += num_bytes
+    return tag, header, length
+
+
+def _der_children(data, offset):
+    """(tag, offset, header length, content length) of every child of the
+    constructed DER element at ``offset``."""
+    _, header, length = _der_header(data, offset)
+    pos = offset + header
+    end = pos + length
+    children = []
+    while pos < end:
+        tag, child_header, child_length = _der_header(data, pos)
+        children.append((tag, pos, child_header, child_length))
+        pos += child_header + child_length
+    return children
+
+
+class CmsTemplate:
+    """A pycms SignedData whose digests can be swapped without re-encoding.
+
+    Changing the messageDigest attribute of a SignerInfo only changes the
+    bytes of that attribute and of the signature over the signed
+    attributes, and neither changes length. So the certificates, names
+    and every other byte pycms produced are reused as they are, and only
+    the digest and the RSA PKCS#1 v1.5 signature are recomputed.
+    """
+
+    def __init__(self, der):
+        self.der = bytes(der)
+        # One (hash name, DigestInfo prefix, messageDigest value offset,
+        # signed attributes offset and length, signature offset and
+        # length) per SignerInfo.
+        self.signer_infos = []
+        content_info = _der_children(self.der, 0)
+        signed_data = _der_children(self.der, content_info[1][1])[0][1]
+        signer_infos = _der_children(self.der, signed_data)[-1][1]
+        for _, signer_info, _, _ in _der_children(self.der, signer_infos):
+            children = _der_children(self.der, signer_info)
+            algorithm = _der_children(self.der, children[2][1])[0]
+            oid = self.der[
+                algorithm[1] + algorithm[2]:algorithm[1] + algorithm[2] + algorithm[3]
+            ]
+            if oid not in _DIGEST_ALGORITHMS:
+                raise ValueError(f"unsupported digest algorithm {oid.hex()}")
+            attrs = next(c for c in children if c[0] == 0xA0)
+            signature = next(c for c in children if c[0] == 0x04)
+            digest_at = None
+            for _, attr, _, _ in _der_children(self.der, attrs[1]):
+                attr_oid, values = _der_children(self.der, attr)
+                start = attr_oid[1] + attr_oid[2]
+                if self.der[start:start + attr_oid[3]] == _MESSAGE_DIGEST_OID:
+                    value = _der_children(self.der, values[1])[0]
+                    digest_at = value[1] + value[2]
+            if digest_at is None:
+                raise ValueError("SignerInfo without a messageDigest attribute")
+            self.signer_infos.append(
+                (
+                    *_DIGEST_ALGORITHMS[oid],
+                    digest_at,
+                    attrs[1],
+                    attrs[2] + attrs[3],
+                    signature[1] + signature[2],
+                    signature[3],
+                )
+            )
+
+    def sign(self, digests, key):
+        """SignedData for ``digests`` ({hash name: digest bytes}), signed
+        with ``key``."""
+        der = bytearray(self.der)
+        for (
+            name,
+            prefix,
+            digest_at,
+            attrs_at,
+            attrs_len,
+            signature_at,
+            signature_len,
+        ) in self.signer_infos:
+            digest = digests[name]
+            der[digest_at:digest_at + len(digest)] = digest
+            # The signature covers the attributes encoded as a SET, not
+            # with the [0] IMPLICIT tag they have in the SignerInfo.
+            attrs = b"\x31" + der[attrs_at + 1:attrs_at + attrs_len]
+            signature = _rsa_sign(key, prefix + hashlib.new(name, attrs).digest())
+            if len(signature) != signature_len:
+                raise ValueError("key does not match the template's signature")
+            der[signature_at:signature_at + signature_len] = signature
+        return bytes(der)
+
+
+def _rsa_sign(key, digest_info):
+    """RSASSA-PKCS1-v1_5 signature of an encoded DigestInfo, using the
+    CRT parameters when the key has them."""
+    n = key["n"]
+    size = (n.bit_length() + 7) // 8
+    padded = (
+        b"\x00\x01" + b"\xff" * (size - len(digest_info) - 3) + b"\x00" + digest_info
+    )
+    m = int.from_bytes(padded, "big")
+    p, q = key.get("p"), key.get("q")
+    if p and q:
+        m1 = pow(m, key["d"] % (p - 1), p)
+        m2 = pow(m, key["d"] % (q - 1), q)
+        s = m2 + (pow(q, -1, p) * (m1 - m2) % p) * q
+    else:
+        s = pow(m, key["d"], n)
+    return s.to_bytes(size, "big")
+
+
+def _spec_digests(spec_text):
+    """Split a pycms spec into its digests ({hash name: bytes}) and the
+    spec with every digest replaced by a ``{name}`` placeholder."""
+    digests = {}
+    lines = []
+    for line in spec_text.splitlines():
+        name, sep, value = line.partition(":")
+        if sep and name in ("sha1", "sha256"):
+            digests[name] = bytes.fromhex(value.strip())
+            line = f"{name}:{{{name}}}"
+        lines.append(line)
+    return digests, "\n".join(lines) + "\n"
+
+
+def _signing_key_spec(spec_text):
+    """pykey specification of the key pycms signs ``spec_text`` with."""
+    in_signer = False
+    for line in spec_text.splitlines():
+        if line.strip() == "signer:":
+            in_signer = True
+        elif in_signer and line.startswith("subjectKey:"):
+            return line.partition(":")[2].strip()
+    return "default"
+
+
+class StandaloneSigner:
+    """Signs without a mozilla-central checkout.
+
+    Reads SIGNER_MATERIAL, written once by --export-signer-material from a
+    checkout: for every spec the corpus uses, the SignedData pycms made
+    for a reference digest, and the RSA keys that signed them. Signing a
+    new digest patches a copy of that template (see CmsTemplate), so the
+    output is byte-for-byte what pycms would return, at the cost of one
+    RSA private-key operation and no imports.
+    """
+
+    def __init__(self):
+        try:
+            material = json.loads(SIGNER_MATERIAL.read_text())
+        except FileNotFoundError:
+            raise SystemExit(
+                f"{SIGNER_MATERIAL} not found. Run generate.py "
+                f"--export-signer-material once with a mozilla-central "
+                f"checkout, or pass --signer-material."
+            ) from None
+        self._identity = material["identity"]
+        self._keys = {
+            name: {k: int(v, 16) for k, v in key.items()}
+            for name, key in material["keys"].items()
+        }
+        self._templates = {
+            spec: (entry["key"], base64.b64decode(entry["der"]))
+            for spec, entry in material["templates"].items()
+        }
+        self._parsed = {}
+
+    def identity(self):
+        # The same as the exporting checkout's, so cached signatures are
+        # shared between this signer and pycms.
+        return self._identity
+
+    def sign(self, spec_text):
+        digests, spec = _spec_digests(spec_text)
+        if spec not in self._templates:
+            raise SystemExit(
+                f"No signer material for spec:\n{spec}"
+                f"Re-run --export-signer-material."
+            )
+        key_name, der = self._templates[spec]
+        if spec not in self._parsed:
+            self._parsed[spec] = CmsTemplate(der)
+        return self._parsed[spec].sign(digests, self._keys[key_name])
+
+
+def export_signer_material(path, spec_templates):
+    """Sign a reference digest with pycms for every spec template and
+    write the resulting SignedData and the keys that signed them to
+    ``path``, checking that StandaloneSigner reproduces pycms exactly."""
+    signer = InProcessSigner()
+    signer._load()
+    pykey = importlib.import_module("pykey")
+    reference = hashlib.sha256(b"").hexdigest()
+    keys = {}
+    templates = {}
+    for spec_template in spec_templates:
+        spec_text = spec_template.format(sha256=reference)
+        der = signer.sign(spec_text)
+        key_name = _signing_key_spec(spec_text)
+        if key_name not in keys:
+            key = pykey.keyFromSpecification(key_name)
+            try:
+                keys[key_name] = {
+                    name: getattr(key, attr)
+                    for name, attr in (
+                        ("n", "RSA_N"),
+                        ("e", "RSA_E"),
+                        ("d", "RSA_D"),
+                        ("p", "RSA_P"),
+                        ("q", "RSA_Q"),
+                    )
+                }
+            except AttributeError:
+                raise SystemExit(
+                    f"Key {key_name!r} is not an RSA key; the standalone "
+                    f"signer only supports RSA."
+                ) from None
+        digests, spec = _spec_digests(spec_text)
+        if CmsTemplate(der).sign(digests, keys[key_name]) != der:
+            raise SystemExit(
+                f"Re-signing pycms's output does not reproduce it for spec:\n"
+                f"{spec_text}"
+            )
+        templates[spec] = {
+            "key": key_name,
+            "der": base64.b64encode(der).decode("ascii"),
+        }
+    material = {
+        "identity": pycms_identity(),
+        "keys": {
+            name: {k: format(v, "x") for k, v in key.items()}
+            for name, key in keys.items()
+        },
+        "templates": templates,
+    }
+    path.write_text(json.dumps(material, indent=2, sort_keys=True) + "\n")
+    return len(templates)
+
+
+SIGNERS = {
+    "inprocess": InProcessSigner,
+    "standalone": StandaloneSigner,
+    "subprocess": SubprocessSigner,
+}
+
+# Replaced in main() according to --signer.
+SIGNER = InProcessSigner()
+
+
+def run_pycms(spec_text):
+    """Sign ``spec_text`` with the active signer, return raw DER bytes."""
+    with _stage("sign"):
+        return SIGNER.sign(spec_text)
+
+
+# ---------------------------------------------------------------------
+# Signature cache
+# ---------------------------------------------------------------------
+
+
+class SignatureCache:
+    """Content-addressed store for signer output plus per-case build stamps.
+
+    DER blobs live under ``sigs/<key>.der`` where the key hashes every
+    input that determines what the signer returns. Build stamps live under
+    ``cases/<name>.json`` and record the fingerprint of the inputs an
+    output file was last built from, so unchanged cases can be skipped.
+    Writes go through a temporary file and ``os.replace`` so concurrent
+    pool workers never observe partial entries.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.sigs_dir = self.root / "sigs"
+        self.cases_dir = self.root / "cases"
+        self.sigs_dir.mkdir(parents=True, exist_ok=True)
+        self.cases_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        path = self.sigs_dir / f"{key}.der"
+        try:
+            der = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Eviction is least-recently-used by mtime, so refresh it on a hit.
+        os.utime(path)
+        return der
+
+    def put(self, key, der):
+        self._write_atomic(self.sigs_dir / f"{key}.der", der)
+
+    def stamp(self, name):
+        try:
+            return json.loads((self.cases_dir / f"{name}.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set_stamp(self, name, fingerprint, size, signatures):
+        data = json.dumps(
+            {"fingerprint": fingerprint, "size": size, "signatures": signatures}
+        )
+        self._write_atomic(self.cases_dir / f"{name}.json", data.encode())
+
+    def evict(self, max_bytes):
+        """Drop least-recently-used signatures until the total size fits."""
+        entries = []
+        for path in self.sigs_dir.glob("*.der"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+
+# Replaced in main() unless --no-cache is passed.
+CACHE = None
+
+_signer_identity = None
+
+
+def signer_identity():
+    """Identity of the keys and code behind SIGNER.
+
+    Cached signatures are only reused with the checkout that minted them
+    (or signer material exported from it).
+    """
+    global _signer_identity
+    if _signer_identity is None:
+        _signer_identity = SIGNER.identity()
+    return _signer_identity
+
+
+def _sign_cached(spec_text, key_parts):
+    """Sign ``spec_text``, reusing the blob cached under ``key_parts`` (a
+    JSON-serializable list) and the signer identity, if any."""
+    if CACHE is None:
+        return run_pycms(spec_text)
+    key = hashlib.sha256(
+        json.dumps([*key_parts, signer_identity()]).encode("utf-8")
+    ).hexdigest()
+    der = CACHE.get(key)
+    if der is None:
+        der = run_pycms(spec_text)
+        CACHE.put(key, der)
+    return der
+
+
+def sign_digest(spec_template, digest, *, page_text, sub_filter):
+    """Return the PKCS#7 DER for ``digest``, reusing a cached blob if the
+    same page text, SubFilter, spec and signer produced it before."""
+    return _sign_cached(
+        spec_template.format(sha256=digest),
+        [page_text, sub_filter, spec_template, digest],
+    )
+
+
+_pkcs7_lens = {}
+
+
+def pkcs7_len(spec_template):
+    """Length of the PKCS#7 the signer returns for ``spec_template``, for
+    sizing its /Contents placeholder before the digest is known.
+
+    The digest and the RSA signature are fixed-width, so the length does
+    not depend on the digest, and one dry-run signature of a reference
+    digest per spec gives it. The dry run is cached under a key of its
+    own, apart from the signatures of the cases.
+    """
+    if spec_template not in _pkcs7_lens:
+        der = _sign_cached(
+            spec_template.format(sha256="00" * 32), ["pkcs7_len", spec_template]
+        )
+        _pkcs7_lens[spec_template] = len(der)
+    return _pkcs7_lens[spec_template]
+
+
+def _contents_len(spec_template):
+    """/Contents placeholder length for a signature by ``spec_template``,
+    PLACEHOLDER_PKCS7_LEN for one that is never signed (None)."""
+    if spec_template is None:
+        return PLACEHOLDER_PKCS7_LEN
+    return pkcs7_len(spec_template)
+
+
+# ---------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------
+
+# Replaced in main() with a StageProfiler when --profile is passed.
+PROFILER = None
+
+
+def _stage(name, size=0):
+    """PROFILER.stage(), or a do-nothing context when not profiling."""
+    if PROFILER is None:
+        return contextlib.nullcontext({"bytes": size})
+    return PROFILER.stage(name, size)
+
+
 # ---------------------------------------------------------------------
 # Tiny PDF builder
 # ---------------------------------------------------------------------
@@ -159,121 +690,1467 @@ def _content_stream_for(text):
     return "\n".join(cmds).encode("latin-1")
 
 
-class PdfBuilder:
-    """Minimal one-page PDF builder with a single /Sig field.
+# Fixed-width ByteRange placeholder: every value is zero-padded to ten
+# digits, so patching in the real offsets never shifts any later byte.
+BYTE_RANGE_PLACEHOLDER = b"0000000000 0000000000 0000000000 0000000000"
+
+# /Length of a stream whose data is compressed as it is written, patched
+# in once it is known, likewise without shifting the data.
+STREAM_LENGTH_PLACEHOLDER = b"0000000000"
+
+
+class SigPlaceholder:
+    """Handle on the patchable parts of a /Sig dict written by PdfWriter.
+
+    ``byte_range_at`` is the offset of the first ByteRange digit,
+    ``contents_open`` the offset of the '<' opening /Contents and
+    ``hex_start``/``hex_end`` delimit the zero-filled hex payload.
+    """
+
+    def __init__(self, byte_range_at, hex_start, hex_end):
+        self.byte_range_at = byte_range_at
+        self.contents_open = hex_start - 1
+        self.hex_start = hex_start
+        self.hex_end = hex_end
 
-    Returned bytes have placeholder ByteRange [0 0 0 0] and a /Contents hex
-    string of zero bytes. The caller patches ByteRange and /Contents in
-    place after computing the offsets.
+    def byte_range(self, end):
+        """ByteRange covering [0, end) minus the /Contents hex payload."""
+        return (0, self.hex_start, self.hex_end, end - self.hex_end)
+
+
+class MappedPdf(mmap.mmap):
+    """Writable mapping of a PdfWriter spool file, in place of the
+    bytearray of an in-memory writer: slicing, slice and item assignment,
+    find, memoryview() and regexes work on it as on a bytearray, and
+    ``index``/``rindex`` are added. ``path`` is the spool file."""
+
+    path = None
+
+    def index(self, sub, start=0, end=None):
+        pos = self.find(sub, start, len(self) if end is None else end)
+        if pos < 0:
+            raise ValueError("subsection not found")
+        return pos
+
+    def rindex(self, sub, start=0, end=None):
+        pos = self.rfind(sub, start, len(self) if end is None else end)
+        if pos < 0:
+            raise ValueError("subsection not found")
+        return pos
+
+
+# Replaced in main() with --on-disk: the directory PdfBuilder spools
+# documents to.
+SPOOL_DIR = None
+
+
+class PdfWriter:
+    """Append-only PDF byte buffer that tracks offsets as it writes.
+
+    Object offsets are taken from the running position when each object
+    starts, and every placeholder is returned as a handle when emitted, so
+    neither xref generation nor patching ever has to rescan the buffer.
+    Incremental updates are written by continuing on the same writer: each
+    ``write_xref`` covers the objects written since the previous one and
+    links to it through /Prev.
+
+    With ``xref_streams`` every section is a PDF 1.5 cross-reference
+    stream instead of an xref table and trailer, and objects written with
+    ``obj`` are packed into compressed /ObjStm object streams, which are
+    written just before the xref stream of their section. Streams and
+    /Sig dicts are always written directly: a signature's /Contents has to
+    be at a fixed offset of the file for /ByteRange to exclude it.
+
+    With ``spool_dir`` the bytes go straight to a new ``.*.pdf.part``
+    file there instead of memory, and ``buf`` maps the file (see
+    MappedPdf), so placeholders are patched and spans hashed in place.
+    The caller moves ``spool_path`` into place once the document is done.
+
+    With ``base``, the path of an existing PDF, the writer starts with its
+    bytes, copied as they are, to append incremental updates to it; the
+    caller sets ``startxref`` and ``size`` from its newest trailer.
     """
 
-    def __init__(self, page_text, sub_filter="/adbe.pkcs7.detached"):
+    # Objects per /ObjStm.
+    OBJECT_STREAM_LEN = 100
+
+    def __init__(self, xref_streams=False, spool_dir=None, base=None):
+        self._buf = bytearray()
+        self._spool = None
+        self._spooled = 0
+        self._mapped = None
+        self.spool_path = None
+        if spool_dir is not None:
+            fd, self.spool_path = tempfile.mkstemp(
+                suffix=".pdf.part", prefix=".", dir=spool_dir
+            )
+            # mkstemp creates it private; the output is not.
+            os.fchmod(fd, 0o644)
+            self._spool = os.fdopen(fd, "w+b")
+        if base is not None:
+            with open(base, "rb") as f:
+                if self._spool is None:
+                    self._buf += f.read()
+                else:
+                    shutil.copyfileobj(f, self._spool, 1024 * 1024)
+                    self._spooled = self._spool.tell()
+        # Objects written since the last xref section.
+        self.xref_entries = {}
+        self.startxref = None
+        # /Size of the most recent trailer, i.e. the next free object number.
+        self.size = 0
+        self.xref_streams = xref_streams
+        # (num, body) of the object stream being filled, and the finished
+        # ones as (nums, /First, compressed data), waiting for an object
+        # number in the next write_xref.
+        self._packing = []
+        self._object_streams = []
+
+    @property
+    def buf(self):
+        """The document so far: a bytearray, or a MappedPdf of the spool
+        file, mapped again whenever the file has grown since."""
+        if self._spool is None:
+            return self._buf
+        if self._mapped is None or len(self._mapped) != self._spooled:
+            self._spool.flush()
+            self._mapped = MappedPdf(self._spool.fileno(), self._spooled)
+            self._mapped.path = self.spool_path
+        return self._mapped
+
+    @property
+    def pos(self):
+        if self._spool is None:
+            return len(self._buf)
+        return self._spooled
+
+    def write(self, data):
+        if self._spool is None:
+            self._buf += data
+        else:
+            self._spool.write(data)
+            self._spooled += len(data)
+
+    def patch(self, at, data):
+        """Overwrite bytes already written at offset ``at``."""
+        if self._spool is None:
+            self._buf[at:at + len(data)] = data
+        else:
+            # Flushed first, so buffered bytes cannot overwrite the patch.
+            self._spool.flush()
+            os.pwrite(self._spool.fileno(), data, at)
+
+    def begin_obj(self, num):
+        self.xref_entries[num] = self.pos
+        self.write(f"{num} 0 obj\n".encode("ascii"))
+
+    def end_obj(self):
+        self.write(b"\nendobj\n")
+
+    def obj(self, num, body):
+        if self.xref_streams:
+            self._packing.append((num, body))
+            if len(self._packing) == self.OBJECT_STREAM_LEN:
+                self._pack()
+            return
+        self.begin_obj(num)
+        self.write(body)
+        self.end_obj()
+
+    def _pack(self):
+        if not self._packing:
+            return
+        header = []
+        data = []
+        offset = 0
+        for num, body in self._packing:
+            header.append(b"%d %d" % (num, offset))
+            data.append(body)
+            offset += len(body) + 1
+        header = b" ".join(header) + b"\n"
+        self._object_streams.append(
+            (
+                [num for num, _ in self._packing],
+                len(header),
+                zlib.compress(header + b"\n".join(data)),
+            )
+        )
+        self._packing = []
+
+    def stream_obj(self, num, *parts, entries=b""):
+        """Write a stream object whose data is the concatenation of
+        ``parts``, without joining them first. ``entries`` are extra
+        stream dict entries, such as /Filter."""
+        self.stream_obj_chunks(
+            num, parts, sum(len(part) for part in parts), entries=entries
+        )
+
+    def stream_obj_chunks(self, num, chunks, length=None, entries=b""):
+        """stream_obj() for data of ``length`` bytes in the iterable
+        ``chunks``, consumed as it is written: the data of a generator is
+        never held all at once. Without ``length``, /Length is written as
+        STREAM_LENGTH_PLACEHOLDER and patched once the data is written."""
+        self.begin_obj(num)
+        if entries:
+            entries = b" " + entries
+        self.write(b"<< /Length ")
+        length_at = self.pos
+        if length is None:
+            self.write(STREAM_LENGTH_PLACEHOLDER)
+        else:
+            self.write(b"%d" % length)
+        self.write(b"%s >>\nstream\n" % entries)
+        written = 0
+        for chunk in chunks:
+            self.write(chunk)
+            written += len(chunk)
+        if length is None:
+            width = len(STREAM_LENGTH_PLACEHOLDER)
+            self.patch(length_at, b"%0*d" % (width, written))
+        else:
+            assert written == length, (num, written, length)
+        self.write(b"\nendstream")
+        self.end_obj()
+
+    def sig_obj(self, num, *, sub_filter, signing_time, reason, contents_len):
+        """Write a /Sig dict with zeroed ByteRange and /Contents, return its
+        SigPlaceholder."""
+        self.begin_obj(num)
+        self.write(
+            b"<< /Type /Sig "
+            b"/Filter /Adobe.PPKLite "
+            b"/SubFilter " + sub_filter.encode("ascii") + b" "
+            b"/M (" + signing_time + b") "
+            b"/Reason (" + reason + b") "
+            b"/ByteRange ["
+        )
+        byte_range_at = self.pos
+        self.write(BYTE_RANGE_PLACEHOLDER + b"] /Contents <")
+        hex_start = self.pos
+        self.write(b"0" * (contents_len * 2))
+        hex_end = self.pos
+        self.write(b"> >>")
+        self.end_obj()
+        return SigPlaceholder(byte_range_at, hex_start, hex_end)
+
+    def write_xref(self, *, size, root, free=(), trailer_entries=b""):
+        """Write an xref table for the objects written since the previous
+        one (plus ``free`` entries), then the trailer and startxref.
+        ``trailer_entries`` are more trailer entries, such as /Info."""
+        if self.xref_streams:
+            self._write_xref_stream(
+                size=size, root=root, free=free, trailer_entries=trailer_entries
+            )
+            return
+        entries = dict(self.xref_entries)
+        for num in free:
+            entries[num] = None
+        self.xref_entries = {}
+
+        xref_offset = self.pos
+        lines = [b"xref\n"]
+        nums = sorted(entries)
+        i = 0
+        while i < len(nums):
+            # One subsection per run of consecutive object numbers.
+            j = i
+            while j + 1 < len(nums) and nums[j + 1] == nums[j] + 1:
+                j += 1
+            lines.append(f"{nums[i]} {j - i + 1}\n".encode("ascii"))
+            for num in nums[i:j + 1]:
+                off = entries[num]
+                if off is None:
+                    lines.append(b"0000000000 65535 f \n")
+                else:
+                    lines.append(f"{off:010d} 00000 n \n".encode("ascii"))
+            i = j + 1
+        self.write(b"".join(lines))
+
+        trailer = b"trailer\n<< /Size %d /Root %d 0 R" % (size, root)
+        trailer += trailer_entries
+        if self.startxref is not None:
+            trailer += b" /Prev %d" % self.startxref
+        trailer += b" >>\nstartxref\n%d\n%%%%EOF\n" % xref_offset
+        self.write(trailer)
+        self.startxref = xref_offset
+        self.size = size
+
+    def _write_xref_stream(self, *, size, root, free, trailer_entries):
+        """Write the pending object streams, numbered from ``size`` on, and
+        an xref stream covering them and everything else written since
+        the previous section."""
+        self._pack()
+        # Type 0 (free), 1 (offset) and 2 (object stream, index) entries.
+        entries = {num: (1, off, 0) for num, off in self.xref_entries.items()}
+        for num in free:
+            entries[num] = (0, 0, 65535)
+        for nums, first, data in self._object_streams:
+            stream_num = size
+            size += 1
+            for index, num in enumerate(nums):
+                entries[num] = (2, stream_num, index)
+            entries[stream_num] = (1, self.pos, 0)
+            self.begin_obj(stream_num)
+            self.write(
+                b"<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode "
+                b"/Length %d >>\nstream\n" % (len(nums), first, len(data))
+            )
+            self.write(data)
+            self.write(b"\nendstream")
+            self.end_obj()
+        self._object_streams = []
+
+        xref_num = size
+        size += 1
+        xref_offset = self.pos
+        entries[xref_num] = (1, xref_offset, 0)
+        widths = [
+            1,
+            max(1, (max(e[1] for e in entries.values()).bit_length() + 7) // 8),
+            max(1, (max(e[2] for e in entries.values()).bit_length() + 7) // 8),
+        ]
+        nums = sorted(entries)
+        index = []
+        rows = []
+        i = 0
+        while i < len(nums):
+            # One /Index pair per run of consecutive object numbers.
+            j = i
+            while j + 1 < len(nums) and nums[j + 1] == nums[j] + 1:
+                j += 1
+            index.append(b"%d %d" % (nums[i], j - i + 1))
+            i = j + 1
+        for num in nums:
+            rows.append(
+                b"".join(
+                    field.to_bytes(width, "big")
+                    for field, width in zip(entries[num], widths)
+                )
+            )
+        data = zlib.compress(b"".join(rows))
+
+        xref_dict = (
+            b"<< /Type /XRef /Size %d /Root %d 0 R " % (size, root)
+            + (trailer_entries.strip() + b" " if trailer_entries else b"")
+            + (b"/Prev %d " % self.startxref if self.startxref is not None else b"")
+            + b"/Index [" + b" ".join(index) + b"] "
+            b"/W [%d %d %d] /Filter /FlateDecode /Length %d >>"
+            % (*widths, len(data))
+        )
+        self.begin_obj(xref_num)
+        self.write(xref_dict + b"\nstream\n")
+        self.write(data)
+        self.write(b"\nendstream")
+        self.end_obj()
+        self.xref_entries = {}
+        self.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+        self.startxref = xref_offset
+        self.size = size
+
+
+# Named --scale presets; any key can still be overridden, e.g.
+# "--scale large,pages=100".
+SCALE_PRESETS = {
+    "medium": "pages=500,objects=20000,stream-mb=50",
+    "large": "pages=5000,objects=200000,stream-mb=500",
+}
+
+# Maximum /Kids per /Pages node when a scaled document needs a page tree.
+PAGE_TREE_FANOUT = 32
+
+
+def parse_scale(text):
+    """Parse a --scale value into {"pages", "objects", "stream_bytes"}."""
+    scale = {"pages": 1, "objects": 0, "stream_bytes": 0}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if item in SCALE_PRESETS:
+            scale.update(parse_scale(SCALE_PRESETS[item]))
+            continue
+        key, sep, value = item.partition("=")
+        try:
+            if not sep:
+                raise ValueError
+            if key == "pages":
+                scale["pages"] = int(value)
+            elif key == "objects":
+                scale["objects"] = int(value)
+            elif key == "stream-mb":
+                scale["stream_bytes"] = int(float(value) * 1024 * 1024)
+            else:
+                raise ValueError
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"invalid scale item {item!r}; expected one of "
+                f"{', '.join(sorted(SCALE_PRESETS))} or pages=N, objects=N, "
+                f"stream-mb=N"
+            ) from None
+    if scale["pages"] < 1 or scale["objects"] < 0 or scale["stream_bytes"] < 0:
+        raise argparse.ArgumentTypeError(f"invalid scale {text!r}")
+    return scale
+
+
+def _describe_scale(scale):
+    return (
+        f"Scale: {scale['pages']} pages, at least {scale['objects']} objects, "
+        f"{scale['stream_bytes'] / (1024 * 1024):g} MB of content streams."
+    )
+
+
+def _padding_ops(length):
+    """Exactly ``length`` bytes of no-op content stream operators."""
+    return b"q Q\n" * (length // 4) + b"\n" * (length % 4)
+
+
+def _padding_chunks(length, chunk_size=1024 * 1024):
+    """_padding_ops(length) in pieces of at most ``chunk_size`` bytes (a
+    multiple of 4), for compressing without materializing all of it."""
+    while length > chunk_size:
+        yield _padding_ops(chunk_size)
+        length -= chunk_size
+    if length:
+        yield _padding_ops(length)
+
+
+# ---------------------------------------------------------------------
+# Payload: compressed content streams and images
+# ---------------------------------------------------------------------
+
+IMAGE_KINDS = ["jpeg", "raw", "flate"]
+
+
+def parse_payload(text):
+    """Parse a --payload value into {"flate", "images", "image_px",
+    "image_kind"}."""
+    payload = {
+        "flate": False,
+        "images": 0,
+        "image_px": 512,
+        "image_kind": "mixed",
+    }
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        try:
+            if key == "flate" and not sep:
+                payload["flate"] = True
+            elif key == "images" and sep:
+                payload["images"] = int(value)
+            elif key == "image-px" and sep:
+                payload["image_px"] = int(value)
+            elif key == "image-kind" and value in IMAGE_KINDS + ["mixed"]:
+                payload["image_kind"] = value
+            else:
+                raise ValueError
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"invalid payload item {item!r}; expected flate, images=N, "
+                f"image-px=N or image-kind={'|'.join(IMAGE_KINDS)}|mixed"
+            ) from None
+    if payload["images"] < 0 or payload["image_px"] < 8:
+        raise argparse.ArgumentTypeError(f"invalid payload {text!r}")
+    return payload
+
+
+def _describe_payload(payload):
+    parts = []
+    if payload["flate"]:
+        parts.append("FlateDecode content streams")
+    if payload["images"]:
+        kind = payload["image_kind"]
+        px = -(-payload["image_px"] // 8) * 8
+        parts.append(
+            f"{payload['images']} {px}x{px} "
+            f"{'JPEG, raw and Flate' if kind == 'mixed' else kind} images"
+        )
+    return "Payload: " + (", ".join(parts) or "none") + "."
+
+
+def _deflate(chunks):
+    """Compress the byte strings of ``chunks`` incrementally, yielding the
+    compressed pieces as they come: with a generator of ``chunks``, neither
+    the uncompressed nor the compressed data is held all at once."""
+    compressor = zlib.compressobj()
+    for chunk in chunks:
+        part = compressor.compress(chunk)
+        if part:
+            yield part
+    yield compressor.flush()
+
+
+def _image_rows(px, seed, rows_per_chunk=64):
+    """RGB rows of a ``px`` x ``px`` noise image, ``rows_per_chunk`` at a
+    time. Rows are rotations of a few seeded random rows, so Flate finds
+    some, but not much, redundancy."""
+    rng = random.Random(seed)
+    base = [rng.randbytes(px * 3) for _ in range(8)]
+    for y0 in range(0, px, rows_per_chunk):
+        rows = []
+        for y in range(y0, min(y0 + rows_per_chunk, px)):
+            row = base[y % len(base)]
+            shift = (y * 3 * 7) % len(row)
+            rows.append(row[shift:] + row[:shift])
+        yield b"".join(rows)
+
+
+# Baseline JPEG (ITU T.81) pieces for _jpeg_image. The zigzag order lists
+# the natural index of each coefficient in scan order.
+_JPEG_ZIGZAG = sorted(
+    range(64),
+    key=lambda k: (
+        k // 8 + k % 8,
+        k // 8 if (k // 8 + k % 8) % 2 else k % 8,
+    ),
+)
+_JPEG_QUANT = [
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+]
+# Every DC category and every AC run/size symbol, each given a code of the
+# same length: 4 bits for the 12 DC symbols, 8 bits for the 162 AC ones.
+# The codes are valid canonical Huffman codes (no all-ones code), and
+# need no frequency tables.
+_JPEG_DC_SYMBOLS = list(range(12))
+_JPEG_AC_SYMBOLS = [0x00, 0xF0] + [
+    run << 4 | size for run in range(16) for size in range(1, 11)
+]
+_JPEG_DCT = [
+    [
+        (math.sqrt(0.5) if u == 0 else 1.0)
+        / 2
+        * math.cos((2 * x + 1) * u * math.pi / 16)
+        for x in range(8)
+    ]
+    for u in range(8)
+]
+# Distinct pre-encoded MCUs a JPEG is tiled from.
+JPEG_VARIANTS = 16
+
+
+def _jpeg_block(pixels):
+    """Quantized DCT coefficients of an 8x8 block (64 samples, row by
+    row), in zigzag order."""
+    shifted = [p - 128 for p in pixels]
+    rows = [
+        [
+            sum(_JPEG_DCT[v][x] * shifted[y * 8 + x] for x in range(8))
+            for v in range(8)
+        ]
+        for y in range(8)
+    ]
+    coefficients = [
+        sum(_JPEG_DCT[u][y] * rows[y][v] for y in range(8))
+        for u in range(8)
+        for v in range(8)
+    ]
+    return [round(coefficients[k] / _JPEG_QUANT[k]) for k in _JPEG_ZIGZAG]
+
+
+def _jpeg_mcu(blocks):
+    """Entropy-coded MCU of zigzag-ordered ``blocks`` (one per component),
+    padded to a byte boundary and byte-stuffed. The DC prediction starts
+    from zero, as it does after every restart marker."""
+    bits = []
+
+    def put(symbols, symbol, value, size):
+        code_len = 4 if symbols is _JPEG_DC_SYMBOLS else 8
+        bits.append(format(symbols.index(symbol), f"0{code_len}b"))
+        if size:
+            if value < 0:
+                value += (1 << size) - 1
+            bits.append(format(value, f"0{size}b"))
+
+    for block in blocks:
+        dc = block[0]
+        put(_JPEG_DC_SYMBOLS, abs(dc).bit_length(), dc, abs(dc).bit_length())
+        run = 0
+        last = max((k for k in range(1, 64) if block[k]), default=0)
+        for ac in block[1:last + 1]:
+            if not ac:
+                run += 1
+                continue
+            while run > 15:
+                put(_JPEG_AC_SYMBOLS, 0xF0, 0, 0)
+                run -= 16
+            size = abs(ac).bit_length()
+            put(_JPEG_AC_SYMBOLS, run << 4 | size, ac, size)
+            run = 0
+        if last < 63:
+            put(_JPEG_AC_SYMBOLS, 0x00, 0, 0)
+    bits = "".join(bits)
+    bits += "1" * (-len(bits) % 8)
+    data = int(bits, 2).to_bytes(len(bits) // 8, "big")
+    return data.replace(b"\xff", b"\xff\x00")
+
+
+_jpeg_mcus = []
+
+
+def _jpeg_variants():
+    """JPEG_VARIANTS textured YCbCr MCUs, encoded once per process."""
+    if not _jpeg_mcus:
+        rng = random.Random(0)
+        for i in range(JPEG_VARIANTS):
+            luma = [
+                min(255, max(0, 40 + 10 * i + 12 * x + rng.randrange(-40, 40)))
+                for y in range(8)
+                for x in range(8)
+            ]
+            chroma = [
+                [116 + 6 * (i % 5)] * 64,
+                [140 - 4 * (i % 7)] * 64,
+            ]
+            _jpeg_mcus.append(
+                _jpeg_mcu([_jpeg_block(b) for b in [luma, *chroma]])
+            )
+    return _jpeg_mcus
+
+
+def _jpeg_image(px, seed):
+    """Baseline YCbCr JPEG of ``px`` x ``px`` pixels (``px`` a multiple of
+    8). The restart interval is one MCU, so every MCU is coded
+    independently and the image can be tiled from pre-encoded variants;
+    a decoder still runs the full Huffman decode and IDCT per block."""
+    variants = _jpeg_variants()
+
+    def segment(marker, payload):
+        return struct.pack(">BBH", 0xFF, marker, len(payload) + 2) + payload
+
+    def huffman_table(table_class, symbols, code_len):
+        counts = [0] * 16
+        counts[code_len - 1] = len(symbols)
+        return bytes([table_class << 4]) + bytes(counts) + bytes(symbols)
+
+    header = [
+        b"\xff\xd8",
+        segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"),
+        segment(0xDB, b"\x00" + bytes(_JPEG_QUANT[k] for k in _JPEG_ZIGZAG)),
+        segment(
+            0xC0,
+            struct.pack(">BHHB", 8, px, px, 3)
+            + b"".join(bytes([c, 0x11, 0]) for c in (1, 2, 3)),
+        ),
+        segment(
+            0xC4,
+            huffman_table(0, _JPEG_DC_SYMBOLS, 4)
+            + huffman_table(1, _JPEG_AC_SYMBOLS, 8),
+        ),
+        segment(0xDD, struct.pack(">H", 1)),
+        segment(0xDA, b"\x03\x01\x00\x02\x00\x03\x00\x00\x3f\x00"),
+    ]
+    blocks = px // 8
+    scan = []
+    for y in range(blocks):
+        for x in range(blocks):
+            index = y * blocks + x
+            if index:
+                scan.append(bytes([0xFF, 0xD0 + (index - 1) % 8]))
+            scan.append(variants[(x * 5 + y * 3 + seed) % len(variants)])
+    return b"".join(header) + b"".join(scan) + b"\xff\xd9"
+
+
+def _image_objects(payload, first_num):
+    """(num, body) of every image of ``payload``, numbered from
+    ``first_num``."""
+    px = -(-payload["image_px"] // 8) * 8
+    for i in range(payload["images"]):
+        kind = payload["image_kind"]
+        if kind == "mixed":
+            kind = IMAGE_KINDS[i % len(IMAGE_KINDS)]
+        entries = (
+            b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace /DeviceRGB /BitsPerComponent 8" % (px, px)
+        )
+        if kind == "jpeg":
+            body = StreamBody(
+                entries + b" /Filter /DCTDecode", (_jpeg_image(px, i),)
+            )
+        elif kind == "flate":
+            body = StreamBody(
+                entries + b" /Filter /FlateDecode", _deflate(_image_rows(px, i))
+            )
+        else:
+            body = StreamBody(entries, _image_rows(px, i), px * px * 3)
+        yield first_num + i, body
+
+
+def _image_ops(count):
+    """Content stream operators painting images /Im1../Im<count> in a
+    5x3 grid over the lower part of the page; images past the 15th are
+    painted over the earlier ones."""
+    ops = []
+    for i in range(count):
+        x = 40 + (i % 5) * 104
+        y = 40 + (i // 5 % 3) * 104
+        ops.append(b"q 96 0 0 96 %d %d cm /Im%d Do Q" % (x, y, i + 1))
+    return b"\n".join(ops)
+
+
+class FieldTree:
+    """Synthetic AcroForm field hierarchy for stressing field collection.
+
+    ``fanout`` top-level fields each have ``fanout`` kids, down to
+    ``depth`` levels; the leaves are merged field/widget dicts and every
+    ``sig_every``-th leaf is a /Sig field whose /V is the document's one
+    real /Sig dict, the others are /Tx fields. ``shared`` parents of leaves
+    additionally list a leaf of their neighbour in /Kids, and ``cycles``
+    of them list their own top-level ancestor, so a walker without a
+    visited set either double counts or never terminates.
+
+    Objects are numbered breadth-first from ``first_num``, so every
+    number, parent and kid is computed arithmetically and nothing is kept
+    in memory however large the tree is.
+    """
+
+    MAX_FIELDS = 5_000_000
+
+    def __init__(self, fanout, depth, sig_every=1, shared=0, cycles=0):
+        if fanout < 1 or depth < 1 or sig_every < 1 or shared < 0 or cycles < 0:
+            raise ValueError("fanout, depth and sig-every must be positive")
+        self.fanout = fanout
+        self.depth = depth
+        self.sig_every = sig_every
+        self.shared = shared
+        self.cycles = cycles
+        self._level_sizes = [fanout ** (level + 1) for level in range(depth)]
+        if self.num_fields > self.MAX_FIELDS:
+            raise ValueError(
+                f"{self.num_fields} fields exceeds the limit of {self.MAX_FIELDS}"
+            )
+        if (shared or cycles) and depth < 2:
+            raise ValueError("shared and cyclic /Kids need depth >= 2")
+        if max(shared, cycles) > self._level_sizes[-2 if depth > 1 else -1]:
+            raise ValueError("more shared/cyclic /Kids than parents of leaves")
+
+    @property
+    def num_fields(self):
+        return sum(self._level_sizes)
+
+    @property
+    def num_signatures(self):
+        """/Sig leaves; each is collected exactly once by a visited-set walk,
+        since extra /Kids only point back at fields already in the tree."""
+        return len(range(0, self._level_sizes[-1], self.sig_every))
+
+    def roots(self, first_num):
+        return range(first_num, first_num + self.fanout)
+
+    def objects(self, first_num, sig_num, page_num):
+        """Yield (object number, body) for every field, breadth-first."""
+        fanout = self.fanout
+        starts = [first_num]
+        for size in self._level_sizes[:-1]:
+            starts.append(starts[-1] + size)
+
+        extra_kids = {}
+        if self.depth > 1:
+            level = self.depth - 2
+            count = self._level_sizes[level]
+            for i in range(self.shared):
+                index = i * count // self.shared
+                neighbour = (index + 1) % count
+                extra_kids.setdefault(index, []).append(
+                    starts[level + 1] + neighbour * fanout
+                )
+            for i in range(self.cycles):
+                index = count - 1 - i * count // self.cycles
+                root = index // fanout ** level
+                extra_kids.setdefault(index, []).append(starts[0] + root)
+
+        for level, size in enumerate(self._level_sizes):
+            is_leaf = level == self.depth - 1
+            for index in range(size):
+                num = starts[level] + index
+                parent = (
+                    b""
+                    if level == 0
+                    else b"/Parent %d 0 R " % (starts[level - 1] + index // fanout)
+                )
+                if is_leaf:
+                    if index % self.sig_every == 0:
+                        kind = b"/FT /Sig /T (s%d) /V %d 0 R" % (index, sig_num)
+                    else:
+                        kind = b"/FT /Tx /T (t%d)" % index
+                    yield num, (
+                        b"<< " + kind + b" " + parent + b"/Type /Annot "
+                        b"/Subtype /Widget /Rect [0 0 0 0] /F 4 /P %d 0 R >>"
+                        % page_num
+                    )
+                    continue
+                first_kid = starts[level + 1] + index * fanout
+                kids = list(range(first_kid, first_kid + fanout))
+                if level == self.depth - 2:
+                    kids += extra_kids.get(index, [])
+                yield num, (
+                    b"<< /T (f%d_%d) " % (level, index)
+                    + parent
+                    + b"/Kids ["
+                    + _refs(kids)
+                    + b"] >>"
+                )
+
+
+def parse_field_tree(text):
+    """Parse a --field-tree value into FieldTree keyword arguments."""
+    keys = {
+        "fanout": "fanout",
+        "depth": "depth",
+        "sig-every": "sig_every",
+        "shared": "shared",
+        "cycles": "cycles",
+    }
+    params = {}
+    for item in text.split(","):
+        key, sep, value = item.strip().partition("=")
+        if not sep or key not in keys:
+            raise argparse.ArgumentTypeError(
+                f"invalid field tree item {item!r}; expected "
+                f"{', '.join(f'{key}=N' for key in keys)}"
+            )
+        try:
+            params[keys[key]] = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid number in {item!r}") from None
+    if "fanout" not in params or "depth" not in params:
+        raise argparse.ArgumentTypeError("fanout=N and depth=N are required")
+    try:
+        FieldTree(**params)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError(str(ex)) from None
+    return params
+
+
+def parse_tail(text):
+    """Parse a --tail value into {"whitespace_mb", "garbage_at",
+    "updates"}."""
+    params = {"whitespace_mb": 0, "garbage_at": None, "updates": 0}
+    for item in text.split(","):
+        key, sep, value = item.strip().partition("=")
+        try:
+            if key == "whitespace-mb" and sep:
+                params["whitespace_mb"] = float(value)
+            elif key == "garbage-at" and sep:
+                params["garbage_at"] = int(value)
+            elif key == "updates" and sep:
+                params["updates"] = int(value)
+            else:
+                raise argparse.ArgumentTypeError(
+                    f"invalid tail item {item!r}; expected whitespace-mb=N, "
+                    f"garbage-at=N or updates=N"
+                )
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid number in {item!r}") from None
+    if params["whitespace_mb"] < 0 or params["updates"] < 0:
+        raise argparse.ArgumentTypeError(f"invalid tail {text!r}")
+    if params["garbage_at"] is not None and not (
+        0 <= params["garbage_at"] < _tail_whitespace(params)
+    ):
+        raise argparse.ArgumentTypeError(
+            "garbage-at=N must fall inside the whitespace-mb=N tail"
+        )
+    return params
+
+
+class PdfBuilder:
+    """Minimal PDF builder with a single /Sig field.
+
+    ``build()`` returns the PdfWriter holding the document and the
+    SigPlaceholder of its /Sig dict. The ByteRange is [0 0 0 0] and the
+    /Contents hex string is all zeros; the caller patches both in place
+    through the placeholder once the offsets are known.
+
+    By default the document has one page. A ``scale`` dict (see
+    parse_scale) adds filler pages under a balanced page tree, spreads
+    ``stream_bytes`` of no-op operators over their content streams and
+    pads the object count with unreferenced objects, without changing the
+    first page or the signature. A ``field_tree`` (FieldTree) is added to
+    /AcroForm /Fields next to the signature field.
+
+    With ``linearized`` the same objects are written in linearized ("fast
+    web view") layout instead, see _write_linearized. Object numbers then
+    differ from the classic layout; ``nums`` maps the names used below
+    ("catalog", "pages", "page", "field", ...) to the numbers written.
+    With ``xref_streams`` the classic layout uses an xref stream and
+    object streams (see PdfWriter).
+
+    A ``payload`` dict (see parse_payload) Flate-compresses the content
+    streams and/or draws images on the first page, so that the signed
+    ranges hold the kind of data real documents do.
+
+    The /Contents placeholder holds ``contents_len`` bytes, usually
+    _contents_len() of the spec that signs it, plus ``contents_slack``.
+    """
+
+    def __init__(
+        self,
+        page_text,
+        sub_filter="/adbe.pkcs7.detached",
+        scale=None,
+        field_tree=None,
+        linearized=False,
+        xref_streams=False,
+        contents_len=PLACEHOLDER_PKCS7_LEN,
+        contents_slack=0,
+        payload=None,
+    ):
+        if linearized and xref_streams:
+            raise ValueError("linearized output uses xref tables")
         self.page_text = page_text
         self.sub_filter = sub_filter
+        self.scale = scale
+        self.field_tree = field_tree
+        self.linearized = linearized
+        self.xref_streams = xref_streams
+        self.contents_len = contents_len + contents_slack
+        self.payload = payload
+        self.nums = None
+
+    def _number(
+        self, num_filler_pages, num_page_nodes, num_fields, num_images, objects
+    ):
+        """Object numbers for both layouts, keyed by name; ranges are given
+        by their first number."""
+        if not self.linearized:
+            # Objects 1-8 are the fixed skeleton (6 is unused); payload
+            # images, then scale objects start at 9.
+            nums = dict(
+                catalog=1, pages=2, page=3, field=4, sig=5, content=7, font=8
+            )
+            nums["images"] = 9
+            nums["filler_pages"] = nums["images"] + num_images
+            nums["page_nodes"] = nums["filler_pages"] + 2 * num_filler_pages
+            nums["fields"] = nums["page_nodes"] + num_page_nodes
+            nums["fillers"] = nums["fields"] + num_fields
+            nums["size"] = max(nums["fillers"], objects + 1)
+            return nums
+
+        # The rest of the document is numbered first, so the first-page
+        # section, which the first-page xref covers, is one run of
+        # numbers at the end. Each page's objects are numbered
+        # consecutively, which the hint tables assume.
+        # As many fillers as the classic layout has.
+        classic_fillers = (
+            9 + num_images + 2 * num_filler_pages + num_page_nodes + num_fields
+        )
+        num_fillers = max(0, objects + 1 - classic_fillers)
+        nums = {"filler_pages": 1}
+        nums["page_nodes"] = nums["filler_pages"] + 2 * num_filler_pages
+        nums["pages"] = nums["page_nodes"] + num_page_nodes
+        nums["fillers"] = nums["pages"] + 1
+        nums["linearization"] = nums["fillers"] + num_fillers
+        nums["catalog"] = nums["linearization"] + 1
+        nums["field"] = nums["catalog"] + 1
+        nums["sig"] = nums["field"] + 1
+        nums["fields"] = nums["sig"] + 1
+        nums["hint"] = nums["fields"] + num_fields
+        nums["page"] = nums["hint"] + 1
+        nums["content"] = nums["page"] + 1
+        # The font comes last in the first-page section, see _hint_stream.
+        nums["images"] = nums["content"] + 1
+        nums["font"] = nums["images"] + num_images
+        nums["size"] = nums["font"] + 1
+        return nums
 
     def build(self):
-        contents_stream = _content_stream_for(self.page_text)
+        """Write the document and return (writer, sig): the PdfWriter and
+        the SigPlaceholder of its signature."""
+        with _stage("build") as stage:
+            writer, sig = self._build()
+            stage["bytes"] = writer.pos
+        return writer, sig
+
+    def _build(self):
+        scale = self.scale or parse_scale("")
+        payload = self.payload or parse_payload("")
+        page_text = self.page_text
+        if self.scale:
+            page_text += "\n" + _describe_scale(scale) + "\n"
+        if self.payload:
+            page_text += "\n" + _describe_payload(payload) + "\n"
+        contents_stream = _content_stream_for(page_text)
+        if payload["images"]:
+            contents_stream += b"\n" + _image_ops(payload["images"])
+
+        num_filler_pages = scale["pages"] - 1
+        num_page_nodes = 0
+        level_size = num_filler_pages
+        while level_size >= PAGE_TREE_FANOUT:
+            level_size = -(-level_size // PAGE_TREE_FANOUT)
+            num_page_nodes += level_size
+        num_fields = self.field_tree.num_fields if self.field_tree else 0
+        nums = self.nums = self._number(
+            num_filler_pages,
+            num_page_nodes,
+            num_fields,
+            payload["images"],
+            scale["objects"],
+        )
+
+        filler_pages = range(nums["filler_pages"], nums["page_nodes"], 2)
+
+        # Group filler pages into /Pages nodes, bottom-up, until the root
+        # (which also holds the first page) stays within the fan-out.
+        next_node = nums["page_nodes"]
+        parents = {}
+        counts = dict.fromkeys(filler_pages, 1)
+        page_nodes = []
+        level = filler_pages
+        while len(level) >= PAGE_TREE_FANOUT:
+            next_level = []
+            for i in range(0, len(level), PAGE_TREE_FANOUT):
+                kids = level[i:i + PAGE_TREE_FANOUT]
+                for kid in kids:
+                    parents[kid] = next_node
+                counts[next_node] = sum(counts[kid] for kid in kids)
+                page_nodes.append((next_node, kids))
+                next_level.append(next_node)
+                next_node += 1
+            level = next_level
+        for kid in level:
+            parents[kid] = nums["pages"]
+        root_kids = [nums["page"], *level]
+
+        fields = [nums["field"]]
+        if self.field_tree:
+            fields += self.field_tree.roots(nums["fields"])
+
+        stream_bytes = scale["stream_bytes"]
+        if payload["flate"]:
+            # Compress the padding as it is generated rather than building
+            # all of it first.
+            chunks = [contents_stream]
+            if num_filler_pages == 0 and stream_bytes:
+                chunks = itertools.chain(
+                    chunks, [b"\n"], _padding_chunks(stream_bytes)
+                )
+            content_body = StreamBody(b"/Filter /FlateDecode", _deflate(chunks))
+        elif num_filler_pages == 0 and stream_bytes:
+            # Write the padding as it is generated.
+            content_body = StreamBody(
+                b"",
+                itertools.chain(
+                    [contents_stream, b"\n"], _padding_chunks(stream_bytes)
+                ),
+                len(contents_stream) + 1 + stream_bytes,
+            )
+        else:
+            content_body = (contents_stream,)
 
-        objs = {}
-        objs[1] = (
-            b"<< /Type /Catalog /Pages 2 0 R "
-            b"/AcroForm << /Fields [4 0 R] /SigFlags 3 >> >>"
+        # Bodies are bytes for dicts and tuples of parts for streams.
+        catalog = (
+            nums["catalog"],
+            b"<< /Type /Catalog /Pages %d 0 R " % nums["pages"]
+            + b"/AcroForm << /Fields [" + _refs(fields) + b"] /SigFlags 3 >> >>",
+        )
+        pages = (
+            nums["pages"],
+            b"<< /Type /Pages /Kids [" + _refs(root_kids) + b"] "
+            b"/Count " + str(scale["pages"]).encode("ascii") + b" >>",
         )
-        objs[2] = b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>"
-        objs[3] = (
-            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
-            b"/Contents 7 0 R /Resources << /Font << /F1 8 0 R >> >> >>"
+        xobjects = b""
+        if payload["images"]:
+            xobjects = b" /XObject << %s >>" % b" ".join(
+                b"/Im%d %d 0 R" % (i + 1, nums["images"] + i)
+                for i in range(payload["images"])
+            )
+        page = (
+            nums["page"],
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Contents %d 0 R /Resources << /Font << /F1 %d 0 R >>%s >> >>"
+            % (nums["pages"], nums["content"], nums["font"], xobjects),
         )
-        objs[4] = (
+        field = (
+            nums["field"],
             b"<< /Type /Annot /Subtype /Widget /FT /Sig /T (Signature1) "
-            b"/V 5 0 R /Rect [0 0 0 0] /F 4 /P 3 0 R >>"
-        )
-        # Object 5 (the /Sig dict) is built later because it contains the
-        # placeholders we need to patch.
-        objs[7] = (
-            b"<< /Length " + str(len(contents_stream)).encode("ascii") + b" >>\n"
-            b"stream\n" + contents_stream + b"\nendstream"
-        )
-        objs[8] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
-
-        # Emit header + objects 1-4, then build the /Sig dict knowing
-        # /Contents will sit at a precise offset.
-        chunks = [b"%PDF-1.7\n%\xc2\xa5\xc2\xb1\xc3\xab\n"]
-        offsets = {}
-
-        def emit_obj(num, body):
-            header = f"{num} 0 obj\n".encode("ascii")
-            offsets[num] = sum(len(c) for c in chunks)
-            chunks.append(header + body + b"\nendobj\n")
-
-        emit_obj(1, objs[1])
-        emit_obj(2, objs[2])
-        emit_obj(3, objs[3])
-        emit_obj(4, objs[4])
-
-        # Object 5 — the /Sig dict. We build the prefix, capture the
-        # offset of the '<' that starts /Contents, append the placeholder
-        # zeros, then continue with the rest.
-        sig_prefix = (
-            b"<< /Type /Sig "
-            b"/Filter /Adobe.PPKLite "
-            b"/SubFilter " + self.sub_filter.encode("ascii") + b" "
-            b"/M (D:20260509000000Z) "
-            b"/Reason (Test signature for pdf.js Digital signature properties UI) "
-            b"/ByteRange [0000000000 0000000000 0000000000 0000000000] "
-            b"/Contents <"
-        )
-        sig_suffix_zeros = b"0" * (PLACEHOLDER_PKCS7_LEN * 2)
-        sig_suffix_close = b"> >>"
-
-        obj5_header = b"5 0 obj\n"
-        offsets[5] = sum(len(c) for c in chunks)
-        chunks.append(obj5_header + sig_prefix)
-        contents_start_in_obj = sum(len(c) for c in chunks) - 1  # the '<' byte
-        chunks.append(sig_suffix_zeros)
-        chunks.append(sig_suffix_close)
-        chunks.append(b"\nendobj\n")
-
-        emit_obj(7, objs[7])
-        emit_obj(8, objs[8])
-
-        # xref + trailer.
-        xref_offset = sum(len(c) for c in chunks)
-        xref_lines = [b"xref\n0 9\n", b"0000000000 65535 f \n"]
-        for num in range(1, 9):
-            if num == 6:
-                xref_lines.append(b"0000000000 65535 f \n")
-                continue
-            off = offsets[num]
-            xref_lines.append(f"{off:010d} 00000 n \n".encode("ascii"))
-        chunks.extend(xref_lines)
-        chunks.append(
-            b"trailer\n<< /Size 9 /Root 1 0 R >>\nstartxref\n"
-            + str(xref_offset).encode("ascii")
-            + b"\n%%EOF\n"
+            b"/V %d 0 R /Rect [0 0 0 0] /F 4 /P %d 0 R >>"
+            % (nums["sig"], nums["page"]),
+        )
+        content = (nums["content"], content_body)
+        font = (
+            nums["font"], b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
         )
 
-        pdf = b"".join(chunks)
-        # Locate placeholders in the final byte string.
-        contents_open = pdf.index(b"/Contents <") + len(b"/Contents ")
-        # contents_open points at '<'; the hex blob starts right after.
-        hex_start = contents_open + 1
-        hex_end = hex_start + PLACEHOLDER_PKCS7_LEN * 2
-        assert pdf[hex_start:hex_end] == sig_suffix_zeros
-        assert pdf[hex_end:hex_end + 1] == b">"
+        def write_sig(writer):
+            return writer.sig_obj(
+                nums["sig"],
+                sub_filter=self.sub_filter,
+                signing_time=b"D:20260509000000Z",
+                reason=b"Test signature for pdf.js Digital signature properties UI",
+                contents_len=self.contents_len,
+            )
+
+        def filler_page_objects():
+            for i, num in enumerate(filler_pages):
+                yield (
+                    num,
+                    b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                    b"/Contents %d 0 R /Resources << /Font << /F1 %d 0 R >> >> >>"
+                    % (parents[num], num + 1, nums["font"]),
+                )
+                # Spread the padding evenly, giving the remainder to page 2.
+                padding = stream_bytes // num_filler_pages
+                if i == 0:
+                    padding += stream_bytes % num_filler_pages
+                header = (
+                    b"BT /F1 11 Tf 50 780 Td (Filler page %d of %d) Tj ET\n"
+                    % (i + 2, scale["pages"])
+                )
+                if payload["flate"]:
+                    yield num + 1, StreamBody(
+                        b"/Filter /FlateDecode",
+                        _deflate(
+                            itertools.chain([header], _padding_chunks(padding))
+                        ),
+                    )
+                else:
+                    yield num + 1, StreamBody(
+                        b"",
+                        itertools.chain([header], _padding_chunks(padding)),
+                        len(header) + padding,
+                    )
+
+        def page_node_objects():
+            for num, kids in page_nodes:
+                yield (
+                    num,
+                    b"<< /Type /Pages /Parent %d 0 R /Kids [" % parents[num]
+                    + _refs(kids)
+                    + b"] /Count %d >>" % counts[num],
+                )
+
+        def field_objects():
+            if self.field_tree:
+                yield from self.field_tree.objects(
+                    nums["fields"], nums["sig"], nums["page"]
+                )
+
+        def filler_objects():
+            end = nums.get("linearization", nums["size"])
+            for num in range(nums["fillers"], end):
+                yield num, b"<< /Filler %d >>" % num
+
+        # Linearized output inserts the hint stream in the middle, so it is
+        # always built in memory.
+        writer = PdfWriter(
+            xref_streams=self.xref_streams,
+            spool_dir=None if self.linearized else SPOOL_DIR,
+        )
+        writer.write(b"%PDF-1.7\n%\xc2\xa5\xc2\xb1\xc3\xab\n")
+        if self.linearized:
+
+            def write_document():
+                _write_objects(writer, [catalog, field])
+                sig = write_sig(writer)
+                _write_objects(writer, field_objects())
+                return sig
+
+            sig = self._write_linearized(
+                writer,
+                document=write_document,
+                first_page=[
+                    page,
+                    content,
+                    *_image_objects(payload, nums["images"]),
+                    font,
+                ],
+                rest=[
+                    filler_page_objects(),
+                    page_node_objects(),
+                    [pages],
+                    filler_objects(),
+                ],
+                num_pages=scale["pages"],
+            )
+            return writer, sig
+
+        _write_objects(writer, [catalog, pages, page, field])
+        sig = write_sig(writer)
+        _write_objects(writer, [content, font])
+        for objects in (
+            _image_objects(payload, nums["images"]),
+            filler_page_objects(),
+            page_node_objects(),
+            field_objects(),
+            filler_objects(),
+        ):
+            _write_objects(writer, objects)
+        # Object 6 is unused.
+        writer.write_xref(size=nums["size"], root=nums["catalog"], free=(0, 6))
+        return writer, sig
+
+    def _write_linearized(self, writer, *, document, first_page, rest, num_pages):
+        """Write the document in the layout of ISO 32000-1, Annex F.
+
+        After the header come the linearization dict and the first-page
+        xref section, then the document-level objects (catalog, AcroForm
+        fields and the /Sig dict), the hint stream and the first page's
+        objects; everything else follows, with the main xref at the end.
+        ``document`` writes the document-level objects and returns the
+        SigPlaceholder, ``first_page`` lists the (num, body) of the first
+        page, its content stream and its font (shared with every other
+        page), and ``rest`` holds iterables of the remaining objects, the
+        filler pages first, each page followed by its content stream.
+
+        The dict, xref section and trailer at the top hold offsets that are
+        only known at the end, so they are reserved with fixed width and
+        patched last. Hint table offsets are those of the file without the
+        hint stream, so the stream is built once everything else is laid
+        out and then inserted, shifting what follows.
+        """
+        nums = self.nums
+        lin_at = writer.pos
+        writer.write(b" " * LINEARIZATION_DICT_LEN)
+        first_xref_at = writer.pos
+        first_count = nums["size"] - nums["linearization"]
+        writer.write(b" " * (
+            len(b"xref\n%d %d\n" % (nums["linearization"], first_count))
+            + 20 * first_count
+            + LINEARIZED_TRAILER_LEN
+        ))
+        writer.write(b"startxref\n0\n%%EOF\n")
+
+        sig = document()
+        hint_at = writer.pos
+        _write_objects(writer, first_page)
+        first_page_end = writer.pos
+        for objects in rest:
+            _write_objects(writer, objects)
+        end = writer.pos
+
+        offsets = writer.xref_entries
+        hint = _hint_stream(
+            nums,
+            offsets,
+            num_pages=num_pages,
+            first_page=[num for num, _ in first_page],
+            first_page_end=first_page_end,
+            end=end,
+        )
+        hint_obj = b"%d 0 obj\n<< /Length %d /S %d >>\nstream\n" % (
+            nums["hint"], len(hint[0]) + len(hint[1]), len(hint[0])
+        ) + hint[0] + hint[1] + b"\nendstream\nendobj\n"
+        writer.buf[hint_at:hint_at] = hint_obj
+        for num, off in offsets.items():
+            if off >= hint_at:
+                offsets[num] = off + len(hint_obj)
+        offsets[nums["hint"]] = hint_at
+        first_page_end += len(hint_obj)
+
+        # Main xref: object 0 and the rest of the document.
+        main_xref_at = writer.pos
+        writer.write(b"xref\n0 %d\n0000000000 65535 f \n" % nums["linearization"])
+        main_entries_at = writer.pos - 20
+        writer.write(b"".join(
+            b"%010d 00000 n \n" % offsets[num]
+            for num in range(1, nums["linearization"])
+        ))
+        writer.write(
+            b"trailer\n<< /Size %d >>\nstartxref\n%d\n%%%%EOF\n"
+            % (nums["linearization"], first_xref_at)
+        )
 
-        return bytearray(pdf), contents_open, hex_start, hex_end
+        # Fill in the top of the file.
+        offsets[nums["linearization"]] = lin_at
+        first_xref = [b"xref\n%d %d\n" % (nums["linearization"], first_count)]
+        first_xref += [
+            b"%010d 00000 n \n" % offsets[num]
+            for num in range(nums["linearization"], nums["size"])
+        ]
+        first_xref.append(
+            b"trailer\n<< /Size %d /Root %d 0 R /Prev %d >>"
+            % (nums["size"], nums["catalog"], main_xref_at)
+        )
+        first_xref = b"".join(first_xref)
+        writer.buf[first_xref_at:first_xref_at + len(first_xref)] = first_xref
+        lin = (
+            b"%d 0 obj\n<< /Linearized 1 /L %d /H [%d %d] /O %d /E %d "
+            b"/N %d /T %d >>\nendobj\n"
+            % (
+                nums["linearization"],
+                writer.pos,
+                hint_at,
+                len(hint_obj),
+                nums["page"],
+                first_page_end,
+                num_pages,
+                # The white-space before the first main xref entry.
+                main_entries_at - 1,
+            )
+        )
+        writer.buf[lin_at:lin_at + len(lin)] = lin
 
+        # An incremental update links to the first-page xref section, which
+        # links on to the main one.
+        writer.xref_entries = {}
+        writer.startxref = first_xref_at
+        writer.size = nums["size"]
+        return sig
 
-def _patch_byte_range(pdf, byte_range):
-    placeholder = b"/ByteRange [0000000000 0000000000 0000000000 0000000000]"
-    a, b_, c, d = byte_range
-    replacement = (
-        f"/ByteRange [{a:010d} {b_:010d} {c:010d} {d:010d}]".encode("ascii")
+
+# Space reserved for the linearization dict and the first-page trailer,
+# which are patched in once the offsets they hold are known.
+LINEARIZATION_DICT_LEN = 160
+LINEARIZED_TRAILER_LEN = 100
+
+
+# Body of a stream with extra dict ``entries``, for _write_objects.
+StreamBody = collections.namedtuple(
+    "StreamBody", "entries parts length", defaults=[None]
+)
+
+
+def _write_objects(writer, objects):
+    """Write (num, body) pairs: bytes bodies as dicts, tuples of parts as
+    streams and StreamBody bodies as streams with extra dict entries. The
+    parts of a StreamBody may be a generator, written as it is consumed;
+    its /Length is then ``length``, or patched in afterwards if that is
+    None (see PdfWriter.stream_obj_chunks)."""
+    for num, body in objects:
+        if isinstance(body, StreamBody) and isinstance(body.parts, tuple):
+            writer.stream_obj(num, *body.parts, entries=body.entries)
+        elif isinstance(body, StreamBody):
+            writer.stream_obj_chunks(
+                num, body.parts, body.length, entries=body.entries
+            )
+        elif isinstance(body, tuple):
+            writer.stream_obj(num, *body)
+        else:
+            writer.obj(num, body)
+
+
+def _pack_bits(values, nbits):
+    """Big-endian ``nbits``-wide fields, padded to a whole byte as every
+    hint table item must be."""
+    bits = "".join(format(value, f"0{nbits}b") for value in values)
+    if not bits:
+        return b""
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big")
+
+
+def _hint_stream(nums, offsets, *, num_pages, first_page, first_page_end, end):
+    """Page offset and shared object hint tables (ISO 32000-1, F.4) for
+    the layout written by PdfBuilder._write_linearized, as two byte strings.
+
+    ``offsets`` are those of the file without the hint stream. Every page
+    but the first is a page object followed by its content stream; the
+    first page's objects make up the shared object table, with the font
+    every other page refers to as its last entry.
+    """
+    starts = sorted(offsets.values())
+    starts.append(end)
+
+    def length(num):
+        off = offsets[num]
+        return starts[bisect.bisect_right(starts, off)] - off
+
+    font_id = len(first_page) - 1
+    pages = []
+    page = nums["page"]
+    pages.append(
+        (
+            len(first_page),
+            first_page_end - offsets[page],
+            offsets[nums["content"]] - offsets[page],
+            length(nums["content"]),
+            # The first page's shared objects are in its own section, so
+            # it lists none.
+            [],
+        )
+    )
+    for num in range(nums["filler_pages"], nums["page_nodes"], 2):
+        pages.append(
+            (
+                2,
+                offsets[num + 1] + length(num + 1) - offsets[num],
+                offsets[num + 1] - offsets[num],
+                length(num + 1),
+                [font_id],
+            )
+        )
+
+    def least_and_bits(values):
+        least = min(values)
+        return least, (max(values) - least).bit_length()
+
+    columns = list(zip(*pages))
+    header = []
+    rows = []
+    for index, values in enumerate(columns[:4]):
+        least, nbits = least_and_bits(values)
+        header.append((least, nbits))
+        rows.append(_pack_bits([value - least for value in values], nbits))
+    shared = columns[4]
+    nshared_bits = max(len(ids) for ids in shared).bit_length()
+    id_bits = font_id.bit_length()
+    (least_objs, objs_bits), (least_len, len_bits), (least_coff, coff_bits), (
+        least_clen,
+        clen_bits,
+    ) = header
+    page_table = struct.pack(
+        ">IIHIHIHIHHHHH",
+        least_objs,
+        offsets[page],
+        objs_bits,
+        least_len,
+        len_bits,
+        least_coff,
+        coff_bits,
+        least_clen,
+        clen_bits,
+        nshared_bits,
+        id_bits,
+        0,
+        1,
+    )
+    page_table += rows[0] + rows[1]
+    page_table += _pack_bits([len(ids) for ids in shared], nshared_bits)
+    page_table += _pack_bits([i for ids in shared for i in ids], id_bits)
+    # No numerators: they have zero width.
+    page_table += rows[2] + rows[3]
+
+    group_lengths = [length(num) for num in first_page]
+    least_group, group_bits = least_and_bits(group_lengths)
+    shared_table = struct.pack(
+        ">IIIIHIH",
+        # No shared objects section: every shared object is on page 1.
+        0,
+        0,
+        len(first_page),
+        len(first_page),
+        0,
+        least_group,
+        group_bits,
+    )
+    shared_table += _pack_bits(
+        [value - least_group for value in group_lengths], group_bits
     )
-    assert len(replacement) == len(placeholder)
-    idx = pdf.index(placeholder)
-    pdf[idx:idx + len(placeholder)] = replacement
+    # No group is covered by an MD5 signature.
+    shared_table += _pack_bits([0] * len(first_page), 1)
+    return page_table, shared_table
+
+
+def _refs(nums):
+    return b" ".join(b"%d 0 R" % num for num in nums)
+
+
+def _patch_byte_range(pdf, byte_range_at, byte_range):
+    a, b_, c, d = byte_range
+    replacement = f"{a:010d} {b_:010d} {c:010d} {d:010d}".encode("ascii")
+    end = byte_range_at + len(BYTE_RANGE_PLACEHOLDER)
+    assert len(replacement) == len(BYTE_RANGE_PLACEHOLDER)
+    assert pdf[byte_range_at:end] == BYTE_RANGE_PLACEHOLDER
+    pdf[byte_range_at:end] = replacement
 
 
 def _splice_pkcs7(pdf, hex_start, hex_end, pkcs7_der):
@@ -281,12 +2158,121 @@ def _splice_pkcs7(pdf, hex_start, hex_end, pkcs7_der):
     if len(pkcs7_hex) > (hex_end - hex_start):
         raise SystemExit(
             f"PKCS#7 ({len(pkcs7_hex) // 2} bytes) larger than placeholder "
-            f"({(hex_end - hex_start) // 2})"
+            f"({(hex_end - hex_start) // 2}); retry with --contents-slack"
         )
     padded = pkcs7_hex.ljust(hex_end - hex_start, b"0")
     pdf[hex_start:hex_end] = padded
 
 
+def _digest_byte_range(pdf, byte_range):
+    """SHA-256 hex digest of the two signed spans, hashed in place."""
+    a, b, c, d = byte_range
+    h = hashlib.sha256()
+    with memoryview(pdf) as view:
+        h.update(view[a:a + b])
+        h.update(view[c:c + d])
+    return h.hexdigest()
+
+
+class RangeHasher:
+    """SHA-256 digests of the /ByteRange spans of successive signatures
+    in one file, resuming from a checkpoint instead of rehashing the file
+    from byte zero for each.
+
+    Every signature covers [0, b) and [c, c + d), where [b, c) is its
+    /Contents gap, and every later revision's b lies past the earlier
+    ones. So the state over [0, b) is kept, and the next digest hashes
+    only from there (through the earlier gap, spliced by then) to its own
+    gap, plus its own second span: over K revisions about twice the file
+    instead of K times. Bytes before the last gap must not change after
+    a digest. Ranges of any other shape are hashed from scratch.
+    """
+
+    def __init__(self):
+        self._state = hashlib.sha256()
+        self._pos = 0
+        # Bytes hashed so far, for --profile.
+        self.hashed = 0
+
+    def hexdigest(self, pdf, byte_range):
+        a, b, c, d = byte_range
+        if a != 0 or b < self._pos:
+            self.hashed += max(b, 0) + max(d, 0)
+            return _digest_byte_range(pdf, byte_range)
+        with memoryview(pdf) as view:
+            self._state.update(view[self._pos:b])
+            h = self._state.copy()
+            h.update(view[c:c + d])
+        self.hashed += b - self._pos + d
+        self._pos = b
+        return h.hexdigest()
+
+
+# The /Sig dict PdfWriter.sig_obj writes, with the SubFilter, ByteRange
+# and /Contents values as groups.
+_SIG_DICT_RE = re.compile(
+    rb"/SubFilter (/[^\s/]+) /M \([^)]*\) /Reason \([^)]*\) "
+    rb"/ByteRange (\[[0-9 ]+\]) (/Contents <([0-9A-Fa-f]*)>)"
+)
+
+_BYTE_RANGE_RE = re.compile(rb"/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]")
+
+
+def _find_byte_ranges(data, start=0, end=None):
+    """The values of every well-formed /ByteRange of ``data`` (between
+    ``start`` and ``end``), in file order, whoever wrote the /Sig dict."""
+    if end is None:
+        end = len(data)
+    byte_ranges = []
+    # A plain find skips the bulk of the file much faster than a regex.
+    pos = data.find(b"/ByteRange", start, end)
+    while pos != -1:
+        match = _BYTE_RANGE_RE.match(data, pos, min(pos + 100, end))
+        if match:
+            byte_ranges.append([int(v) for v in match.groups()])
+        pos = data.find(b"/ByteRange", pos + 1, end)
+    return byte_ranges
+
+
+# What pdf.js's #coversWholeDocument accepts after the signed range, in
+# the order it tests for them: a space is the slowest byte to accept.
+TAIL_WHITESPACE = b"\x00\t\n\x0c\r "
+_TAIL_SCAN_CHUNK = 1024 * 1024
+
+
+def _covers_whole_document(data, signed_end, end=None):
+    """Whether only whitespace follows ``signed_end`` in ``data`` (up to
+    ``end``), as coversWholeDocument requires. An incremental update
+    after the signature always adds other bytes too. Like pdf.js, the
+    tail is scanned in chunks and the scan stops at the first other
+    byte."""
+    if end is None:
+        end = len(data)
+    for begin in range(signed_end, end, _TAIL_SCAN_CHUNK):
+        chunk = data[begin:min(begin + _TAIL_SCAN_CHUNK, end)]
+        if chunk.translate(None, TAIL_WHITESPACE):
+            return False
+    return True
+
+
+def _signature_entries(pdf):
+    """The /ByteRange, the SHA-256 digest of the signed spans and whether
+    it covers the whole document, of every /Sig dict in ``pdf``, in file
+    (i.e. signing) order."""
+    entries = []
+    hasher = RangeHasher()
+    for byte_range in _find_byte_ranges(pdf):
+        signed_end = byte_range[2] + byte_range[3]
+        entries.append(
+            {
+                "byte_range": byte_range,
+                "sha256": hasher.hexdigest(pdf, byte_range),
+                "covers_whole_document": _covers_whole_document(pdf, signed_end),
+            }
+        )
+    return entries
+
+
 # ---------------------------------------------------------------------
 # Cases
 # ---------------------------------------------------------------------
@@ -295,11 +2281,13 @@ def _splice_pkcs7(pdf, hex_start, hex_end, pkcs7_der):
 CASES = []
 
 
-def _register(name, page_text, spec_template, *, sub_filter="/adbe.pkcs7.detached", post_process=None):
+def _register(name, page_text, spec_template, *, status, sub_filter="/adbe.pkcs7.detached", post_process=None):
     """Register a single-signature case.
 
     ``spec_template`` is a string with ``{sha256}`` replaced by the
     computed digest at generation time.
+    ``status`` is the verifier status the page text describes, recorded
+    in the manifest.
     ``post_process(pdf)`` runs after splicing the PKCS#7, allowing the
     "invalid" case to flip a byte inside the ByteRange.
     """
@@ -307,6 +2295,7 @@ def _register(name, page_text, spec_template, *, sub_filter="/adbe.pkcs7.detache
         "name": name,
         "page_text": page_text,
         "spec_template": spec_template,
+        "status": status,
         "sub_filter": sub_filter,
         "post_process": post_process,
     })
@@ -345,6 +2334,7 @@ signer:
 issuer:pdf-sign-ca
 subject:test-pdf-signer
 """,
+    status="verified",
 )
 
 _register(
@@ -370,6 +2360,7 @@ signer:
 issuer:Untrusted Self-Signed Test Root
 subject:Untrusted Self-Signed Test Root
 """,
+    status="untrusted",
 )
 
 _register(
@@ -397,6 +2388,7 @@ signer:
 issuer:pdf-sign-ca-expired
 subject:test-pdf-signer-expired
 """,
+    status="expired",
 )
 
 
@@ -406,10 +2398,20 @@ def _tamper_byterange(pdf):
     marker = b"signed_invalid"
     # The page text contains the file's name, so flipping a letter inside
     # the marker is guaranteed to fall within the ByteRange.
-    idx = pdf.index(marker)
+    idx = pdf.find(marker)
+    if idx < 0:
+        # The page text is Flate-compressed (--payload flate).
+        _tamper_header(pdf)
+        return
     pdf[idx] = ord("S") if pdf[idx] == ord("s") else ord("s")
 
 
+def _tamper_header(pdf):
+    """Flip a byte of the binary comment after the header: every
+    signature covers it, and the page stays readable."""
+    pdf[pdf.index(b"\n%") + 2] ^= 1
+
+
 _register(
     "signed_invalid",
     PAGE_HEADER + """\
@@ -432,6 +2434,7 @@ signer:
 issuer:pdf-sign-ca
 subject:test-pdf-signer
 """,
+    status="invalid",
     post_process=_tamper_byterange,
 )
 
@@ -455,6 +2458,7 @@ No "View certificate" button (no certificate to show).
     # Spec is irrelevant (we do not actually call pycms for this case);
     # the placeholder zeros stay in /Contents.
     None,
+    status="unknown",
     sub_filter="/ETSI.CAdES.detached",
 )
 
@@ -464,181 +2468,390 @@ No "View certificate" button (no certificate to show).
 # ---------------------------------------------------------------------
 
 
-def _build_single(case):
-    builder = PdfBuilder(case["page_text"], sub_filter=case["sub_filter"])
-    pdf, contents_open, hex_start, hex_end = builder.build()
-    file_len = len(pdf)
-    a = 0
-    b = contents_open  # bytes up to and including '<'? We want bytes up to '<' EXclusive.
+def _sign_placeholder(
+    writer, sig, spec_template, *, page_text, sub_filter, hasher=None
+):
+    """Patch ByteRange for a signature ending at the current position, then
+    hash the signed spans and splice in the PKCS#7 (unless there is no
+    spec, in which case /Contents stays zero-filled).
+
+    Pass the same RangeHasher for every signature of a file to hash each
+    revision once rather than the whole file again."""
+    pdf = writer.buf
+    byte_range = sig.byte_range(writer.pos)
+    _patch_byte_range(pdf, sig.byte_range_at, byte_range)
+    if spec_template is None:
+        return
+    hasher = hasher or RangeHasher()
+    with _stage("hash") as stage:
+        hashed = hasher.hashed
+        digest = hasher.hexdigest(pdf, byte_range)
+        stage["bytes"] = hasher.hashed - hashed
+    pkcs7_der = sign_digest(
+        spec_template, digest, page_text=page_text, sub_filter=sub_filter
+    )
+    with _stage("splice", sig.hex_end - sig.hex_start):
+        _splice_pkcs7(pdf, sig.hex_start, sig.hex_end, pkcs7_der)
+
+
+def _build_single(case, scale=None, layout=None):
+    builder = PdfBuilder(
+        case["page_text"],
+        sub_filter=case["sub_filter"],
+        scale=scale,
+        contents_len=_contents_len(case["spec_template"]),
+        **(layout or {}),
+    )
+    writer, sig = builder.build()
     # /Contents <abcdef...> — the bytes covered by ByteRange are everything
-    # except the hex string between '<' and '>'. So b = contents_open + 1
-    # (include the '<') and c = hex_end (the '>'), d = file_len - hex_end.
-    b = contents_open + 1
-    c = hex_end
-    d = file_len - hex_end
-    _patch_byte_range(pdf, (a, b, c, d))
+    # except the hex string between '<' and '>'; spec-less cases (the
+    # "unknown" one) keep the /Contents zeros.
+    _sign_placeholder(
+        writer,
+        sig,
+        case["spec_template"],
+        page_text=case["page_text"],
+        sub_filter=case["sub_filter"],
+    )
+    pdf = writer.buf
+    if case["spec_template"] is not None and case.get("post_process"):
+        with _stage("post_process", len(pdf)):
+            case["post_process"](pdf)
+    return pdf
+
 
-    if case["spec_template"] is None:
-        # "unknown" case — leave /Contents zeros.
-        return pdf
+# Multi-signature cases use incremental updates: build an inner-signed
+# PDF first, then append one incremental update per additional signature,
+# each adding a new /Sig field whose /ByteRange covers the entire file
+# as it stands after that update.
+
+def _build_chain(page_text, spec_templates, scale=None, layout=None):
+    """PDF signed once per entry of ``spec_templates``, innermost first;
+    see _write_chain."""
+    writer, _, _ = _write_chain(page_text, spec_templates, scale, layout)
+    return writer.buf
+
+
+def _write_chain(
+    page_text,
+    spec_templates,
+    scale=None,
+    layout=None,
+    sub_filter="/adbe.pkcs7.detached",
+):
+    """Write a PDF signed once per entry of ``spec_templates``, innermost
+    first, and return (writer, nums, fields): the PdfWriter, the object
+    numbers of the base document and the Sig fields of every revision.
+
+    The first signature is created normally over the base document. Every
+    further signature is appended as its own incremental update: a new
+    Sig field and /Sig dict, the catalog rewritten with an /AcroForm
+    listing every field so far, and an xref section holding only those
+    objects and chaining to the previous one through /Prev. Each
+    signature is an independent CMS message over its own /ByteRange span,
+    exactly the pattern issue17169.pdf uses.
+
+    ``layout`` holds PdfBuilder's layout options. With xref streams every
+    update has its own xref stream and object stream. On a linearized
+    base the first update invalidates the linearization (its /L no longer
+    matches the file length), as it does for any linearized document
+    signed after the fact.
+
+    Every signature uses ``sub_filter``; a None entry of
+    ``spec_templates`` leaves its /Contents zero-filled.
+    """
+    builder = PdfBuilder(
+        page_text,
+        sub_filter=sub_filter,
+        scale=scale,
+        contents_len=_contents_len(spec_templates[0]),
+        **(layout or {}),
+    )
+    writer, sig = builder.build()
+    # Later revisions only hash what they add.
+    hasher = RangeHasher()
+    _sign_placeholder(
+        writer,
+        sig,
+        spec_templates[0],
+        page_text=page_text,
+        sub_filter=sub_filter,
+        hasher=hasher,
+    )
 
-    digest = hashlib.sha256(bytes(pdf[a:a + b]) + bytes(pdf[c:c + d])).hexdigest()
-    spec_text = case["spec_template"].format(sha256=digest)
-    pkcs7_der = run_pycms(spec_text)
-    _splice_pkcs7(pdf, hex_start, hex_end, pkcs7_der)
+    nums = builder.nums
+    fields = [nums["field"]]
+    for revision, spec_template in enumerate(spec_templates[1:], start=1):
+        # New objects are numbered after everything written so far (9 and
+        # 10 for the first update of an unscaled, classic document).
+        field_num = writer.size
+        fields.append(field_num)
+        writer.write(b"\n")
+        writer.obj(
+            field_num,
+            b"<< /Type /Annot /Subtype /Widget /FT /Sig /T (Signature%d) "
+            b"/V %d 0 R /Rect [0 0 0 0] /F 4 /P %d 0 R >>"
+            % (revision + 1, field_num + 1, nums["page"]),
+        )
+        sig = writer.sig_obj(
+            field_num + 1,
+            sub_filter=sub_filter,
+            signing_time=b"D:%sZ" % _signing_time(revision),
+            reason=b"Outer signature for sub-signature test",
+            contents_len=_contents_len(spec_template)
+            + (layout or {}).get("contents_slack", 0),
+        )
+        writer.obj(
+            nums["catalog"],
+            b"<< /Type /Catalog /Pages %d 0 R " % nums["pages"]
+            + b"/AcroForm << /Fields [" + _refs(fields) + b"] /SigFlags 3 >> >>",
+        )
+        writer.write_xref(size=field_num + 2, root=nums["catalog"])
+
+        # ByteRange numbers are fixed-width, so this revision's ByteRange
+        # can be patched now that its end is known.
+        _sign_placeholder(
+            writer,
+            sig,
+            spec_template,
+            page_text=page_text,
+            sub_filter=sub_filter,
+            hasher=hasher,
+        )
+    return writer, nums, fields
+
+
+def _signing_time(seconds):
+    """/M value for the signature made ``seconds`` after the first one."""
+    when = datetime.datetime(2026, 5, 9) + datetime.timedelta(seconds=seconds)
+    return when.strftime("%Y%m%d%H%M%S").encode("ascii")
+
+
+def _build_multi(
+    name,
+    page_text,
+    inner_spec_template,
+    outer_spec_template,
+    scale=None,
+    layout=None,
+):
+    """Two-signature PDF: an inner signature plus one incremental update
+    whose outer signature covers the full file."""
+    return _build_chain(
+        page_text, [inner_spec_template, outer_spec_template], scale, layout
+    )
 
-    if case.get("post_process"):
-        case["post_process"](pdf)
 
-    return pdf
+def _build_revision_chain(depth, scale=None, layout=None):
+    """``depth`` verified signatures, each in its own incremental update."""
+    return _build_chain(
+        _chain_page_text(depth), [SPEC_VERIFIED] * depth, scale, layout
+    )
 
 
-# Multi-signature cases use incremental updates: build an inner-signed
-# PDF first, then append additional objects + a second /Sig field whose
-# /ByteRange covers the entire updated file.
+def _chain_page_text(depth):
+    return PAGE_HEADER + f"""\
+Expected verification state: VERIFIED ({depth}-signature revision chain)
 
-def _build_multi(name, page_text, inner_spec_template, outer_spec_template):
-    """Two-signature PDF.
+The document was signed once and then countersigned {depth - 1} times.
+Every countersignature lives in its own incremental update with its
+own Sig field, /Sig dict and xref section, chained through /Prev, and
+its /ByteRange covers the whole file as of that update. Every
+signature is leaf <- pdf-sign-ca -> verified.
 
-    The inner signature is created normally over a single-page PDF.
-    Then we incrementally append a new /AcroForm referencing both Sig
-    fields and a second /Sig dict whose /ByteRange covers the full
-    file. Both signatures are independent CMS messages over their own
-    /ByteRange spans, exactly the pattern issue17169.pdf uses.
-    """
-    inner = PdfBuilder(page_text, sub_filter="/adbe.pkcs7.detached")
-    pdf, c_open, h_start, h_end = inner.build()
-    a, b = 0, c_open + 1
-    c = h_end
-    d = len(pdf) - h_end
-    _patch_byte_range(pdf, (a, b, c, d))
-    digest = hashlib.sha256(bytes(pdf[a:a + b]) + bytes(pdf[c:c + d])).hexdigest()
-    pkcs7_der = run_pycms(inner_spec_template.format(sha256=digest))
-    _splice_pkcs7(pdf, h_start, h_end, pkcs7_der)
-
-    inner_pdf = bytes(pdf)
-
-    # Incremental update: append updated catalog with a second /Sig field
-    # plus the new /Sig dict + xref + trailer. Each new object gets a new
-    # number; we reuse 9, 10, 11, 12 for second sig field, second sig
-    # dict, updated catalog, and updated AcroForm.
-
-    # Build the appended chunk with placeholders we can patch in place.
-    update_offsets = {}
-    update_chunks = []
-
-    # Object 9: second Sig field annot.
-    update_chunks.append(b"\n9 0 obj\n")
-    update_offsets[9] = len(inner_pdf) + sum(len(c) for c in update_chunks) - len(b"\n9 0 obj\n")
-    update_chunks.append(
-        b"<< /Type /Annot /Subtype /Widget /FT /Sig /T (Signature2) "
-        b"/V 10 0 R /Rect [0 0 0 0] /F 4 /P 3 0 R >>\nendobj\n"
-    )
-
-    # Object 10: second Sig dict (placeholders).
-    sig_prefix = (
-        b"<< /Type /Sig "
-        b"/Filter /Adobe.PPKLite "
-        b"/SubFilter /adbe.pkcs7.detached "
-        b"/M (D:20260509000001Z) "
-        b"/Reason (Outer signature for sub-signature test) "
-        b"/ByteRange [0000000000 0000000000 0000000000 0000000000] "
-        b"/Contents <"
-    )
-    sig_zeros = b"0" * (PLACEHOLDER_PKCS7_LEN * 2)
-    update_chunks.append(b"10 0 obj\n")
-    update_offsets[10] = len(inner_pdf) + sum(len(c) for c in update_chunks) - len(b"10 0 obj\n")
-    update_chunks.append(sig_prefix)
-    contents_open_2 = len(inner_pdf) + sum(len(c) for c in update_chunks) - 1  # '<'
-    update_chunks.append(sig_zeros)
-    update_chunks.append(b">")
-    update_chunks.append(b" >>\nendobj\n")
-
-    # Object 1 (catalog) updated to point at a new AcroForm with both
-    # fields. We rewrite the same number; the xref will mark it as
-    # generation 0 again with a new offset.
-    update_chunks.append(b"1 0 obj\n")
-    update_offsets[1] = len(inner_pdf) + sum(len(c) for c in update_chunks) - len(b"1 0 obj\n")
-    update_chunks.append(
-        b"<< /Type /Catalog /Pages 2 0 R "
-        b"/AcroForm << /Fields [4 0 R 9 0 R] /SigFlags 3 >> >>\nendobj\n"
-    )
-
-    appended = b"".join(update_chunks)
-    pdf = bytearray(inner_pdf + appended)
-
-    # Compute final positions of the new placeholder.
-    hex_start_2 = contents_open_2 + 1
-    hex_end_2 = hex_start_2 + PLACEHOLDER_PKCS7_LEN * 2
-    assert pdf[contents_open_2:contents_open_2 + 1] == b"<"
-    assert pdf[hex_end_2:hex_end_2 + 1] == b">"
-
-    # Build incremental xref table.
-    # Pre-xref offset for startxref.
-    pre_xref = bytearray(pdf)
-
-    # Patch ByteRange of outer Sig: covers everything except the hex
-    # blob inside the second /Contents.
-    outer_a = 0
-    outer_b = contents_open_2 + 1
-    outer_c = hex_end_2
-
-    # We don't know `d` until we know where the xref/trailer is, which
-    # depends on `d` itself if the offset/`d` lengths change... but
-    # ByteRange numbers are fixed-width 010d so they don't change size.
-    # So we can compute `d` once we know where the file ends.
-
-    # We'll construct the rest assuming `d` is the bytes from hex_end_2
-    # to EOF. Build the xref + trailer relative to current position.
-    xref_offset = len(pre_xref)
-    xref = (
-        b"xref\n"
-        + b"1 1\n" + f"{update_offsets[1]:010d} 00000 n \n".encode("ascii")
-        + b"9 2\n"
-        + f"{update_offsets[9]:010d} 00000 n \n".encode("ascii")
-        + f"{update_offsets[10]:010d} 00000 n \n".encode("ascii")
-    )
-    trailer = (
-        b"trailer\n"
-        + b"<< /Size 11 /Root 1 0 R /Prev "
-        + str(_find_startxref(inner_pdf)).encode("ascii")
-        + b" >>\nstartxref\n"
-        + str(xref_offset).encode("ascii")
-        + b"\n%%EOF\n"
-    )
-
-    pdf = bytearray(pre_xref + xref + trailer)
-    outer_d = len(pdf) - outer_c
-    _patch_byte_range_from(
-        pdf, outer_a, outer_b, outer_c, outer_d,
-        # The placeholder belongs to obj 10 only.
-        from_offset=update_offsets[10],
-    )
-
-    digest_outer = hashlib.sha256(
-        bytes(pdf[outer_a:outer_a + outer_b]) + bytes(pdf[outer_c:outer_c + outer_d])
-    ).hexdigest()
-    pkcs7_outer = run_pycms(outer_spec_template.format(sha256=digest_outer))
-    _splice_pkcs7(pdf, hex_start_2, hex_end_2, pkcs7_outer)
+Toolbar icon: GREEN check. Banner: GREEN, "Document signed and
+verified" (count = {depth}). The outermost card is Signature{depth}
+(revisionIndex 0); each older signature is nested under the next
+newer one, down to Signature1. Only the top-level card uses green
+checks; nested cards use the muted GREY check.
+"""
 
-    return pdf
+
+def _build_field_tree(params, scale=None, layout=None):
+    """One verified signature referenced by every /Sig leaf of a FieldTree."""
+    field_tree = FieldTree(**params)
+    page_text = _field_tree_page_text(field_tree)
+    writer, sig = PdfBuilder(
+        page_text,
+        scale=scale,
+        field_tree=field_tree,
+        contents_len=_contents_len(SPEC_VERIFIED),
+        **(layout or {}),
+    ).build()
+    _sign_placeholder(
+        writer,
+        sig,
+        SPEC_VERIFIED,
+        page_text=page_text,
+        sub_filter="/adbe.pkcs7.detached",
+    )
+    return writer.buf
+
+
+def _field_tree_name(params):
+    name = f"signed_fields_{params['fanout']}x{params['depth']}"
+    if params.get("sig_every", 1) != 1:
+        name += f"_sig{params['sig_every']}"
+    if params.get("shared"):
+        name += f"_shared{params['shared']}"
+    if params.get("cycles"):
+        name += f"_cycles{params['cycles']}"
+    return name
+
+
+def _field_tree_page_text(field_tree):
+    count = field_tree.num_signatures + 1
+    return PAGE_HEADER + f"""\
+Expected verification state: VERIFIED ({count} signatures)
+
+/AcroForm /Fields holds Signature1 plus {field_tree.fanout} top-level fields,
+each with {field_tree.fanout} kids, {field_tree.depth} levels deep:
+{field_tree.num_fields} fields in total. Every {field_tree.sig_every}th leaf is
+a /Sig field whose /V is the one real /Sig dict; the other leaves are
+text fields. {field_tree.shared} parents also list a neighbour's leaf in
+/Kids and {field_tree.cycles} list their own top-level ancestor, which
+must neither be double counted nor loop forever.
+
+All {count} signature fields share the same valid signature, so every
+card shows "Status: Signature verified" and "Certificate: Trusted
+(pdf-sign-ca)" and the banner is GREEN, "Document signed and
+verified".
+"""
 
 
-def _find_startxref(pdf_bytes):
-    idx = pdf_bytes.rindex(b"startxref")
-    after = pdf_bytes[idx + len(b"startxref"):]
-    m = re.search(rb"\d+", after)
-    return int(m.group(0))
+TAIL_GARBAGE = b"X"
 
 
-def _patch_byte_range_from(pdf, a, b, c, d, *, from_offset):
-    placeholder = b"/ByteRange [0000000000 0000000000 0000000000 0000000000]"
-    replacement = (
-        f"/ByteRange [{a:010d} {b:010d} {c:010d} {d:010d}]".encode("ascii")
+def _tail_whitespace(params):
+    """Length of the whitespace tail of a --tail case, in bytes."""
+    return int(params["whitespace_mb"] * 1024 * 1024)
+
+
+def _build_tail(params, scale=None, layout=None):
+    """One verified signature followed by ``params["updates"]`` unsigned
+    incremental updates and then ``params["whitespace_mb"]`` MB of
+    whitespace, with a TAIL_GARBAGE byte at ``params["garbage_at"]`` of
+    it, if set."""
+    page_text = _tail_page_text(params)
+    builder = PdfBuilder(
+        page_text,
+        scale=scale,
+        contents_len=_contents_len(SPEC_VERIFIED),
+        **(layout or {}),
+    )
+    writer, sig = builder.build()
+    _sign_placeholder(
+        writer,
+        sig,
+        SPEC_VERIFIED,
+        page_text=page_text,
+        sub_filter="/adbe.pkcs7.detached",
     )
-    assert len(replacement) == len(placeholder)
-    idx = pdf.index(placeholder, from_offset)
-    pdf[idx:idx + len(placeholder)] = replacement
+    nums = builder.nums
+    _append_updates(writer, nums, [nums["field"]], params["updates"])
+    _append_tail(writer, _tail_whitespace(params), params["garbage_at"])
+    return writer.buf
+
+
+def _append_updates(writer, nums, fields, count):
+    """Append ``count`` unsigned incremental updates, each rewriting the
+    catalog (whose /AcroForm lists ``fields``) unchanged: an update only
+    has to exist to count."""
+    with _stage("append") as stage:
+        start = writer.pos
+        for _ in range(count):
+            writer.write(b"\n")
+            writer.obj(
+                nums["catalog"],
+                b"<< /Type /Catalog /Pages %d 0 R " % nums["pages"]
+                + b"/AcroForm << /Fields ["
+                + _refs(fields)
+                + b"] /SigFlags 3 >> >>",
+            )
+            writer.write_xref(size=writer.size, root=nums["catalog"])
+        stage["bytes"] = writer.pos - start
+
+
+def _append_tail(writer, whitespace, garbage_at=None):
+    """Append ``whitespace`` bytes of TAIL_WHITESPACE, 1 MB at a time, with
+    a TAIL_GARBAGE byte at offset ``garbage_at`` of them, if set."""
+    chunk = TAIL_WHITESPACE * (1024 * 1024 // len(TAIL_WHITESPACE))
+    tail_start = writer.pos
+    remaining = whitespace
+    with _stage("append", whitespace):
+        while remaining:
+            writer.write(chunk[:remaining])
+            remaining -= min(remaining, len(chunk))
+        if garbage_at is not None:
+            writer.buf[tail_start + garbage_at] = TAIL_GARBAGE[0]
+
+
+def _tail_name(params):
+    name = "signed_tail"
+    if params["whitespace_mb"]:
+        name += f"_ws{params['whitespace_mb']:g}mb"
+    if params["garbage_at"] is not None:
+        name += f"_garbage{params['garbage_at']}"
+    if params["updates"]:
+        name += f"_updates{params['updates']}"
+    return name
+
+
+def _tail_covers_whole_document(params):
+    return not params["updates"] and params["garbage_at"] is None
+
+
+def _tail_page_text(params):
+    tail = []
+    if params["updates"]:
+        tail.append(
+            f"{params['updates']} unsigned incremental update(s), each "
+            f"rewriting the catalog"
+        )
+    if params["whitespace_mb"]:
+        whitespace = f"{_tail_whitespace(params)} bytes of whitespace"
+        if params["garbage_at"] is not None:
+            whitespace += (
+                f" with one non-whitespace byte at offset "
+                f"{params['garbage_at']} of it"
+            )
+        tail.append(whitespace)
+    covers = _tail_covers_whole_document(params)
+    if params["updates"]:
+        scan = (
+            "pdf.js counts the xref sections after the signed range and "
+            "does not scan the tail."
+        )
+    elif covers:
+        scan = "pdf.js has to scan every byte of the tail to tell."
+    else:
+        scan = (
+            f"pdf.js stops scanning the tail at the chunk holding offset "
+            f"{params['garbage_at']}."
+        )
+    return PAGE_HEADER + f"""\
+Expected verification state: VERIFIED, coversWholeDocument {str(covers).lower()}
+
+The signature is leaf <- pdf-sign-ca. After its signed range the file
+has {" and then ".join(tail) or "nothing else"}. {scan}
+
+The signature itself still verifies: the toolbar icon is a GREEN
+check and the card shows "Status: Signature verified". The verifier
+result carries documentModifiedAfterSigning: {str(not covers).lower()}.
+"""
+
+
+_STARTXREF_RE = re.compile(rb"startxref\s*(\d+)")
+
+
+def _find_startxref(pdf):
+    """The offset the last startxref of ``pdf`` (bytes or a mapping)
+    points to, found in place: the tail is not copied."""
+    idx = pdf.rfind(b"startxref")
+    match = _STARTXREF_RE.match(pdf, idx) if idx >= 0 else None
+    if match is None:
+        raise ValueError("no startxref")
+    return int(match.group(1))
 
 
 SPEC_VERIFIED = """\
@@ -660,6 +2873,26 @@ issuer:Untrusted Self-Signed Test Root
 subject:Untrusted Self-Signed Test Root
 """
 
+# The verifier status each spec leads to.
+SPEC_STATUS = {
+    SPEC_VERIFIED: "verified",
+    SPEC_EXPIRED: "expired",
+    SPEC_UNTRUSTED: "untrusted",
+}
+
+# Verifier statuses in the order the viewer ranks them when it picks the
+# worst one for the banner (STATUS_INFO in
+# web/digital_signature_properties_manager.js).
+STATUS_PRIORITY = ["verified", "unknown", "untrusted", "expired", "revoked", "invalid"]
+
+
+def _expected_status(statuses):
+    """Document-level status for signatures with ``statuses``; None if one
+    is None, a signature the generator did not make (see --resign)."""
+    if None in statuses:
+        return None
+    return max(statuses, key=STATUS_PRIORITY.index)
+
 
 MULTI_CASES = [
     (
@@ -723,13 +2956,336 @@ Inner card: status grey check (signature itself is verified),
 ]
 
 
+# ---------------------------------------------------------------------
+# Output sinks
+# ---------------------------------------------------------------------
+
+# Timestamp of every archive member, so archives are as reproducible as
+# the PDFs in them (the signing time of the first signature).
+ARCHIVE_MTIME = int(datetime.datetime(2026, 5, 9, tzinfo=datetime.timezone.utc).timestamp())
+
+ARCHIVE_FORMATS = ["tar", "tar.gz", "zip"]
+
+
+def _sink_format(out, fmt=None):
+    """Output format for ``--out``: ``fmt`` if given, else guessed from the
+    suffix, with "-" (stdout) a tar stream."""
+    if fmt:
+        return fmt
+    name = str(out).lower()
+    if name == "-" or name.endswith(".tar"):
+        return "tar"
+    if name.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if name.endswith(".zip"):
+        return "zip"
+    return "dir"
+
+
+class DirectorySink:
+    """Write each file into a directory and merge the manifest into the
+    manifest.json already there, so runs restricted with --only keep the
+    entries of the other cases."""
+
+    def __init__(self, out_dir):
+        self.dir = Path(out_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def add(self, name, data):
+        if isinstance(data, Path):
+            shutil.move(data, self.dir / name)
+        else:
+            (self.dir / name).write_bytes(data)
+
+    def close(self, entries):
+        _update_manifest(self.dir / "manifest.json", entries)
+
+
+class TarSink:
+    """Stream every file into one tar archive (optionally gzipped), with
+    manifest.json as the last member. Written in stream mode, so ``out``
+    may be a pipe."""
+
+    dir = None
+
+    def __init__(self, out, compression=""):
+        mode = f"w|{compression}"
+        if str(out) == "-":
+            self._tar = tarfile.open(fileobj=sys.stdout.buffer, mode=mode)
+        else:
+            self._tar = tarfile.open(str(out), mode=mode)
+
+    def add(self, name, data):
+        """Add ``data``: bytes, or the Path of a file to copy in."""
+        info = tarfile.TarInfo(name)
+        info.mtime = ARCHIVE_MTIME
+        info.mode = 0o644
+        if isinstance(data, Path):
+            info.size = data.stat().st_size
+            with data.open("rb") as f:
+                self._tar.addfile(info, f)
+        else:
+            info.size = len(data)
+            self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self, entries):
+        self.add("manifest.json", _manifest_json(entries))
+        self._tar.close()
+
+
+class ZipSink:
+    """Stream every file, uncompressed, into one zip archive with
+    manifest.json as the last member. Zip writes data descriptors when
+    ``out`` cannot seek, so it may be a pipe too."""
+
+    dir = None
+
+    def __init__(self, out):
+        self._zip = zipfile.ZipFile(
+            sys.stdout.buffer if str(out) == "-" else out, "w", zipfile.ZIP_STORED
+        )
+
+    def add(self, name, data):
+        """Add ``data``: bytes, or the Path of a file to copy in."""
+        info = zipfile.ZipInfo(name, time.gmtime(ARCHIVE_MTIME)[:6])
+        info.external_attr = 0o644 << 16
+        if isinstance(data, Path):
+            info.file_size = data.stat().st_size
+            with data.open("rb") as src, self._zip.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        else:
+            self._zip.writestr(info, data)
+
+    def close(self, entries):
+        self.add("manifest.json", _manifest_json(entries))
+        self._zip.close()
+
+
+def open_sink(out, fmt):
+    if fmt == "dir":
+        return DirectorySink(out)
+    if fmt == "zip":
+        return ZipSink(out)
+    return TarSink(out, "gz" if fmt == "tar.gz" else "")
+
+
+def _configure(
+    mozilla_central_dir,
+    signer_name,
+    cache_dir,
+    signer_material=SIGNER_MATERIAL,
+    profile=False,
+    profile_pstats=False,
+    spool_dir=None,
+):
+    """Point the module at a mozilla-central checkout, pick a signer, open
+    the signature cache (``cache_dir`` may be None), with ``profile``,
+    start profiling cases (under cProfile too with ``profile_pstats``)
+    and, with ``spool_dir``, build documents on disk there.
+
+    Also used as the process-pool initializer so every worker signs with
+    the same checkout, signer mode and cache as the parent.
+    """
+    global FIREFOX_DIR, TOOLS_DIR, PYCMS, SIGNER, CACHE, SIGNER_MATERIAL
+    global PROFILER, SPOOL_DIR, _signer_identity
+    FIREFOX_DIR = mozilla_central_dir
+    TOOLS_DIR = FIREFOX_DIR / "security/manager/tools"
+    PYCMS = TOOLS_DIR / "pycms.py"
+    SIGNER_MATERIAL = signer_material
+    SIGNER = SIGNERS[signer_name]()
+    _signer_identity = None
+    CACHE = SignatureCache(cache_dir) if cache_dir else None
+    PROFILER = profiling.StageProfiler(cprofile=profile_pstats) if profile else None
+    SPOOL_DIR = spool_dir
+
+
+def _spec_templates():
+    """Every pycms spec template the corpus signs with."""
+    templates = [case["spec_template"] for case in CASES]
+    for _, _, inner_spec, outer_spec in MULTI_CASES:
+        templates += [inner_spec, outer_spec]
+    templates.append(SPEC_VERIFIED)
+    return list(dict.fromkeys(t for t in templates if t is not None))
+
+
+def _status_meta(statuses, **meta):
+    """Manifest metadata for a job whose /Sig dicts, in signing order,
+    have the given expected verifier ``statuses``."""
+    return {**meta, "expected_status": _expected_status(statuses), "statuses": statuses}
+
+
+def _jobs(scale=None, chain_depths=(), field_trees=(), tails=(), layout=None):
+    """Every output file as a picklable (name, build function, args,
+    manifest metadata) tuple, in the order the summary is printed.
+
+    ``layout`` holds PdfBuilder's layout options; the enabled ones are
+    recorded in every manifest entry.
+    """
+    jobs = [
+        (
+            case["name"],
+            _build_single,
+            (case, scale, layout),
+            _status_meta([case["status"]], expected_signatures=1),
+        )
+        for case in CASES
+    ]
+    for name, page_text, inner_spec, outer_spec in MULTI_CASES:
+        # NB: Inner signature template has a unique tag so the post-process
+        # tampering of "signed_invalid" can target it; multi cases don't
+        # need post_process.
+        jobs.append(
+            (
+                name,
+                _build_multi,
+                (name, page_text, inner_spec, outer_spec, scale, layout),
+                _status_meta(
+                    [SPEC_STATUS[inner_spec], SPEC_STATUS[outer_spec]],
+                    expected_signatures=2,
+                ),
+            )
+        )
+    for depth in chain_depths:
+        jobs.append(
+            (
+                f"signed_chain_{depth}",
+                _build_revision_chain,
+                (depth, scale, layout),
+                _status_meta(["verified"] * depth, expected_signatures=depth),
+            )
+        )
+    for params in field_trees:
+        field_tree = FieldTree(**params)
+        jobs.append(
+            (
+                _field_tree_name(params),
+                _build_field_tree,
+                (params, scale, layout),
+                _status_meta(
+                    ["verified"],
+                    expected_signatures=field_tree.num_signatures + 1,
+                    fields=field_tree.num_fields + 1,
+                ),
+            )
+        )
+    for params in tails:
+        jobs.append(
+            (
+                _tail_name(params),
+                _build_tail,
+                (params, scale, layout),
+                _status_meta(["verified"], expected_signatures=1),
+            )
+        )
+    for job in jobs:
+        job[3].update((key, value) for key, value in (layout or {}).items() if value)
+    return jobs
+
+
+# The modules a job's output can depend on, next to this script.
+GENERATOR_SOURCES = ["generate.py", "inspect_pdf.py", "matrix.py", "resign.py"]
+
+_generator_digest = None
+
+
+def _fingerprint(job):
+    """Hash of everything a job's output depends on: its build function and
+    arguments, the GENERATOR_SOURCES and the signer identity."""
+    global _generator_digest
+    if _generator_digest is None:
+        h = hashlib.sha256()
+        for source in GENERATOR_SOURCES:
+            h.update((CORPUS_DIR / source).read_bytes())
+        _generator_digest = h.hexdigest()
+    name, build, build_args, _ = job
+    payload = json.dumps(
+        [name, build.__qualname__, build_args, _generator_digest, signer_identity()],
+        sort_keys=True,
+        default=lambda obj: getattr(obj, "__qualname__", repr(obj)),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _run_job(job, out_dir, force=False):
+    """Build one job and write it into ``out_dir``, returning (status,
+    filename, size, signatures, pdf, profile); see _signature_entries for
+    ``signatures``.
+
+    With ``out_dir`` None (an archive sink) nothing is written and the
+    bytes come back as ``pdf`` for the parent to add to the archive, or
+    the Path of the spool file under --on-disk and for --resign;
+    otherwise ``pdf`` is None. With a cache, a job whose fingerprint
+    matches the stamp of the file already on disk is skipped and reported
+    as "kept". Under --profile, ``profile`` is the case's StageProfiler
+    record (filled in as the block below exits, before it is returned);
+    otherwise it is None.
+    """
+    name, build, build_args, _ = job
+    filename = f"{name}.pdf"
+    fingerprint = None
+    with PROFILER.case() if PROFILER else contextlib.nullcontext() as profile:
+        if out_dir is not None and CACHE is not None:
+            path = out_dir / filename
+            fingerprint = _fingerprint(job)
+            stamp = CACHE.stamp(name)
+            if (
+                not force
+                and stamp
+                and stamp["fingerprint"] == fingerprint
+                and "signatures" in stamp
+                and path.is_file()
+                and path.stat().st_size == stamp["size"]
+            ):
+                return (
+                    "kept",
+                    filename,
+                    stamp["size"],
+                    stamp["signatures"],
+                    None,
+                    profile,
+                )
+        pdf = build(*build_args)
+        size = len(pdf)
+        with _stage("manifest", size):
+            signatures = _signature_entries(pdf)
+        if isinstance(pdf, MappedPdf):
+            # Already on disk: only the spool file has to move.
+            pdf.close()
+            pdf = Path(pdf.path)
+        if out_dir is None:
+            return "wrote", filename, size, signatures, pdf, profile
+        with _stage("write", size):
+            if isinstance(pdf, Path):
+                shutil.move(pdf, out_dir / filename)
+            else:
+                (out_dir / filename).write_bytes(pdf)
+        if fingerprint is not None:
+            CACHE.set_stamp(name, fingerprint, size, signatures)
+        return "wrote", filename, size, signatures, None, profile
+
+
 def main():
+    # Imported here since they import this module in turn.
+    import matrix
+    import mutations
+    import resign
+
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
         "--out",
         type=Path,
         default=CORPUS_DIR,
-        help="Output directory (default: this script's directory).",
+        help=(
+            "Output directory, or a .tar, .tar.gz/.tgz or .zip archive to "
+            "stream every file into, or - for a tar stream on stdout "
+            "(default: this script's directory)."
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=["dir"] + ARCHIVE_FORMATS,
+        default=None,
+        help="Output format, instead of guessing it from --out.",
     )
     parser.add_argument(
         "--mozilla-central",
@@ -740,36 +3296,486 @@ def main():
             "MOZILLA_CENTRAL_SRC env var, then /opt/mozilla/firefox."
         ),
     )
+    parser.add_argument(
+        "--signer",
+        choices=sorted(SIGNERS),
+        default="inprocess",
+        help=(
+            "How to sign: 'inprocess' imports pycms once and reuses it "
+            "for every signature (default), 'subprocess' starts a new "
+            "pycms interpreter per signature, 'standalone' needs no "
+            "checkout and signs with --signer-material instead."
+        ),
+    )
+    parser.add_argument(
+        "--signer-material",
+        type=Path,
+        default=SIGNER_MATERIAL,
+        help=(
+            "Keys and pycms SignedData templates for --signer standalone "
+            "(default: signer_material.json next to this script)."
+        ),
+    )
+    parser.add_argument(
+        "--export-signer-material",
+        action="store_true",
+        help=(
+            "Write --signer-material from the mozilla-central checkout's "
+            "pycms and exit."
+        ),
+    )
+    _add_jobs_argument(parser, "build cases")
+    parser.add_argument(
+        "--only",
+        action="append",
+        metavar="GLOB",
+        help=(
+            "Only build cases whose name matches this shell-style glob. "
+            "May be repeated."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=CORPUS_DIR / ".cache",
+        help=(
+            "Signature cache and build stamps (default: .cache next to "
+            "this script)."
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor write the cache; rebuild and re-sign everything.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=64,
+        help=(
+            "Evict least-recently-used signatures once the cache exceeds "
+            "this size (default: 64)."
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every selected case even if its build stamp matches.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=parse_scale,
+        default=None,
+        help=(
+            "Grow every case to a realistic size without changing its "
+            "expected verification state: a preset ("
+            + ", ".join(sorted(SCALE_PRESETS))
+            + ") and/or comma-separated pages=N, objects=N, stream-mb=N, "
+            "e.g. pages=5000,objects=200000,stream-mb=500."
+        ),
+    )
+    parser.add_argument(
+        "--payload",
+        type=parse_payload,
+        default=None,
+        help=(
+            "Fill the signed ranges with realistic data: comma-separated "
+            "flate (FlateDecode content streams), images=N, image-px=N "
+            "(default: 512) and image-kind=jpeg|raw|flate|mixed (default: "
+            "mixed), e.g. flate,images=12,image-px=1024."
+        ),
+    )
+    parser.add_argument(
+        "--chain-depth",
+        type=_chain_depth,
+        action="append",
+        default=[],
+        metavar="K",
+        help=(
+            "Also build signed_chain_K.pdf: K verified signatures, each in "
+            "its own incremental update chained through /Prev. May be "
+            "repeated."
+        ),
+    )
+    parser.add_argument(
+        "--field-tree",
+        type=parse_field_tree,
+        action="append",
+        default=[],
+        metavar="SPEC",
+        help=(
+            "Also build a case whose AcroForm holds a synthetic field tree, "
+            "e.g. fanout=30,depth=3,sig-every=100,shared=10,cycles=2. "
+            "May be repeated."
+        ),
+    )
+    parser.add_argument(
+        "--matrix",
+        type=Path,
+        action="append",
+        default=[],
+        metavar="FILE",
+        help=(
+            "Also build every case of the case matrices in this JSON file; "
+            "see matrix.example.json. May be repeated."
+        ),
+    )
+    parser.add_argument(
+        "--tail",
+        type=parse_tail,
+        action="append",
+        default=[],
+        metavar="SPEC",
+        help=(
+            "Also build a case with data after its signed range: "
+            "whitespace-mb=N of trailing whitespace, garbage-at=N to put a "
+            "non-whitespace byte at that offset of it and updates=N unsigned "
+            "incremental updates before it, e.g. whitespace-mb=500,"
+            "garbage-at=1048576. May be repeated."
+        ),
+    )
+    parser.add_argument(
+        "--resign",
+        type=Path,
+        action="append",
+        default=[],
+        metavar="PATH",
+        help=(
+            "Also append a verified signature, as a new incremental update, "
+            "to a copy of every PDF at PATH (a file, or a directory searched "
+            "recursively) and write it as resigned_<name>.pdf. May be "
+            "repeated."
+        ),
+    )
+    layout_group = parser.add_mutually_exclusive_group()
+    layout_group.add_argument(
+        "--linearized",
+        action="store_true",
+        help=(
+            "Write every case in linearized (fast web view) layout; "
+            "multi-signature cases add their updates on a linearized base."
+        ),
+    )
+    layout_group.add_argument(
+        "--xref-streams",
+        action="store_true",
+        help=(
+            "Write cross-reference streams instead of xref tables and pack "
+            "every non-stream object except /Sig dicts into compressed "
+            "object streams, in the base file and in every update."
+        ),
+    )
+    parser.add_argument(
+        "--contents-slack",
+        type=int,
+        default=0,
+        metavar="BYTES",
+        help=(
+            "Extra bytes in every /Contents placeholder. Placeholders are "
+            "sized to the signer's output exactly (default: 0)."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help=(
+            "Write the wall time, CPU time, peak traced allocations and "
+            "bytes processed of every stage of every case to this JSON "
+            "file. Tracing allocations slows the build down."
+        ),
+    )
+    parser.add_argument(
+        "--profile-pstats",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help=(
+            "With --profile, also run every case under cProfile and write "
+            "the merged statistics to this file (see python -m pstats)."
+        ),
+    )
+    parser.add_argument(
+        "--on-disk",
+        action="store_true",
+        help=(
+            "Write every document straight to a file and patch its "
+            "signatures in place, so memory stays flat however large "
+            "--scale makes it. Linearized documents are still built in "
+            "memory."
+        ),
+    )
+    parser.add_argument(
+        "--mutations",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Instead of the corpus, write N variants of --mutation-base with "
+            "a corrupted /ByteRange, /Contents or /SubFilter, or a truncated "
+            "tail, each recorded in the manifest with its expected outcome."
+        ),
+    )
+    parser.add_argument(
+        "--mutation-seed",
+        type=int,
+        default=0,
+        help="Seed for --mutations; the same seed writes the same files.",
+    )
+    parser.add_argument(
+        "--mutation-base",
+        default="signed_verified",
+        metavar="CASE",
+        help="Single-signature case to mutate (default: signed_verified).",
+    )
     args = parser.parse_args()
-    args.out.mkdir(parents=True, exist_ok=True)
-
-    global FIREFOX_DIR, TOOLS_DIR, PYCMS
-    FIREFOX_DIR = _resolve_mozilla_central_dir(args.mozilla_central)
-    TOOLS_DIR = FIREFOX_DIR / "security/manager/tools"
-    PYCMS = TOOLS_DIR / "pycms.py"
+    fmt = _sink_format(args.out, args.format)
+    if fmt == "dir" and str(args.out) == "-":
+        parser.error("--format dir cannot write to stdout")
+
+    if args.export_signer_material and args.signer == "standalone":
+        parser.error("--export-signer-material needs a pycms signer")
+    if args.signer == "standalone":
+        # No checkout needed.
+        mozilla_central_dir = DEFAULT_MOZILLA_CENTRAL_DIR
+    else:
+        mozilla_central_dir = _resolve_mozilla_central_dir(args.mozilla_central)
+    if args.profile_pstats and not args.profile:
+        parser.error("--profile-pstats needs --profile")
+    if args.profile and args.mutations:
+        parser.error("--profile does not apply to --mutations")
+    if args.on_disk and args.mutations:
+        parser.error("--on-disk does not apply to --mutations")
+    spool_dir = None
+    if args.on_disk:
+        # Next to the output, so a finished file is only renamed.
+        spool_dir = args.out if fmt == "dir" else Path(tempfile.gettempdir())
+    cache_dir = None if args.no_cache else args.cache_dir
+    _configure(
+        mozilla_central_dir,
+        args.signer,
+        cache_dir,
+        args.signer_material,
+        args.profile is not None,
+        args.profile_pstats is not None,
+        spool_dir,
+    )
 
-    if not PYCMS.exists():
+    if args.signer != "standalone" and not PYCMS.exists():
         raise SystemExit(
             f"pycms.py not found at {PYCMS}\n"
             f"Pass --mozilla-central </path/to/mozilla-central> or set the "
             f"MOZILLA_CENTRAL_SRC environment variable."
         )
+    if args.export_signer_material:
+        count = export_signer_material(args.signer_material, _spec_templates())
+        print(f"  wrote {args.signer_material} ({count} spec(s))")
+        return
+
+    layout = {
+        "linearized": args.linearized,
+        "xref_streams": args.xref_streams,
+        "contents_slack": args.contents_slack,
+        "payload": args.payload,
+    }
+    try:
+        matrices = [m for path in args.matrix for m in matrix.load_matrices(path)]
+    except ValueError as ex:
+        parser.error(f"--matrix {ex}")
+    # Matrix and --resign jobs are only generated as they are consumed.
+    jobs = itertools.chain(
+        _jobs(args.scale, args.chain_depth, args.field_tree, args.tail, layout),
+        matrix._matrix_jobs(matrices, args.scale, layout),
+        resign._resign_jobs(args.resign, layout),
+    )
+    if args.mutations:
+        base_job = next((job for job in jobs if job[0] == args.mutation_base), None)
+        if base_job is None or base_job[3]["expected_signatures"] < 1:
+            parser.error(f"--mutation-base {args.mutation_base}: no such signed case")
+        name, build, build_args, meta = base_job
+        try:
+            mutator = mutations.SigMutator(build(*build_args), args.mutation_seed)
+        except ValueError as ex:
+            parser.error(f"--mutation-base {args.mutation_base}: {ex}")
+    elif args.only:
+        jobs = (
+            job
+            for job in jobs
+            if any(fnmatch.fnmatchcase(job[0], pattern) for pattern in args.only)
+        )
+        first = next(jobs, None)
+        if first is None:
+            raise SystemExit(f"No case matches --only {' '.join(args.only)}")
+        jobs = itertools.chain([first], jobs)
+
+    sink = open_sink(args.out, fmt)
+    # With the archive going to stdout, the summary goes to stderr.
+    with (
+        contextlib.redirect_stdout(sys.stderr)
+        if str(args.out) == "-"
+        else contextlib.nullcontext()
+    ):
+        if args.mutations:
+            entries = mutations._write_mutations(
+                name, mutator, meta["expected_signatures"], args.mutations, sink
+            )
+            outcomes = collections.Counter(entry["outcome"] for entry in entries)
+            print(
+                f"  wrote {len(entries)} mutant(s) of {name}: "
+                f"{outcomes['accept']} accepted, {outcomes['reject']} rejected"
+            )
+        else:
+            entries = _build_jobs(jobs, sink, args, mozilla_central_dir, cache_dir)
+        sink.close(entries)
+        if PROFILER is not None:
+            profiling.print_profile(
+                PROFILER.dump(
+                    args.profile, args.profile_pstats, jobs=_worker_count(args.jobs)
+                )
+            )
+            print(f"  wrote {args.profile}")
+            if args.profile_pstats:
+                print(f"  wrote {args.profile_pstats}")
+
+        if CACHE is not None:
+            evicted = CACHE.evict(int(args.cache_max_mb * 1024 * 1024))
+            if evicted:
+                print(f"  evicted {evicted} cached signature(s)")
+
+
+def _build_jobs(jobs, sink, args, mozilla_central_dir, cache_dir):
+    """Run ``jobs`` (any iterable, consumed as it goes) into ``sink``,
+    across a process pool with --jobs, and return their manifest
+    entries."""
+    # No more workers than jobs, without counting every job.
+    jobs = iter(jobs)
+    head = list(itertools.islice(jobs, _worker_count(args.jobs)))
+    num_workers = len(head)
+    jobs = itertools.chain(head, jobs)
+    if num_workers <= 1:
+        return _report(
+            ((job, _run_job(job, sink.dir, args.force)) for job in jobs), sink
+        )
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=_configure,
+        initargs=(
+            mozilla_central_dir,
+            args.signer,
+            cache_dir,
+            args.signer_material,
+            args.profile is not None,
+            args.profile_pstats is not None,
+            SPOOL_DIR,
+        ),
+    ) as pool:
+        return _report(
+            _run_jobs(pool, jobs, sink.dir, args.force, window=4 * num_workers),
+            sink,
+        )
 
-    for case in CASES:
-        pdf = _build_single(case)
-        path = args.out / f"{case['name']}.pdf"
-        path.write_bytes(bytes(pdf))
-        print(f"  wrote {path.name} ({len(pdf)} bytes)")
 
-    for name, page_text, inner_spec, outer_spec in MULTI_CASES:
-        # NB: Inner signature template has a unique tag so the post-process
-        # tampering of "signed_invalid" can target it; multi cases don't
-        # need post_process.
-        pdf = _build_multi(name, page_text, inner_spec, outer_spec)
-        path = args.out / f"{name}.pdf"
-        path.write_bytes(bytes(pdf))
-        print(f"  wrote {path.name} ({len(pdf)} bytes)")
+def _run_jobs(pool, jobs, out_dir, force, window):
+    """Yield (job, _run_job result) for ``jobs`` from ``pool``, in
+    submission order, so the summary (and the set of files written) is
+    identical to a serial run. Unlike `pool.map`, at most ``window`` jobs
+    are submitted ahead of the one being reported, so neither the jobs
+    nor their results are all held at once."""
+    pending = collections.deque()
+    for job in jobs:
+        pending.append((job, pool.submit(_run_job, job, out_dir, force)))
+        if len(pending) >= window:
+            job, future = pending.popleft()
+            yield job, future.result()
+    while pending:
+        job, future = pending.popleft()
+        yield job, future.result()
+
+
+def _add_jobs_argument(parser, task):
+    """Add the -j/--jobs option shared by every subcommand."""
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        help=(
+            f"Worker processes used to {task}; 1 runs everything in this "
+            "process (default: 0, one per CPU)."
+        ),
+    )
+
+
+def _worker_count(jobs, tasks=None):
+    """Return the pool size for --jobs ``jobs``: 0 means one per CPU,
+    and there are never more workers than ``tasks``."""
+    count = jobs if jobs > 0 else os.cpu_count() or 1
+    return count if tasks is None else min(count, tasks)
+
+
+def _chain_depth(text):
+    depth = int(text)
+    if depth < 2:
+        raise argparse.ArgumentTypeError("a revision chain needs at least 2 signatures")
+    return depth
+
+
+def _report(results, sink):
+    """Add archived files to ``sink``, print one summary line per (job,
+    _run_job result) of ``results``, hand their profiles to PROFILER and
+    return their manifest entries."""
+    entries = []
+    for job, (status, filename, size, signatures, pdf, profile) in results:
+        if pdf is not None:
+            with PROFILER.case(profile) if PROFILER else contextlib.nullcontext():
+                with _stage("write", size):
+                    sink.add(filename, pdf)
+            if isinstance(pdf, Path):
+                pdf.unlink()
+        if profile is not None:
+            PROFILER.add(filename, status, profile)
+        if status == "kept":
+            print(f"  kept {filename} ({size} bytes, unchanged)")
+        else:
+            print(f"  wrote {filename} ({size} bytes)")
+        meta = dict(job[3])
+        statuses = meta.pop("statuses")
+        for signature, status in zip(signatures, statuses):
+            signature["expected_status"] = status
+        entries.append(
+            {"file": filename, "size": size, **meta, "signatures": signatures}
+        )
+    return entries
+
+
+def _manifest_json(entries):
+    return (json.dumps({"cases": entries}, indent=2) + "\n").encode("utf-8")
+
+
+def _update_manifest(path, entries):
+    """Merge ``entries`` into manifest.json, keyed by file name, so a run
+    restricted with --only keeps the entries of the other cases."""
+    try:
+        merged = {e["file"]: e for e in json.loads(path.read_text())["cases"]}
+    except (FileNotFoundError, ValueError, KeyError):
+        merged = {}
+    for entry in entries:
+        merged[entry["file"]] = entry
+    path.write_bytes(_manifest_json(list(merged.values())))
 
 
 if __name__ == "__main__":
-    main()
+    # The modules next to this one import it as "generate": make that this
+    # script, rather than a second copy with globals of its own.
+    sys.modules.setdefault("generate", sys.modules[__name__])
+    if sys.argv[1:2] == ["verify"]:
+        import verify
+
+        verify.main(sys.argv[2:])
+    elif sys.argv[1:2] == ["inspect"]:
+        import inspect_pdf
+
+        inspect_pdf.main(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,477 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""``generate.py inspect``: list the revisions and signatures of any PDF.
+
+A small reader for files written by anyone, not only by generate.py: it
+follows the startxref and /Prev chain through xref tables, xref streams
+and hybrid files, and finds every /Sig dict with the revision that added
+it. resign.py reads the files it re-signs with it too.
+"""
+
+import argparse
+import bisect
+import concurrent.futures
+import json
+import mmap
+import os
+import re
+import zlib
+from pathlib import Path
+
+import generate
+
+
+_XREF_RE = re.compile(rb"\s*xref\b")
+_OBJ_HEADER_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\s*")
+_XREF_SUBSECTION_RE = re.compile(rb"\s*(\d+)[ \t]+(\d+)\b")
+_XREF_ENTRY_RE = re.compile(rb"\s*(\d{10})\s+(\d{5})\s+([nf])")
+_TRAILER_RE = re.compile(rb"\s*trailer\s*")
+_STREAM_RE = re.compile(rb"\s*stream(?:\r\n|\n|\r)")
+_WHITESPACE_RE = re.compile(rb"(?:\s|%[^\r\n]*)*")
+_DICT_TOKEN_RE = re.compile(rb"<<|>>|[<(]")
+_STRING_TOKEN_RE = re.compile(rb"[()\\]")
+_REF_RE = re.compile(rb"(\d+)\s+(\d+)\s+R(?![^\s/<>\[\]()%])")
+_TOKEN_RE = re.compile(rb"/?[^\s/<>\[\]()%]*")
+_SIG_TYPE_RE = re.compile(rb"/Type\s*/(Sig|DocTimeStamp)(?![^\s/<>\[\]()%])")
+_SUB_FILTER_RE = re.compile(rb"/SubFilter\s*/([^\s/<>\[\]()%]+)")
+_CONTENTS_RE = re.compile(rb"/Contents\s*<([0-9A-Fa-f\s]*)>")
+
+
+def _string_end(data, pos):
+    """Offset just past the literal string that opens at ``pos``."""
+    depth = 0
+    while True:
+        match = _STRING_TOKEN_RE.search(data, pos)
+        if match is None:
+            raise ValueError(f"unterminated string at {pos}")
+        pos = match.end()
+        if match.group() == b"\\":
+            pos += 1
+        elif match.group() == b"(":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _dict_end(data, pos):
+    """Offset just past the dictionary that opens at ``pos`` of ``data``,
+    skipping strings (whose parentheses and angle brackets do not
+    count)."""
+    depth = 0
+    while True:
+        match = _DICT_TOKEN_RE.search(data, pos)
+        if match is None:
+            raise ValueError(f"unterminated dictionary at {pos}")
+        token = match.group()
+        pos = match.end()
+        if token == b"(":
+            pos = _string_end(data, match.start())
+        elif token == b"<":
+            # A hex string.
+            pos = data.find(b">", pos) + 1
+            if pos == 0:
+                raise ValueError("unterminated hex string")
+        elif token == b"<<":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _value_end(data, pos):
+    """Offset just past the value at ``pos`` of ``data`` (after any
+    whitespace): a dict, array, string, name, reference or other token."""
+    pos = _WHITESPACE_RE.match(data, pos).end()
+    head = data[pos:pos + 2]
+    if head == b"<<":
+        return _dict_end(data, pos)
+    if head[:1] == b"<":
+        end = data.find(b">", pos)
+        if end == -1:
+            raise ValueError("unterminated hex string")
+        return end + 1
+    if head[:1] == b"(":
+        return _string_end(data, pos)
+    if head[:1] == b"[":
+        pos += 1
+        while True:
+            pos = _WHITESPACE_RE.match(data, pos).end()
+            if data[pos:pos + 1] == b"]":
+                return pos + 1
+            if pos >= len(data):
+                raise ValueError("unterminated array")
+            pos = _value_end(data, pos)
+    match = _REF_RE.match(data, pos) or _TOKEN_RE.match(data, pos)
+    if match.end() == pos:
+        raise ValueError(f"unexpected {head!r} at {pos}")
+    return match.end()
+
+
+def _dict_entries(data):
+    """{key: (start, end)} of the values of the top-level entries of the
+    dict ``data``, keys without their slash."""
+    entries = {}
+    pos = data.index(b"<<") + 2
+    while True:
+        pos = _WHITESPACE_RE.match(data, pos).end()
+        if data.startswith(b">>", pos):
+            return entries
+        if not data.startswith(b"/", pos):
+            raise ValueError(f"expected a name at {pos}")
+        key = _TOKEN_RE.match(data, pos)
+        start = _WHITESPACE_RE.match(data, key.end()).end()
+        end = _value_end(data, start)
+        entries[key.group()[1:]] = (start, end)
+        pos = end
+
+
+def _ref(value):
+    """(number, generation) of the reference ``value``, or None."""
+    match = _REF_RE.fullmatch(value.strip())
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _dict_int(data, key):
+    """The direct integer value of /``key`` in dict ``data``, or None."""
+    match = re.search(rb"/%s\s+(\d+)(?!\d|\s+\d+\s+R)" % key, data)
+    return int(match.group(1)) if match else None
+
+
+def _dict_ints(data, key):
+    """The integers of the array /``key`` in dict ``data``, or None."""
+    match = re.search(rb"/%s\s*\[([^\]]*)\]" % key, data)
+    return [int(v) for v in match.group(1).split()] if match else None
+
+
+def _png_unpredict(data, columns):
+    """Undo the PNG row predictors (None, Sub and Up, all an xref stream
+    writer needs) of ``data`` with ``columns`` bytes per row."""
+    rows = []
+    prev = bytes(columns)
+    for i in range(0, len(data) - columns, columns + 1):
+        kind = data[i]
+        row = bytearray(data[i + 1:i + 1 + columns])
+        if kind == 1:
+            for k in range(1, columns):
+                row[k] = (row[k] + row[k - 1]) & 0xFF
+        elif kind == 2:
+            row = bytearray((a + b) & 0xFF for a, b in zip(row, prev))
+        elif kind != 0:
+            raise ValueError(f"unsupported PNG predictor {kind}")
+        rows.append(row)
+        prev = row
+    return b"".join(rows)
+
+
+def _stream_at(mm, offset):
+    """(dict, decoded data) of the stream object at ``offset``, which
+    must be Flate-compressed or not compressed at all."""
+    start = _OBJ_HEADER_RE.match(mm, offset)
+    if start is None or mm[start.end():start.end() + 2] != b"<<":
+        raise ValueError(f"no stream object at {offset}")
+    dict_end = _dict_end(mm, start.end())
+    stream_dict = mm[start.end():dict_end]
+    stream = _STREAM_RE.match(mm, dict_end)
+    if stream is None:
+        raise ValueError(f"the object at {offset} is not a stream")
+    length = _dict_int(stream_dict, b"Length")
+    if length is None:
+        # An indirect /Length.
+        length = mm.find(b"endstream", stream.end()) - stream.end()
+    data = mm[stream.end():stream.end() + length]
+    match = re.search(rb"/Filter\s*(\[[^\]]*\]|/\w+)", stream_dict)
+    filters = re.findall(rb"/(\w+)", match.group(1)) if match else []
+    if filters == [b"FlateDecode"]:
+        data = zlib.decompressobj().decompress(data)
+    elif filters:
+        raise ValueError(f"unsupported stream filter {filters} at {offset}")
+    predictor = _dict_int(stream_dict, b"Predictor") or 1
+    if predictor >= 10:
+        data = _png_unpredict(data, _dict_int(stream_dict, b"Columns") or 1)
+    elif predictor != 1:
+        raise ValueError(f"unsupported predictor {predictor} at {offset}")
+    return stream_dict, data
+
+
+def _read_xref_section(mm, offset):
+    """(kind, entries, trailer) of the xref section at ``offset``: kind is
+    "table" or "stream", ``entries`` maps the object numbers the section
+    lists as in use to their offsets, or to (object stream, index) for
+    compressed ones, and ``trailer`` is the trailer or xref stream dict."""
+    table = _XREF_RE.match(mm, offset)
+    if table:
+        pos = table.end()
+        entries = {}
+        while match := _XREF_SUBSECTION_RE.match(mm, pos):
+            pos = match.end()
+            first, count = int(match.group(1)), int(match.group(2))
+            for num in range(first, first + count):
+                entry = _XREF_ENTRY_RE.match(mm, pos)
+                if entry is None:
+                    raise ValueError(f"malformed xref entry at {pos}")
+                pos = entry.end()
+                if entry.group(3) == b"n":
+                    entries[num] = int(entry.group(1))
+        match = _TRAILER_RE.match(mm, pos)
+        if match is None:
+            raise ValueError(f"no trailer after the xref table at {offset}")
+        return "table", entries, mm[match.end():_dict_end(mm, match.end())]
+    if _OBJ_HEADER_RE.match(mm, offset) is None:
+        raise ValueError(f"no xref table or stream at {offset}")
+    xref_dict, data = _stream_at(mm, offset)
+    if not re.search(rb"/Type\s*/XRef\b", xref_dict):
+        raise ValueError(f"the object at {offset} is not an xref stream")
+    widths = _dict_ints(xref_dict, b"W")
+    if widths is None or len(widths) != 3:
+        raise ValueError(f"xref stream at {offset} has no valid /W")
+    index = _dict_ints(xref_dict, b"Index") or [0, _dict_int(xref_dict, b"Size")]
+    row_len = sum(widths)
+    entries = {}
+    pos = 0
+    for first, count in zip(index[::2], index[1::2]):
+        for num in range(first, first + count):
+            row = data[pos:pos + row_len]
+            if len(row) < row_len:
+                raise ValueError(f"xref stream at {offset} is too short")
+            pos += row_len
+            fields = []
+            for width in widths:
+                fields.append(int.from_bytes(row[:width], "big"))
+                row = row[width:]
+            kind = fields[0] if widths[0] else 1
+            if kind == 1:
+                entries[num] = fields[1]
+            elif kind == 2:
+                entries[num] = (fields[1], fields[2])
+    return "stream", entries, xref_dict
+
+
+def _xref_sections(mm):
+    """Every xref section of ``mm`` from its startxref back through /Prev,
+    newest first, as (offset, kind, entries, trailer); see
+    _read_xref_section. The kind of a table with an /XRefStm is "hybrid"
+    and its entries include the stream's."""
+    sections = []
+    seen = set()
+    offset = generate._find_startxref(mm)
+    while offset is not None:
+        if offset in seen:
+            raise ValueError(f"/Prev loop at {offset}")
+        if not 0 <= offset < len(mm):
+            raise ValueError(f"xref offset {offset} is outside the file")
+        seen.add(offset)
+        kind, entries, trailer = _read_xref_section(mm, offset)
+        xref_stm = _dict_int(trailer, b"XRefStm")
+        if xref_stm is not None:
+            # The table is for readers without xref stream support, and
+            # takes precedence.
+            kind = "hybrid"
+            entries = {**_read_xref_section(mm, xref_stm)[1], **entries}
+        sections.append((offset, kind, entries, trailer))
+        offset = _dict_int(trailer, b"Prev")
+    return sections
+
+
+def _revisions(mm):
+    """The revisions of ``mm``, oldest first, each a (kinds, entries)
+    pair: the kinds of its xref sections and what they list.
+
+    Every xref section is a revision of its own, except the first-page
+    section of a linearized file, which is earlier in the file than the
+    main section its /Prev points to and is part of the same revision."""
+    revisions = []
+    for offset, kind, entries, trailer in reversed(_xref_sections(mm)):
+        prev = _dict_int(trailer, b"Prev")
+        if revisions and prev is not None and prev > offset:
+            kinds, merged = revisions[-1]
+            kinds.append(kind)
+            merged.update(entries)
+        else:
+            revisions.append(([kind], entries))
+    return revisions
+
+
+def _inspect_signature(mm, pos, objects):
+    """The signature dict whose /ByteRange is at ``pos``: the revision
+    and number of the object it is in (both None if no xref section
+    lists one), its /Type, /SubFilter, /ByteRange (None if malformed)
+    and the size of its /Contents placeholder in bytes (None if it is
+    not a hex string). None if ``pos`` is in stream data, such as page
+    text. ``objects`` are the (offset, number, revision) of every object
+    listed, sorted."""
+    i = bisect.bisect_right(objects, (pos,)) - 1
+    if i >= 0 and mm.find(b"endobj", objects[i][0], pos) == -1:
+        start, num, revision = objects[i]
+    else:
+        start = max(mm.rfind(b"obj", 0, pos), 0)
+        num = revision = None
+    end = mm.find(b"endobj", pos)
+    obj = mm[start:end if end != -1 else len(mm)]
+    if obj.find(b"endstream", pos - start) != -1:
+        return None
+    byte_range = generate._BYTE_RANGE_RE.match(mm, pos)
+    sig_type = _SIG_TYPE_RE.search(obj)
+    sub_filter = _SUB_FILTER_RE.search(obj)
+    contents = _CONTENTS_RE.search(obj)
+    return {
+        "revision": revision,
+        "object": num,
+        "type": sig_type and sig_type.group(1).decode("latin-1"),
+        "sub_filter": sub_filter and "/" + sub_filter.group(1).decode("latin-1"),
+        "byte_range": byte_range and [int(v) for v in byte_range.groups()],
+        "placeholder": contents
+        and len(contents.group(1).translate(None, b" \t\r\n\x0c")) // 2,
+    }
+
+
+def _inspect_pdf(path):
+    """Read the xref chain and /Sig dicts of one PDF from a read-only
+    mapping: its file name, size, number of revisions, kinds of xref
+    sections and signatures (see _inspect_signature), plus an error if
+    the xref chain is broken. /Sig dicts are found by their /ByteRange,
+    so they are reported even then, without a revision."""
+    result = {"file": str(path), "size": 0, "revisions": 0, "xref": []}
+    signatures = []
+    try:
+        result["size"] = os.path.getsize(path)
+        if result["size"] == 0:
+            raise ValueError("empty file")
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                revisions = _revisions(mm)
+            except (ValueError, zlib.error) as ex:
+                result["error"] = str(ex)
+                revisions = []
+            result["revisions"] = len(revisions)
+            result["xref"] = [kind for kinds, _ in revisions for kind in kinds]
+            # /Sig dicts are never in object streams: /ByteRange has to
+            # exclude their /Contents from the file bytes.
+            objects = sorted(
+                (offset, num, revision)
+                for revision, (_, entries) in enumerate(revisions, start=1)
+                for num, offset in entries.items()
+                if isinstance(offset, int)
+            )
+            pos = mm.find(b"/ByteRange")
+            while pos != -1:
+                signature = _inspect_signature(mm, pos, objects)
+                if signature is not None:
+                    signatures.append(signature)
+                pos = mm.find(b"/ByteRange", pos + 1)
+    except (OSError, ValueError) as ex:
+        result["error"] = str(ex)
+    result["signatures"] = signatures
+    return result
+
+
+def _inspect_paths(paths):
+    """Every PDF of ``paths``: files as they are, and the .pdf files
+    anywhere under directories, sorted."""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files += sorted(
+                p for p in path.rglob("*") if p.suffix.lower() == ".pdf" and p.is_file()
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def _print_inspected(result):
+    """Print one _inspect_pdf result: a line for the file, then one per
+    signature."""
+    xref = ", ".join(dict.fromkeys(result["xref"])) or "no xref"
+    line = (
+        f"  {result['file']}: {result['size']} bytes, {result['revisions']} "
+        f"revision(s) ({xref}), {len(result['signatures'])} signature(s)"
+    )
+    if "error" in result:
+        line += f"; ERROR: {result['error']}"
+    print(line)
+    for signature in result["signatures"]:
+        where = (
+            f"revision {signature['revision']}, object {signature['object']}"
+            if signature["object"] is not None
+            else "not in any xref section"
+        )
+        byte_range = signature["byte_range"]
+        placeholder = signature["placeholder"]
+        print(
+            f"    {where}: /Type {signature['type'] or '-'}, /SubFilter "
+            f"{signature['sub_filter'] or '-'}, /ByteRange "
+            + (f"[{' '.join(map(str, byte_range))}]" if byte_range else "malformed")
+            + ", /Contents "
+            + (f"{placeholder} bytes" if placeholder is not None else "malformed")
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="generate.py inspect",
+        description=(
+            "List the revisions and signatures of any PDFs, following the "
+            "startxref and /Prev chain through xref tables and streams: "
+            "the /ByteRange, /SubFilter, /Contents placeholder size and "
+            "revision of every /Sig dict."
+        ),
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=Path,
+        default=[generate.CORPUS_DIR],
+        metavar="PATH",
+        help=(
+            "PDFs, or directories to search for .pdf files recursively "
+            "(default: this script's directory)."
+        ),
+    )
+    generate._add_jobs_argument(parser, "inspect files")
+    parser.add_argument(
+        "--signed",
+        action="store_true",
+        help="Only list files with at least one /ByteRange.",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the results as a JSON list instead.",
+    )
+    args = parser.parse_args(argv)
+
+    files = _inspect_paths(args.paths)
+    if not files:
+        raise SystemExit("No PDFs to inspect")
+    num_workers = generate._worker_count(args.jobs, len(files))
+    if num_workers <= 1:
+        results = map(_inspect_pdf, files)
+        pool = None
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+        results = pool.map(
+            _inspect_pdf, files, chunksize=max(1, len(files) // (num_workers * 8))
+        )
+    listed = []
+    try:
+        for result in results:
+            if args.signed and not result["signatures"]:
+                continue
+            if args.json:
+                listed.append(result)
+            else:
+                _print_inspected(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if args.json:
+        print(json.dumps(listed, indent=2))
@@ -0,0 +1,319 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""Case matrices for ``generate.py --matrix``.
+
+A matrix names a few axes, such as the signer, the revision depth, the
+layout and a tampering, and lists values for each. Its cases, every
+combination of those values minus the excluded ones, are expanded one
+at a time into jobs that generate.py builds like its own cases.
+"""
+
+import argparse
+import itertools
+import json
+import re
+from pathlib import Path
+
+import generate
+
+
+# A --matrix file holds {"matrices": [...]}, each matrix a
+#
+#     {"name": "m", "axes": {"signer": ["verified", "expired"], ...},
+#      "exclude": [{"tamper": "outer", "depth": 1}]}
+#
+# whose cases are every combination of its axis values, minus those
+# matching all the entries of an "exclude" rule (an entry may list
+# several values). Cases are named after the matrix and their values,
+# in axis order, e.g. m_expired_d2. Axes, with their defaults:
+MATRIX_AXES = {
+    # Who makes the outermost signature and, by default, the inner ones.
+    "signer": "verified",
+    "inner_signer": None,
+    "sub_filter": "/adbe.pkcs7.detached",
+    # Signatures, each in its own revision.
+    "depth": 1,
+    # --scale and --payload values; None keeps the command line's.
+    "scale": None,
+    "payload": None,
+    "tamper": "none",
+    # classic, linearized or xref-streams; None keeps the command line's.
+    "layout": None,
+}
+
+MATRIX_SIGNERS = {
+    "verified": (generate.SPEC_VERIFIED, "leaf <- pdf-sign-ca"),
+    "untrusted": (generate.SPEC_UNTRUSTED, "self-signed"),
+    "expired": (generate.SPEC_EXPIRED, "leaf <- pdf-sign-ca-expired"),
+}
+
+# pdf.js never verifies a signature with any other SubFilter, so its
+# /Contents stays zero-filled and its status is "unknown".
+SIGNED_SUB_FILTERS = ["/adbe.pkcs7.detached"]
+
+MATRIX_TAMPERS = {
+    "none": "Nothing was changed after signing.",
+    "content": (
+        "After signing, one byte covered by every signature was flipped, "
+        "so no messageDigest matches its ByteRange data any more."
+    ),
+    "outer": (
+        "After signing, one letter of the outermost /Sig dict's /Reason "
+        "was flipped. Only the outermost signature covers it."
+    ),
+    "update": (
+        "An unsigned incremental update follows the last signature, so "
+        "none covers the whole document."
+    ),
+    "garbage": (
+        "A stray non-whitespace byte follows the last signed range, so no "
+        "signature covers the whole document."
+    ),
+}
+
+MATRIX_LAYOUTS = {
+    "classic": {"linearized": False, "xref_streams": False},
+    "linearized": {"linearized": True, "xref_streams": False},
+    "xref-streams": {"linearized": False, "xref_streams": True},
+}
+
+# Toolbar icon and banner the viewer shows for a worst status.
+STATUS_UI = {
+    "verified": ("GREEN check", 'GREEN, "Document signed and verified"'),
+    "unknown": (
+        "RED cross",
+        'RED, "Document signed but the signature could not be verified"',
+    ),
+    "untrusted": (
+        "ORANGE exclamation",
+        'ORANGE, "Document signed with a certificate that is not trusted"',
+    ),
+    "expired": (
+        "ORANGE exclamation",
+        'ORANGE, "Document signed with an expired certificate"',
+    ),
+    "invalid": ("RED cross", 'RED, "Document has an invalid signature"'),
+}
+
+
+def _matrix_value(axis, value):
+    """Check one axis value of a --matrix file and return it normalized;
+    raises ValueError."""
+    if axis in ("signer", "inner_signer"):
+        if value not in MATRIX_SIGNERS:
+            raise ValueError(f"{axis} must be one of {', '.join(MATRIX_SIGNERS)}")
+    elif axis == "sub_filter":
+        if not isinstance(value, str) or not re.fullmatch(r"/?[\w.]+", value):
+            raise ValueError(f"invalid sub_filter {value!r}")
+        value = "/" + value.lstrip("/")
+    elif axis == "depth":
+        if not isinstance(value, int) or value < 1:
+            raise ValueError("depth must be a positive integer")
+    elif axis in ("scale", "payload"):
+        try:
+            parse = generate.parse_scale if axis == "scale" else generate.parse_payload
+            parse(value)
+        except (argparse.ArgumentTypeError, AttributeError) as ex:
+            raise ValueError(f"invalid {axis} {value!r}: {ex}") from None
+    elif axis == "tamper":
+        if value not in MATRIX_TAMPERS:
+            raise ValueError(f"tamper must be one of {', '.join(MATRIX_TAMPERS)}")
+    elif axis == "layout":
+        if value not in MATRIX_LAYOUTS:
+            raise ValueError(f"layout must be one of {', '.join(MATRIX_LAYOUTS)}")
+    else:
+        raise ValueError(
+            f"unknown axis {axis!r}; expected one of {', '.join(MATRIX_AXES)}"
+        )
+    return value
+
+
+def load_matrices(path):
+    """Read a --matrix file and return its matrices with every axis value
+    checked and normalized. Only the axes are kept, never the cases."""
+    try:
+        spec = json.loads(Path(path).read_text(encoding="utf-8"))
+        matrices = []
+        for matrix in spec["matrices"]:
+            name = matrix["name"]
+            if not re.fullmatch(r"[\w.-]+", name):
+                raise ValueError(f"invalid matrix name {name!r}")
+
+            def values(axis, items):
+                items = items if isinstance(items, list) else [items]
+                if not items:
+                    raise ValueError(f"{name}: axis {axis} has no values")
+                return [_matrix_value(axis, item) for item in items]
+
+            matrices.append(
+                {
+                    "name": name,
+                    "axes": {
+                        axis: values(axis, items)
+                        for axis, items in matrix["axes"].items()
+                    },
+                    "exclude": [
+                        {axis: values(axis, items) for axis, items in rule.items()}
+                        for rule in matrix.get("exclude", [])
+                    ],
+                }
+            )
+    except (OSError, KeyError, TypeError, AttributeError) as ex:
+        raise ValueError(f"{path}: not a case matrix ({ex!r})") from None
+    except ValueError as ex:
+        raise ValueError(f"{path}: {ex}") from None
+    return matrices
+
+
+def _matrix_slug(axis, value):
+    if axis == "depth":
+        return f"d{value}"
+    return re.sub(r"[^A-Za-z0-9.]+", "-", str(value)).strip("-") or "none"
+
+
+def _matrix_cases(matrix):
+    """Yield the cases of ``matrix`` one combination at a time: dicts of
+    every MATRIX_AXES value plus the case and matrix names."""
+    axes = list(matrix["axes"])
+    for values in itertools.product(*matrix["axes"].values()):
+        case = dict(MATRIX_AXES, **dict(zip(axes, values)))
+        if any(
+            all(case[axis] in items for axis, items in rule.items())
+            for rule in matrix["exclude"]
+        ):
+            continue
+        case["name"] = "_".join(
+            [matrix["name"]] + [_matrix_slug(axis, case[axis]) for axis in axes]
+        )
+        case["matrix"] = matrix["name"]
+        yield case
+
+
+def _matrix_signers(case):
+    """Signer of every signature of ``case``, innermost first."""
+    inner = case["inner_signer"] or case["signer"]
+    return [inner] * (case["depth"] - 1) + [case["signer"]]
+
+
+def _matrix_statuses(case):
+    """Expected verifier status of every signature, innermost first."""
+    if case["sub_filter"] not in SIGNED_SUB_FILTERS:
+        return ["unknown"] * case["depth"]
+    statuses = [
+        generate.SPEC_STATUS[MATRIX_SIGNERS[signer][0]]
+        for signer in _matrix_signers(case)
+    ]
+    if case["tamper"] == "content":
+        statuses = ["invalid"] * len(statuses)
+    elif case["tamper"] == "outer":
+        statuses[-1] = "invalid"
+    return statuses
+
+
+def _matrix_page_text(case):
+    statuses = _matrix_statuses(case)
+    status = generate._expected_status(statuses)
+    icon, banner = STATUS_UI[status]
+    axes = ", ".join(
+        f"{axis}={case[axis]}"
+        for axis in MATRIX_AXES
+        if case[axis] is not None and case[axis] != MATRIX_AXES[axis]
+    )
+    lines = []
+    for index, (signer, signer_status) in reversed(
+        list(enumerate(zip(_matrix_signers(case), statuses), start=1))
+    ):
+        lines.append(
+            f"Signature{index}: {MATRIX_SIGNERS[signer][1]} -> {signer_status}."
+        )
+    if case["sub_filter"] not in SIGNED_SUB_FILTERS:
+        lines.append(
+            f"pdf.js maps /SubFilter {case['sub_filter']} to signatureType "
+            f"null and never verifies it."
+        )
+    cards = (
+        f"Signature{case['depth']} is the outermost card; each older "
+        f"signature is nested under the next newer one."
+    )
+    return generate.PAGE_HEADER + f"""\
+Expected verification state: {status.upper()} — {case["name"]}
+
+Case matrix {case["matrix"]}: {axes or "every axis at its default"}.
+
+{chr(10).join(lines)}
+
+{MATRIX_TAMPERS[case["tamper"]]}
+
+Toolbar icon: {icon}.
+Banner: {banner} (count = {statuses.count(status)}).
+{cards}
+"""
+
+
+def _matrix_layout(case, scale=None, layout=None):
+    """The (scale, layout) ``case`` is built with: the command line's,
+    overridden by the case's scale, payload and layout axes."""
+    layout = dict(layout or {})
+    if case["layout"] is not None:
+        layout.update(MATRIX_LAYOUTS[case["layout"]])
+    if case["payload"] is not None:
+        layout["payload"] = generate.parse_payload(case["payload"])
+    if case["scale"] is not None:
+        scale = generate.parse_scale(case["scale"])
+    return scale, layout
+
+
+def _build_matrix_case(case, scale=None, layout=None):
+    """One case of a --matrix file; ``scale`` and ``layout`` already hold
+    its axes (see _matrix_layout)."""
+    signed = case["sub_filter"] in SIGNED_SUB_FILTERS
+    spec_templates = [
+        MATRIX_SIGNERS[signer][0] if signed else None
+        for signer in _matrix_signers(case)
+    ]
+    writer, nums, fields = generate._write_chain(
+        _matrix_page_text(case),
+        spec_templates,
+        scale,
+        layout,
+        sub_filter=case["sub_filter"],
+    )
+    tamper = case["tamper"]
+    if tamper == "update":
+        generate._append_updates(writer, nums, fields, 1)
+    elif tamper == "garbage":
+        generate._append_tail(writer, 1, 0)
+    pdf = writer.buf
+    if tamper == "content":
+        generate._tamper_header(pdf)
+    elif tamper == "outer":
+        # Flip the case of the /Reason's first letter.
+        pdf[pdf.rindex(b"/Reason (") + len(b"/Reason (")] ^= 0x20
+    return pdf
+
+
+def _matrix_jobs(matrices, scale=None, layout=None):
+    """Jobs (see generate._jobs) for every case of ``matrices``, generated
+    lazily so a matrix of any size is never expanded in memory."""
+    for matrix in matrices:
+        for case in _matrix_cases(matrix):
+            case_scale, case_layout = _matrix_layout(case, scale, layout)
+            meta = generate._status_meta(
+                _matrix_statuses(case),
+                expected_signatures=case["depth"],
+                matrix=case["matrix"],
+                axes={axis: case[axis] for axis in matrix["axes"]},
+            )
+            meta.update((key, value) for key, value in case_layout.items() if value)
+            yield (
+                case["name"],
+                _build_matrix_case,
+                (case, case_scale, case_layout),
+                meta,
+            )
@@ -0,0 +1,288 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""Malformed variants of a signed PDF for ``generate.py --mutations``.
+
+Every variant breaks one thing about the one /Sig dict of a case built by
+generate.py, and comes with the outcome pdf.js must reach for it; see
+SigMutator.
+"""
+
+import itertools
+import random
+
+import generate
+
+
+# SubFilter values to swap in, with the subFilter and signatureType
+# pdf.js reports for each; None stands for no /SubFilter entry at all.
+_SUB_FILTERS = [
+    ("/adbe.pkcs7.detached", "adbe.pkcs7.detached", 0),
+    ("/adbe.pkcs7.sha1", "adbe.pkcs7.sha1", 1),
+    ("/ETSI.CAdES.detached", "ETSI.CAdES.detached", None),
+    ("/ETSI.RFC3161", "ETSI.RFC3161", None),
+    ("/adbe.x509.rsa_sha1", "adbe.x509.rsa_sha1", None),
+    ("/adbe#2Epkcs7#2Esha1", "adbe.pkcs7.sha1", 1),
+    ("(adbe.pkcs7.sha1)", None, None),
+    (None, None, None),
+]
+
+# Non-integer ByteRange elements; "N.0" is an integer to pdf.js.
+_NON_INTEGERS = ["1.5", "/N", "(0)", "true", "null", "[]", "<< >>", "5 0 R"]
+_NOT_ARRAYS = ["0", "/ByteRange", "(0 1 2 3)", "<< >>", "null"]
+_NON_STRINGS = ["0", "/Contents", "[]", "<< >>", "null", "true", "5 0 R"]
+
+
+class SigMutator:
+    """Seeded stream of malformed variants of a one-signature PDF.
+
+    Every variant changes one thing about the signature: a /ByteRange
+    value or shape, the /Contents length, encoding or type, the
+    /SubFilter, or the file length. Tokens are replaced by ones of the
+    same byte width (padded with spaces), so every other offset, the xref
+    included, stays valid and only the signature itself is malformed.
+    Each variant comes with the outcome the checks in
+    PDFDocument.#parseSignatureDict must reach: "accept" (the signature
+    is reported by getSignatures) or "reject".
+    """
+
+    def __init__(self, base, seed=0):
+        self.base = bytes(base)
+        matches = list(generate._SIG_DICT_RE.finditer(self.base))
+        if len(matches) != 1:
+            raise ValueError("the mutation base must have exactly one /Sig dict")
+        match = matches[0]
+        self.sub_filter = (match.start(), match.end(1))
+        self.byte_range = match.span(2)
+        self.contents = match.span(3)
+        self.byte_range_values = [int(v) for v in match.group(2)[1:-1].split()]
+        hex_digits = match.group(4)
+        der = bytes.fromhex(hex_digits.decode("ascii"))
+        if der.strip(b"\0"):
+            _, header, length = generate._der_header(der, 0)
+            self.pkcs7_hex = hex_digits[:2 * (header + length)]
+        else:
+            # A zero-filled placeholder (no PKCS#7) still has a byte to keep.
+            self.pkcs7_hex = b"00"
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.kinds = [
+            (name[len("_mutate_"):], getattr(self, name))
+            for name in sorted(dir(self))
+            if name.startswith("_mutate_")
+        ]
+
+    def __iter__(self):
+        """Yield (kind, description, outcome, extra manifest fields, PDF
+        bytes) forever, cycling through the kinds so every one is covered
+        before any repeats."""
+        for index in itertools.count():
+            kind, mutate = self.kinds[index % len(self.kinds)]
+            pdf = bytearray(self.base)
+            detail, outcome, *extra = mutate(pdf)
+            yield kind, detail, outcome, (extra[0] if extra else {}), pdf
+
+    @staticmethod
+    def _replace(pdf, span, text):
+        start, end = span
+        data = text.encode("latin-1") if isinstance(text, str) else text
+        if len(data) > end - start:
+            raise ValueError(f"{text!r} does not fit in {end - start} bytes")
+        pdf[start:end] = data.ljust(end - start, b" ")
+        return text
+
+    def _set_byte_range(self, pdf, values):
+        text = "[" + " ".join(str(v) for v in values) + "]"
+        return self._replace(pdf, self.byte_range, text)
+
+    # ByteRange.
+
+    def _mutate_byte_range_valid(self, pdf):
+        a, b, c, d = self.byte_range_values
+        rng = self.rng
+        choice = rng.randrange(4)
+        if choice == 0:
+            # Covers less than the whole file.
+            d = rng.randrange(0, d)
+        elif choice == 1:
+            # Signs some other, still ordered, pair of spans.
+            b = rng.randint(1, c)
+            c = rng.randint(b, len(pdf))
+            d = rng.randint(0, len(pdf) - c)
+        elif choice == 2:
+            # No gap between the spans.
+            c = b
+            d = rng.randint(0, len(pdf) - c)
+        else:
+            # Integral reals are integers to pdf.js.
+            return self._replace(
+                pdf, self.byte_range, f"[0 {b}.0 {c} {d}.0]"
+            ), "accept"
+        return self._set_byte_range(pdf, (a, b, c, d)), "accept"
+
+    def _mutate_byte_range_start(self, pdf):
+        _, b, c, d = self.byte_range_values
+        return self._set_byte_range(pdf, (self.rng.randint(1, b), b, c, d)), "reject"
+
+    def _mutate_byte_range_empty_first_span(self, pdf):
+        _, b, c, d = self.byte_range_values
+        return self._set_byte_range(pdf, (0, 0, c, d)), "reject"
+
+    def _mutate_byte_range_negative(self, pdf):
+        values = list(self.byte_range_values)
+        index = self.rng.randrange(1, 4)
+        values[index] = -self.rng.randint(1, max(1, values[index]))
+        return self._set_byte_range(pdf, values), "reject"
+
+    def _mutate_byte_range_overlap(self, pdf):
+        _, b, _, _ = self.byte_range_values
+        c = self.rng.randrange(0, b)
+        d = self.rng.randint(0, len(pdf) - c)
+        return self._set_byte_range(pdf, (0, b, c, d)), "reject"
+
+    def _mutate_byte_range_past_eof(self, pdf):
+        _, b, c, d = self.byte_range_values
+        rng = self.rng
+        extra = rng.choice([1, rng.randint(2, 65536), rng.randint(65537, 10**9)])
+        if rng.randrange(4) == 0:
+            # Points at the far end of a huge file.
+            return self._set_byte_range(pdf, (0, b, 9_999_999_999 - d, d)), "reject"
+        return self._set_byte_range(pdf, (0, b, c, d + extra)), "reject"
+
+    def _mutate_byte_range_non_integer(self, pdf):
+        values = [str(v) for v in self.byte_range_values]
+        values[self.rng.randrange(4)] = self.rng.choice(_NON_INTEGERS)
+        return self._replace(pdf, self.byte_range, f"[{' '.join(values)}]"), "reject"
+
+    def _mutate_byte_range_length(self, pdf):
+        count = self.rng.choice([0, 1, 2, 3, 5, 6])
+        values = (self.byte_range_values + [0, 0])[:count]
+        return self._set_byte_range(pdf, values), "reject"
+
+    def _mutate_byte_range_not_array(self, pdf):
+        return self._replace(pdf, self.byte_range, self.rng.choice(_NOT_ARRAYS)), (
+            "reject"
+        )
+
+    # /Contents.
+
+    def _mutate_contents_empty(self, pdf):
+        text = self.rng.choice(["/Contents <>", "/Contents ()", "/Contents < >"])
+        return self._replace(pdf, self.contents, text), "reject"
+
+    def _mutate_contents_missing(self, pdf):
+        self._replace(pdf, self.contents, "")
+        return "no /Contents", "reject"
+
+    def _mutate_contents_non_string(self, pdf):
+        text = "/Contents " + self.rng.choice(_NON_STRINGS)
+        return self._replace(pdf, self.contents, text), "reject"
+
+    def _mutate_contents_length(self, pdf):
+        """A /Contents shorter than the placeholder: the bare DER, a prefix
+        of it (possibly odd-length), or a single byte."""
+        hex_digits = self.pkcs7_hex
+        length = self.rng.choice(
+            [len(hex_digits), self.rng.randint(1, len(hex_digits)), 1, 2]
+        )
+        text = b"/Contents <" + hex_digits[:length] + b">"
+        self._replace(pdf, self.contents, text)
+        return f"{length} hex digits", "accept"
+
+    def _mutate_contents_encoding(self, pdf):
+        """The same DER as lowercase hex, hex broken over lines, or a
+        literal string, whichever fit in the placeholder."""
+        hex_digits = self.pkcs7_hex
+        width = self.rng.choice([2, 64, 127])
+        der = bytes.fromhex(hex_digits.decode("ascii"))
+        escaped = (
+            der.replace(b"\\", b"\\\\")
+            .replace(b"(", b"\\(")
+            .replace(b")", b"\\)")
+            .replace(b"\r", b"\\r")
+        )
+        candidates = [
+            ("lowercase hex", b"<" + hex_digits.lower() + b">"),
+            (
+                f"hex in lines of {width}",
+                b"<"
+                + b"\n".join(
+                    hex_digits[i:i + width] for i in range(0, len(hex_digits), width)
+                )
+                + b">",
+            ),
+            ("literal string", b"(" + escaped + b")"),
+        ]
+        room = self.contents[1] - self.contents[0] - len(b"/Contents ")
+        detail, body = self.rng.choice(
+            [(detail, body) for detail, body in candidates if len(body) <= room]
+        )
+        self._replace(pdf, self.contents, b"/Contents " + body)
+        return detail, "accept"
+
+    # SubFilter.
+
+    def _mutate_sub_filter(self, pdf):
+        width = self.sub_filter[1] - self.sub_filter[0]
+        candidates = [
+            entry
+            for entry in _SUB_FILTERS
+            if entry[0] is None or len("/SubFilter " + entry[0]) <= width
+        ]
+        value, sub_filter, signature_type = self.rng.choice(candidates)
+        text = "" if value is None else "/SubFilter " + value
+        self._replace(pdf, self.sub_filter, text)
+        return (
+            text or "no /SubFilter",
+            "accept",
+            {"sub_filter": sub_filter, "signature_type": signature_type},
+        )
+
+    # Truncation.
+
+    def _mutate_truncated(self, pdf):
+        """Cut the file short of the signed end (c + d), which is also
+        where the xref and trailer are."""
+        _, b, c, _ = self.byte_range_values
+        rng = self.rng
+        length = rng.choice(
+            [
+                len(pdf) - 1,
+                rng.randrange(c, len(pdf)),
+                rng.randrange(b, c),
+                rng.randrange(1, len(pdf)),
+            ]
+        )
+        del pdf[length:]
+        return f"truncated to {length} bytes", "reject"
+
+
+def _write_mutations(base_name, mutator, base_signatures, count, sink):
+    """Add the first ``count`` variants from ``mutator`` to ``sink`` as
+    mutant_<index>_<kind>.pdf, one at a time, and return their manifest
+    entries. An accepted variant reports as many signatures as the base
+    (``base_signatures``), a rejected one none."""
+    entries = []
+    mutations = itertools.islice(mutator, count)
+    for index, (kind, detail, outcome, extra, pdf) in enumerate(mutations):
+        filename = f"mutant_{index:05d}_{kind}.pdf"
+        sink.add(filename, pdf)
+        entries.append(
+            {
+                "file": filename,
+                "size": len(pdf),
+                "expected_signatures": base_signatures if outcome == "accept" else 0,
+                "outcome": outcome,
+                "mutation": kind,
+                "detail": detail,
+                "base": base_name,
+                "seed": mutator.seed,
+                **extra,
+            }
+        )
+    return entries
@@ -0,0 +1,194 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""Per-stage timings for ``generate.py --profile``.
+
+No dependencies beyond the Python standard library.
+"""
+
+import cProfile
+import contextlib
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+
+class StageProfiler:
+    """Per-case timings for --profile: wall time, CPU time, peak traced
+    allocations and bytes processed of every stage a case goes through.
+
+    Stages nest (a chain signs inside its build, say). A stage's figures
+    exclude the stages nested in it, and the case's work outside any
+    stage is reported as "other", so the stages of a case add up to its
+    total. A stage's peak is the most tracemalloc saw allocated while it
+    ran beyond what was allocated when it began (including what nested
+    stages left allocated); the case's peak includes every stage.
+
+    Pool workers return their case records along with the built files;
+    the parent collects them with ``add`` and writes them with ``dump``.
+    With ``cprofile`` every case also runs under cProfile, and the parent
+    merges the statistics.
+    """
+
+    def __init__(self, cprofile=False):
+        self.cprofile = cprofile
+        self.cases = []
+        self.stages = {}
+        self._pstats = None
+        self._stack = []
+        self._case_stages = None
+        tracemalloc.start()
+
+    @staticmethod
+    def _stage_stats(stages, name):
+        return stages.setdefault(
+            name,
+            {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "bytes": 0, "peak_bytes": 0},
+        )
+
+    @contextlib.contextmanager
+    def _frame(self, stats, size):
+        current, outer_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        frame = {
+            "bytes": size,
+            "own_peak": 0,
+            "nested_peak": 0,
+            "nested_wall": 0.0,
+            "nested_cpu": 0.0,
+        }
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield frame
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._stack.pop()
+            own_peak = max(tracemalloc.get_traced_memory()[1], frame["own_peak"])
+            peak = max(own_peak, frame["nested_peak"])
+            stats["calls"] += 1
+            stats["wall_s"] += wall - frame["nested_wall"]
+            stats["cpu_s"] += cpu - frame["nested_cpu"]
+            stats["bytes"] += frame["bytes"]
+            stats["peak_bytes"] = max(stats["peak_bytes"], own_peak - current)
+            frame.update(wall=wall, cpu=cpu, peak=peak - current)
+            if self._stack:
+                # Hand the enclosing stage the peak it had reached before
+                # we reset it, and ours, then let it track its own again.
+                parent = self._stack[-1]
+                parent["own_peak"] = max(parent["own_peak"], outer_peak)
+                parent["nested_peak"] = max(parent["nested_peak"], peak)
+                parent["nested_wall"] += wall
+                parent["nested_cpu"] += cpu
+                tracemalloc.reset_peak()
+
+    def stage(self, name, size=0):
+        """Context manager timing stage ``name`` of the current case, if
+        any. It yields a dict whose "bytes", initially ``size``, may be
+        raised once the stage knows how much it processed."""
+        if self._case_stages is None:
+            return contextlib.nullcontext({"bytes": size})
+        return self._frame(self._stage_stats(self._case_stages, name), size)
+
+    @contextlib.contextmanager
+    def case(self, record=None):
+        """Profile one case; yields its record, filled in when the block
+        exits. Passing an earlier ``record`` adds to it instead."""
+        profiler = None
+        if record is None:
+            record = {"wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": 0, "stages": {}}
+            if self.cprofile:
+                profiler = cProfile.Profile()
+        stats = self._stage_stats(record["stages"], "other")
+        self._case_stages = record["stages"]
+        try:
+            with self._frame(stats, 0) as frame:
+                if profiler:
+                    profiler.enable()
+                try:
+                    yield record
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            self._case_stages = None
+        record["wall_s"] += frame["wall"]
+        record["cpu_s"] += frame["cpu"]
+        record["peak_bytes"] = max(record["peak_bytes"], frame["peak"])
+        if profiler:
+            profiler.create_stats()
+            record["pstats"] = profiler.stats
+
+    def add(self, filename, status, record):
+        """Collect the ``record`` of a case built here or in a worker."""
+        pstats_data = record.pop("pstats", None)
+        if pstats_data is not None:
+            # pstats.Stats loads anything with create_stats() and .stats.
+            loaded = types.SimpleNamespace(create_stats=lambda: None, stats=pstats_data)
+            if self._pstats is None:
+                self._pstats = pstats.Stats(loaded)
+            else:
+                self._pstats.add(loaded)
+        for name, stats in record["stages"].items():
+            total = self._stage_stats(self.stages, name)
+            for key in ("calls", "wall_s", "cpu_s", "bytes"):
+                total[key] += stats[key]
+            total["peak_bytes"] = max(total["peak_bytes"], stats["peak_bytes"])
+        self.cases.append({"file": filename, "status": status, **record})
+
+    def dump(self, path, pstats_path=None, **meta):
+        """Write the JSON report to ``path`` and the merged cProfile
+        statistics to ``pstats_path``, and return the stage totals."""
+        stages = {
+            name: self.stages[name]
+            for name in PROFILE_STAGES + sorted(self.stages)
+            if name in self.stages
+        }
+        report = {
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            **meta,
+            "wall_s": sum(case["wall_s"] for case in self.cases),
+            "cpu_s": sum(case["cpu_s"] for case in self.cases),
+            "peak_bytes": max((case["peak_bytes"] for case in self.cases), default=0),
+            "stages": stages,
+            "cases": self.cases,
+        }
+        Path(path).write_text(json.dumps(report, indent=2) + "\n")
+        if pstats_path is not None and self._pstats is not None:
+            self._pstats.dump_stats(pstats_path)
+        return stages
+
+
+# The stages of a case, in the order the report lists them.
+PROFILE_STAGES = [
+    "build",
+    "hash",
+    "sign",
+    "splice",
+    "append",
+    "post_process",
+    "manifest",
+    "write",
+    "other",
+]
+
+
+def print_profile(stages):
+    """Print the stage totals of a StageProfiler report."""
+    print(f"  {'stage':<12} {'wall s':>9} {'CPU s':>9} {'MB':>10} {'peak MB':>9}")
+    for name, stats in stages.items():
+        print(
+            f"  {name:<12} {stats['wall_s']:9.3f} {stats['cpu_s']:9.3f} "
+            f"{stats['bytes'] / 1e6:10.1f} {stats['peak_bytes'] / 1e6:9.1f}"
+        )
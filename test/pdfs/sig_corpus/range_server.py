@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""Serve a generated signature corpus over HTTP with Range support.
+
+pdf.js loads large documents in chunks, and signature verification falls
+back to ``pdfManager.requestRange`` for any /ByteRange data it does not
+have yet. This server makes those round trips visible and slow on purpose:
+every response is delayed by a simulated round-trip time, the body is
+paced to a given bandwidth, ranges can be capped to a maximum length, and
+every range served is logged.
+
+Run from the pdf.js root, then open the printed URLs in a viewer:
+
+    python3 test/pdfs/sig_corpus/range_server.py --rtt-ms 150 \\
+        --bandwidth-kbps 2000 --log /tmp/ranges.jsonl
+
+No dependencies beyond the Python standard library.
+"""
+
+import argparse
+import collections
+import json
+import re
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+CORPUS_DIR = Path(__file__).resolve().parent
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeLog:
+    """Thread-safe record of every response, optionally mirrored to a
+    JSON-lines file, with per-file totals for the exit summary."""
+
+    def __init__(self, path=None, quiet=False):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._quiet = quiet
+        self.totals = collections.defaultdict(lambda: [0, 0])
+        self._start = time.monotonic()
+
+    def record(self, name, status, start, end, sent):
+        entry = {
+            "t": round(time.monotonic() - self._start, 6),
+            "file": name,
+            "status": status,
+            "start": start,
+            "end": end,
+            "bytes": sent,
+        }
+        with self._lock:
+            totals = self.totals[name]
+            totals[0] += 1
+            totals[1] += sent
+            if self._file:
+                self._file.write(json.dumps(entry) + "\n")
+                self._file.flush()
+            if not self._quiet:
+                sys.stderr.write(
+                    f"  {status} {name} bytes {start}-{end} "
+                    f"({sent} bytes sent)\n"
+                )
+
+    def summary(self):
+        lines = []
+        for name, (requests, sent) in sorted(self.totals.items()):
+            lines.append(f"  {name}: {requests} request(s), {sent} bytes")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    # Set on the subclass built by make_handler().
+    root = None
+    rtt = 0.0
+    bandwidth = 0
+    max_range = 0
+    chunk_size = 16384
+    range_log = None
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Ranges are reported through RangeLog instead.
+        pass
+
+    def _cors_headers(self):
+        # Allow a viewer served from another origin (e.g. `gulp server`).
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Headers", "Range")
+        self.send_header(
+            "Access-Control-Expose-Headers",
+            "Accept-Ranges, Content-Range, Content-Length",
+        )
+
+    def _resolve(self):
+        rel = unquote(urlsplit(self.path).path).lstrip("/")
+        path = (self.root / rel).resolve()
+        if path != self.root and self.root not in path.parents:
+            return None
+        return path
+
+    def _send_error(self, status):
+        self.send_response(status)
+        self._cors_headers()
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_OPTIONS(self):
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self._cors_headers()
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def _serve(self, head):
+        # One simulated round trip before anything comes back.
+        if self.rtt:
+            time.sleep(self.rtt)
+
+        path = self._resolve()
+        if path is None:
+            self._send_error(HTTPStatus.FORBIDDEN)
+            return
+        if path.is_dir():
+            self._send_listing(path, head)
+            return
+        if not path.is_file():
+            self._send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        match = _RANGE_RE.match(self.headers.get("Range", "").strip())
+        if match and (match.group(1) or match.group(2)):
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                # Suffix range: the last N bytes.
+                start = max(0, size - int(last))
+            if start >= size or start > end:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self._cors_headers()
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                self.range_log.record(path.name, 416, start, end, 0)
+                return
+            if self.max_range:
+                # Emulate servers that cap range length: the client gets a
+                # shorter 206 and has to ask again for the rest.
+                end = min(end, start + self.max_range - 1)
+            status = HTTPStatus.PARTIAL_CONTENT
+        # Anything else (no Range, multi-range, malformed) gets the whole
+        # file, which RFC 9110 permits.
+
+        length = end - start + 1 if size else 0
+        self.send_response(status)
+        self._cors_headers()
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(length))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        sent = 0
+        if not head:
+            try:
+                sent = self._send_body(path, start, length)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        self.range_log.record(path.name, int(status), start, end, sent)
+
+    def _send_body(self, path, start, length):
+        """Write ``length`` bytes from ``start``, paced to the bandwidth."""
+        sent = 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            began = time.monotonic()
+            while sent < length:
+                chunk = f.read(min(self.chunk_size, length - sent))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if self.bandwidth:
+                    ahead = sent / self.bandwidth - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        return sent
+
+    def _send_listing(self, path, head):
+        names = sorted(p.name for p in path.iterdir() if p.suffix == ".pdf")
+        body = json.dumps(names, indent=2).encode("utf-8") + b"\n"
+        self.send_response(HTTPStatus.OK)
+        self._cors_headers()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+def make_handler(root, *, rtt, bandwidth, max_range, chunk_size, range_log):
+    return type(
+        "ConfiguredRangeRequestHandler",
+        (RangeRequestHandler,),
+        {
+            "root": root,
+            "rtt": rtt,
+            "bandwidth": bandwidth,
+            "max_range": max_range,
+            "chunk_size": chunk_size,
+            "range_log": range_log,
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dir",
+        type=Path,
+        default=CORPUS_DIR,
+        help="Directory to serve (default: this script's directory).",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8042)
+    parser.add_argument(
+        "--rtt-ms",
+        type=float,
+        default=0,
+        help="Delay before every response, in milliseconds (default: 0).",
+    )
+    parser.add_argument(
+        "--bandwidth-kbps",
+        type=float,
+        default=0,
+        help="Pace response bodies to this many kilobits/s (default: unlimited).",
+    )
+    parser.add_argument(
+        "--max-range",
+        type=int,
+        default=0,
+        help=(
+            "Serve at most this many bytes per range request; longer ranges "
+            "are truncated (default: no limit)."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=16384,
+        help="Bytes written per socket send when pacing (default: 16384).",
+    )
+    parser.add_argument(
+        "--log",
+        type=Path,
+        default=None,
+        help="Append one JSON line per response to this file.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not print every range served to stderr.",
+    )
+    args = parser.parse_args()
+
+    root = args.dir.resolve()
+    range_log = RangeLog(args.log, quiet=args.quiet)
+    handler = make_handler(
+        root,
+        rtt=args.rtt_ms / 1000,
+        bandwidth=args.bandwidth_kbps * 1000 / 8,
+        max_range=args.max_range,
+        chunk_size=args.chunk_size,
+        range_log=range_log,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    host, port = server.server_address[:2]
+    print(f"Serving {root} on http://{host}:{port}/")
+    for name in sorted(p.name for p in root.glob("*.pdf")):
+        print(f"  http://{host}:{port}/{name}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        range_log.close()
+        print("\nRanges served:")
+        print(range_log.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""Re-signing of existing PDFs for ``generate.py --resign``.
+
+A copy of every input gets one incremental update appended, adding a Sig
+field and a verified signature over the whole file. The original bytes
+are never rewritten, so signatures already there stay valid.
+"""
+
+import hashlib
+import itertools
+import mmap
+import re
+import sys
+import tempfile
+import zlib
+
+import generate
+import inspect_pdf
+
+
+def _read_object(mm, xref, num):
+    """(generation, value) of object ``num`` of ``mm``, at the offset or in
+    the object stream ``xref`` (every section merged) lists for it."""
+    entry = xref.get(num)
+    if entry is None:
+        raise ValueError(f"object {num} is not in the xref")
+    if isinstance(entry, tuple):
+        stream_num, index = entry
+        if not isinstance(xref.get(stream_num), int):
+            raise ValueError(f"object stream {stream_num} is not in the xref")
+        stream_dict, data = inspect_pdf._stream_at(mm, xref[stream_num])
+        first = inspect_pdf._dict_int(stream_dict, b"First")
+        offsets = [int(v) for v in data[:first].split()[1::2]]
+        start = inspect_pdf._WHITESPACE_RE.match(data, first + offsets[index]).end()
+        return 0, data[start:inspect_pdf._value_end(data, start)]
+    header = inspect_pdf._OBJ_HEADER_RE.match(mm, entry)
+    if header is None or int(header.group(1)) != num:
+        raise ValueError(f"object {num} is not at {entry}")
+    end = inspect_pdf._value_end(mm, header.end())
+    return int(header.group(2)), mm[header.end():end]
+
+
+def _rewritten(num, generation, body):
+    """(num, body) of an object to write again in the update: PdfWriter
+    only writes generation 0."""
+    if generation != 0:
+        raise ValueError(f"object {num} has generation {generation}")
+    return num, body
+
+
+def _dict_set(data, entries, key, value):
+    """Dict ``data`` with /``key`` (see inspect_pdf._dict_entries for
+    ``entries``) set to ``value``. A new entry goes right after the last
+    value, before any comment that ends its line."""
+    if key in entries:
+        start, end = entries[key]
+        return data[:start] + value + data[end:]
+    last = max((end for _, end in entries.values()), default=data.index(b"<<") + 2)
+    return data[:last] + b" /" + key + b" " + value + data[last:]
+
+
+def _array_append(data, value):
+    """Array ``data`` with ``value`` added after its last element."""
+    pos = last = inspect_pdf._WHITESPACE_RE.match(data).end()
+    if not data.startswith(b"[", pos):
+        raise ValueError("/Fields is not an array")
+    pos = last = pos + 1
+    while True:
+        pos = inspect_pdf._WHITESPACE_RE.match(data, pos).end()
+        if data[pos:pos + 1] in (b"]", b""):
+            break
+        pos = last = inspect_pdf._value_end(data, pos)
+    return data[:last] + b" " + value + data[last:]
+
+
+def _add_field(mm, xref, acro_form, field_ref):
+    """The /AcroForm dict ``acro_form`` with ``field_ref`` added to its
+    /Fields and /SigFlags 3, and the (num, body) of the /Fields array if
+    it is an object of its own and has to be written again instead."""
+    objects = []
+    entries = inspect_pdf._dict_entries(acro_form)
+    if b"Fields" not in entries:
+        acro_form = _dict_set(acro_form, entries, b"Fields", b"[" + field_ref + b"]")
+    else:
+        start, end = entries[b"Fields"]
+        ref = inspect_pdf._ref(acro_form[start:end])
+        if ref is None:
+            acro_form = (
+                acro_form[:start]
+                + _array_append(acro_form[start:end], field_ref)
+                + acro_form[end:]
+            )
+        else:
+            generation, fields = _read_object(mm, xref, ref[0])
+            objects.append(
+                _rewritten(ref[0], generation, _array_append(fields, field_ref))
+            )
+    entries = inspect_pdf._dict_entries(acro_form)
+    return _dict_set(acro_form, entries, b"SigFlags", b"3"), objects
+
+
+def _resign_plan(mm):
+    """What appending a signature to the PDF ``mm`` takes, as (kind,
+    startxref, size, root, objects, trailer_entries): the kind, offset
+    and /Size of its newest xref section, the object number of its
+    catalog, the (num, body) of every object to write again so that the
+    /AcroForm (created if need be) lists a new field numbered ``size``,
+    and the /Info and /ID to carry over to the new trailer."""
+    sections = inspect_pdf._xref_sections(mm)
+    startxref, kind, _, trailer = sections[0]
+    trailer_dict = inspect_pdf._dict_entries(trailer)
+    if b"Encrypt" in trailer_dict:
+        raise ValueError("encrypted")
+    root = None
+    if b"Root" in trailer_dict:
+        root = inspect_pdf._ref(trailer[slice(*trailer_dict[b"Root"])])
+    if root is None:
+        raise ValueError("no /Root")
+    root = root[0]
+    xref = {}
+    for _, _, entries, _ in sections:
+        for num, entry in entries.items():
+            xref.setdefault(num, entry)
+    # Some files understate /Size.
+    size = max(inspect_pdf._dict_int(trailer, b"Size") or 0, max(xref, default=0) + 1)
+    field_ref = b"%d 0 R" % size
+
+    generation, catalog = _read_object(mm, xref, root)
+    entries = inspect_pdf._dict_entries(catalog)
+    if b"AcroForm" not in entries:
+        acro_form = b"<< /Fields [" + field_ref + b"] /SigFlags 3 >>"
+        catalog = _dict_set(catalog, entries, b"AcroForm", acro_form)
+        objects = [_rewritten(root, generation, catalog)]
+    else:
+        start, end = entries[b"AcroForm"]
+        ref = inspect_pdf._ref(catalog[start:end])
+        if ref is None:
+            acro_form, objects = _add_field(mm, xref, catalog[start:end], field_ref)
+            objects.append(
+                _rewritten(
+                    root, generation, catalog[:start] + acro_form + catalog[end:]
+                )
+            )
+        else:
+            generation, acro_form = _read_object(mm, xref, ref[0])
+            acro_form, objects = _add_field(mm, xref, acro_form, field_ref)
+            objects.append(_rewritten(ref[0], generation, acro_form))
+    trailer_entries = b"".join(
+        b" /%s %s" % (key, trailer[slice(*trailer_dict[key])])
+        for key in (b"Info", b"ID")
+        if key in trailer_dict
+    )
+    return kind, startxref, size, root, objects, trailer_entries
+
+
+def _build_resigned(source, source_sha256, layout=None):
+    """``source`` with one verified signature appended as an incremental
+    update: a new Sig field listed in its /AcroForm and a /Sig dict whose
+    /ByteRange covers the whole file. The original bytes are copied as
+    they are, and the update's xref section is of the same kind as the
+    newest one (a table for a hybrid file) and chains to it through
+    /Prev. The copy is always built on disk, so the signed spans are
+    hashed from a mapping of it.
+
+    ``source_sha256`` is the SHA-256 of the bytes of ``source``: the job's
+    fingerprint and the signature's cache key follow the content, not
+    the path. Only the contents_slack of ``layout`` applies."""
+    with open(source, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            kind, startxref, size, root, objects, trailer_entries = _resign_plan(mm)
+    writer = generate.PdfWriter(
+        xref_streams=kind == "stream",
+        spool_dir=generate.SPOOL_DIR or tempfile.gettempdir(),
+        base=source,
+    )
+    writer.startxref = startxref
+    writer.size = size
+    writer.write(b"\n")
+    writer.obj(
+        size,
+        b"<< /Type /Annot /Subtype /Widget /FT /Sig /T (Resigned%d) "
+        b"/V %d 0 R /Rect [0 0 0 0] /F 4 >>" % (size, size + 1),
+    )
+    sig = writer.sig_obj(
+        size + 1,
+        sub_filter="/adbe.pkcs7.detached",
+        signing_time=b"D:%sZ" % generate._signing_time(0),
+        reason=b"Appended to an existing document",
+        contents_len=generate._contents_len(generate.SPEC_VERIFIED)
+        + (layout or {}).get("contents_slack", 0),
+    )
+    for num, body in objects:
+        writer.obj(num, body)
+    writer.write_xref(size=size + 2, root=root, trailer_entries=trailer_entries)
+    generate._sign_placeholder(
+        writer,
+        sig,
+        generate.SPEC_VERIFIED,
+        page_text=source_sha256,
+        sub_filter="/adbe.pkcs7.detached",
+    )
+    return writer.buf
+
+
+def _resign_jobs(paths, layout=None):
+    """Jobs (see generate._jobs) re-signing every PDF of ``paths`` (see
+    inspect_pdf._inspect_paths) as resigned_<name>, generated lazily.
+    Files that cannot be, such as encrypted ones or ones whose xref is
+    broken, are skipped with a message on stderr, which stays clean when
+    the corpus is written to stdout."""
+    names = set()
+    for path in inspect_pdf._inspect_paths(paths):
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    _resign_plan(mm)
+                    existing = len(generate._find_byte_ranges(mm))
+                    source_sha256 = hashlib.sha256(mm).hexdigest()
+        except (OSError, ValueError, zlib.error) as ex:
+            print(f"  skipped {path}: {ex}", file=sys.stderr)
+            continue
+        name = "resigned_" + re.sub(r"[^A-Za-z0-9_.-]", "_", path.stem)
+        unique = name
+        for n in itertools.count(2):
+            if unique not in names:
+                break
+            unique = f"{name}_{n}"
+        names.add(unique)
+        # The statuses of the signatures already there are unknown.
+        meta = generate._status_meta(
+            [None] * existing + ["verified"],
+            expected_signatures=existing + 1,
+            source=str(path),
+        )
+        if (layout or {}).get("contents_slack"):
+            meta["contents_slack"] = layout["contents_slack"]
+        yield (
+            unique,
+            _build_resigned,
+            (str(path), source_sha256, layout),
+            meta,
+        )
@@ -0,0 +1,125 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import json
+import re
+
+import pytest
+
+import conftest
+import generate
+import inspect_pdf
+
+# Layout options and the xref sections of a two-signature chain, oldest
+# first: a linearized base has a first-page and a main section.
+MODES = {
+    "classic": ({}, ["table", "table"]),
+    "linearized": ({"linearized": True}, ["table", "table", "table"]),
+    "xref_streams": ({"xref_streams": True}, ["stream", "stream"]),
+}
+
+
+def _write(tmp_path, name, pdf):
+    path = tmp_path / name
+    path.write_bytes(pdf)
+    return path
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_chain(tmp_path, stub_signer, mode):
+    layout, xref = MODES[mode]
+    pdf = generate._build_revision_chain(2, layout=layout)
+    result = inspect_pdf._inspect_pdf(_write(tmp_path, f"{mode}.pdf", pdf))
+    assert "error" not in result
+    assert result["size"] == len(pdf)
+    assert result["revisions"] == 2
+    assert result["xref"] == xref
+    sig_nums = [
+        int(num) for num in re.findall(rb"(\d+) 0 obj\n<< /Type /Sig ", pdf)
+    ]
+    assert result["signatures"] == [
+        {
+            "revision": revision,
+            "object": num,
+            "type": "Sig",
+            "sub_filter": "/adbe.pkcs7.detached",
+            "byte_range": byte_range,
+            "placeholder": conftest.STUB_PKCS7_LEN,
+        }
+        for revision, num, byte_range in zip(
+            [1, 2], sig_nums, generate._find_byte_ranges(pdf)
+        )
+    ]
+
+
+def test_broken_xref(tmp_path, stub_signer, case):
+    pdf = generate._build_single(case("signed_verified"))
+    at = generate._find_startxref(pdf)
+    pdf[at:at + 4] = b"xxxx"
+    result = inspect_pdf._inspect_pdf(_write(tmp_path, "broken.pdf", pdf))
+    assert result["error"] == f"no xref table or stream at {at}"
+    assert result["revisions"] == 0
+    # The /Sig dict is still found, outside of any revision.
+    [signature] = result["signatures"]
+    assert (signature["revision"], signature["object"]) == (None, None)
+    assert signature["byte_range"] == generate._find_byte_ranges(pdf)[0]
+
+
+def test_prev_loop(tmp_path, stub_signer):
+    pdf = generate._build_revision_chain(2)
+    last = generate._find_startxref(pdf)
+    prev = re.search(rb"/Prev (\d+)", pdf[last:])
+    looped = b"%d" % last
+    assert len(looped) == len(prev.group(1))
+    pdf[last + prev.start(1):last + prev.end(1)] = looped
+    result = inspect_pdf._inspect_pdf(_write(tmp_path, "loop.pdf", pdf))
+    assert result["error"] == f"/Prev loop at {last}"
+
+
+def test_empty_file(tmp_path):
+    result = inspect_pdf._inspect_pdf(_write(tmp_path, "empty.pdf", b""))
+    assert result["error"] == "empty file"
+    assert result["signatures"] == []
+
+
+@pytest.fixture
+def corpus(tmp_path, stub_signer, case):
+    (tmp_path / "nested").mkdir()
+    _write(tmp_path, "signed.pdf", generate._build_single(case("signed_verified")))
+    _write(tmp_path / "nested", "unsigned.pdf", b"%PDF-1.7\n")
+    _write(tmp_path, "notes.txt", b"not a PDF")
+    return tmp_path
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_json(corpus, capsys, jobs):
+    inspect_pdf.main(["--json", "--jobs", jobs, str(corpus)])
+    results = json.loads(capsys.readouterr().out)
+    assert [r["file"] for r in results] == [
+        str(corpus / "nested/unsigned.pdf"),
+        str(corpus / "signed.pdf"),
+    ]
+    assert results[0]["error"] == "no startxref"
+    assert [s["revision"] for s in results[1]["signatures"]] == [1]
+
+
+def test_main_text(corpus, capsys):
+    inspect_pdf.main(["--signed", "--jobs", "1", str(corpus)])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    assert lines[0].endswith("1 revision(s) (table), 1 signature(s)")
+    assert lines[1].startswith(
+        "    revision 1, object 5: /Type Sig, /SubFilter /adbe.pkcs7.detached, "
+        "/ByteRange ["
+    )
+    assert lines[1].endswith(f", /Contents {conftest.STUB_PKCS7_LEN} bytes")
+
+
+def test_main_nothing_to_inspect(tmp_path):
+    with pytest.raises(SystemExit, match="No PDFs to inspect"):
+        inspect_pdf.main([str(tmp_path)])
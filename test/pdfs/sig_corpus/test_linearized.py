@@ -0,0 +1,228 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import re
+import struct
+
+import pytest
+
+import generate
+import inspect_pdf
+import verify
+
+PAGES = 5
+LAYOUT = {
+    "linearized": True,
+    "payload": generate.parse_payload("flate,images=2,image-px=64"),
+}
+
+_OBJ_RE = re.compile(rb"(\d+) 0 obj\n")
+
+
+class BitReader:
+    """Reads big-endian bit fields, as the hint tables pack them."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, nbits):
+        value = 0
+        for _ in range(nbits):
+            byte = self.data[self.pos // 8]
+            value = (value << 1) | (byte >> (7 - self.pos % 8)) & 1
+            self.pos += 1
+        return value
+
+    def items(self, count, nbits):
+        """``count`` fields, then padding to the next byte boundary, which
+        every hint table item starts at."""
+        values = [self.read(nbits) for _ in range(count)]
+        self.pos += -self.pos % 8
+        return values
+
+
+def _linearization(pdf):
+    lin = pdf[:pdf.index(b"endobj")]
+    values = {
+        key.decode(): int(value)
+        for key, value in re.findall(rb"/([LOENT]) (\d+)", lin)
+    }
+    values["H"] = [int(v) for v in re.search(rb"/H \[(\d+) (\d+)\]", lin).groups()]
+    return values
+
+
+def _hint_tables(pdf, hint_at):
+    """The page offset and shared object hint tables of the hint stream at
+    ``hint_at``: a list of per-page dicts and a list of group lengths."""
+    header = pdf[hint_at:pdf.index(b"stream\n", hint_at)]
+    length = int(re.search(rb"/Length (\d+)", header).group(1))
+    shared_at = int(re.search(rb"/S (\d+)", header).group(1))
+    start = hint_at + len(header) + len(b"stream\n")
+    data = pdf[start:start + length]
+
+    (
+        least_objs,
+        first_page_at,
+        objs_bits,
+        least_len,
+        len_bits,
+        least_coff,
+        coff_bits,
+        least_clen,
+        clen_bits,
+        nshared_bits,
+        id_bits,
+        numerator_bits,
+        _,
+    ) = struct.unpack_from(">IIHIHIHIHHHHH", data)
+    num_pages = _linearization(pdf)["N"]
+    bits = BitReader(data[struct.calcsize(">IIHIHIHIHHHHH"):shared_at])
+    objs = [least_objs + v for v in bits.items(num_pages, objs_bits)]
+    lens = [least_len + v for v in bits.items(num_pages, len_bits)]
+    nshared = bits.items(num_pages, nshared_bits)
+    ids = bits.items(sum(nshared), id_bits)
+    bits.items(sum(nshared), numerator_bits)
+    coffs = [least_coff + v for v in bits.items(num_pages, coff_bits)]
+    clens = [least_clen + v for v in bits.items(num_pages, clen_bits)]
+    pages = []
+    at = first_page_at
+    for i in range(num_pages):
+        pages.append(
+            {
+                "at": at,
+                "objects": objs[i],
+                "length": lens[i],
+                "shared": ids[sum(nshared[:i]):sum(nshared[:i + 1])],
+                "content_at": at + coffs[i],
+                "content_length": clens[i],
+            }
+        )
+        at += lens[i]
+
+    (
+        first_shared,
+        shared_section_at,
+        first_page_groups,
+        groups,
+        _,
+        least_group,
+        group_bits,
+    ) = struct.unpack_from(">IIIIHIH", data, shared_at)
+    assert (first_shared, shared_section_at) == (0, 0)
+    assert first_page_groups == groups
+    bits = BitReader(data[shared_at + struct.calcsize(">IIIIHIH"):])
+    group_lengths = [least_group + v for v in bits.items(groups, group_bits)]
+    assert bits.items(groups, 1) == [0] * groups
+    return pages, group_lengths
+
+
+def _object_at(pdf, at):
+    """(number, body) of the object whose header is at ``at``."""
+    header = _OBJ_RE.match(pdf, at)
+    assert header, f"no object at {at}"
+    end = pdf.index(b"endobj\n", at) + len(b"endobj\n")
+    return int(header.group(1)), pdf[header.end():end]
+
+
+@pytest.fixture
+def linearized(stub_signer, case):
+    return bytes(
+        generate._build_single(
+            case("signed_verified"),
+            scale=generate.parse_scale(f"pages={PAGES}"),
+            layout=LAYOUT,
+        )
+    )
+
+
+def test_linearization_dict(linearized):
+    pdf = linearized
+    lin = _linearization(pdf)
+    assert lin["L"] == len(pdf)
+    assert lin["N"] == PAGES == pdf.count(b"<< /Type /Page ")
+    hint_at, hint_len = lin["H"]
+    num, _ = _object_at(pdf, hint_at)
+    assert pdf[hint_at:hint_at + hint_len].endswith(b"endstream\nendobj\n")
+    _, page = _object_at(pdf, inspect_pdf._xref_sections(pdf)[0][2][lin["O"]])
+    assert page.startswith(b"<< /Type /Page ")
+    # /E is where the first page's section ends: the next page starts.
+    _, after = _object_at(pdf, lin["E"])
+    assert after.startswith(b"<< /Type /Page ")
+    # /T is the white-space before the first entry of the main xref table.
+    assert pdf[lin["T"]:lin["T"] + 21] == b"\n0000000000 65535 f \n"
+
+
+def test_hint_tables(linearized):
+    pdf = linearized
+    lin = _linearization(pdf)
+    hint_at, hint_len = lin["H"]
+    pages, group_lengths = _hint_tables(pdf, hint_at)
+
+    def actual(offset):
+        # Hint table offsets leave the hint stream out.
+        return offset + hint_len if offset >= hint_at else offset
+
+    assert len(pages) == PAGES
+    font = None
+    for index, page in enumerate(pages):
+        num, body = _object_at(pdf, actual(page["at"]))
+        assert body.startswith(b"<< /Type /Page ")
+        if index == 0:
+            assert num == lin["O"]
+            assert actual(page["at"] + page["length"]) == lin["E"]
+        contents = int(re.search(rb"/Contents (\d+) 0 R", body).group(1))
+        content_at = actual(page["content_at"])
+        content_num, content = _object_at(pdf, content_at)
+        assert content_num == contents
+        assert content.endswith(b"endstream\nendobj\n")
+        assert len(_OBJ_RE.match(pdf, content_at).group()) + len(content) == (
+            page["content_length"]
+        )
+        page_font = int(re.search(rb"/F1 (\d+) 0 R", body).group(1))
+        font = font or page_font
+        assert page_font == font
+        if index == 0:
+            # Page, content stream, both images and the font.
+            assert page["objects"] == 5
+            assert page["shared"] == []
+        else:
+            assert page["objects"] == 2
+            assert page["shared"] == [len(group_lengths) - 1]
+            assert page["length"] == page["content_at"] - page["at"] + (
+                page["content_length"]
+            )
+
+    # The shared groups are the first page's objects, the font last.
+    assert sum(group_lengths) == pages[0]["length"]
+    at = actual(pages[0]["at"])
+    for length in group_lengths:
+        num, body = _object_at(pdf, at)
+        at += length
+    assert num == font
+    assert b"/Type /Font" in body
+    assert at == lin["E"]
+
+
+def test_signed_chain(tmp_path, stub_signer):
+    pdf = generate._build_revision_chain(
+        3, scale=generate.parse_scale(f"pages={PAGES}"), layout=LAYOUT
+    )
+    path = tmp_path / "chain.pdf"
+    path.write_bytes(pdf)
+    _, _, signatures = verify._verify_pdf((str(path), path.name, 0, len(pdf)))
+    entries = generate._signature_entries(pdf)
+    assert [s["sha256"] for s in signatures] == [e["sha256"] for e in entries]
+    assert [s["covers_whole_document"] for s in signatures] == [False, False, True]
+
+    result = inspect_pdf._inspect_pdf(path)
+    assert "error" not in result
+    # The first-page and main sections are one revision.
+    assert result["revisions"] == 3
+    assert result["xref"] == ["table"] * 4
+    assert [s["revision"] for s in result["signatures"]] == [1, 2, 3]
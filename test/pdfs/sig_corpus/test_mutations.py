@@ -0,0 +1,169 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import collections
+import itertools
+import re
+
+import pytest
+
+import generate
+import inspect_pdf
+import mutations
+import resign
+
+# Mutants checked per base; enough to draw every kind many times over.
+COUNT = 240
+
+_NUMBER_RE = re.compile(rb"[+-]?(\d+\.?\d*|\.\d+)")
+_NAME_ESCAPE_RE = re.compile(rb"#([0-9A-Fa-f]{2})")
+
+
+def _object(pdf, value):
+    """The value of the object ``value`` refers to, or None if it cannot
+    be read (pdf.js then gets null)."""
+    ref = inspect_pdf._ref(value)
+    if ref is None:
+        return value
+    try:
+        xref = {}
+        for _, _, entries, _ in reversed(inspect_pdf._xref_sections(pdf)):
+            xref.update(entries)
+        return resign._read_object(pdf, xref, ref[0])[1]
+    except ValueError:
+        return None
+
+
+def _byte_range(value):
+    """The /ByteRange ``value`` as integers, or None where pdf.js's
+    checks on its shape fail: an array of 4 non-negative integers, where
+    integral reals count as integers and references do not."""
+    if not value.startswith(b"["):
+        return None
+    items = []
+    pos = 1
+    while True:
+        pos = inspect_pdf._WHITESPACE_RE.match(value, pos).end()
+        if value[pos:pos + 1] == b"]":
+            break
+        end = inspect_pdf._value_end(value, pos)
+        items.append(value[pos:end])
+        pos = end
+    if len(items) != 4:
+        return None
+    numbers = []
+    for item in items:
+        if not _NUMBER_RE.fullmatch(item):
+            return None
+        number = float(item)
+        if not number.is_integer() or number < 0:
+            return None
+        numbers.append(int(number))
+    return numbers
+
+
+def _contents_string(value):
+    """Whether the /Contents ``value`` is a non-empty string."""
+    if value is None:
+        return False
+    if value.startswith(b"<") and not value.startswith(b"<<"):
+        return bool(re.sub(rb"\s", b"", value[1:-1]))
+    return value.startswith(b"(") and len(value) > 2
+
+
+def _sub_filter(value):
+    """The name pdf.js reports for the /SubFilter ``value``, if a name."""
+    if value is None or not value.startswith(b"/"):
+        return None
+    name = _NAME_ESCAPE_RE.sub(lambda m: bytes.fromhex(m.group(1).decode()), value[1:])
+    return name.decode("latin-1")
+
+
+def _parse_signature_dict(pdf, dict_at):
+    """What PDFDocument.#parseSignatureDict (src/core/document.js) makes
+    of the /Sig dict at ``dict_at``: None if it rejects it, or else its
+    (subFilter, signatureType)."""
+    try:
+        end = inspect_pdf._dict_end(pdf, dict_at)
+        entries = {
+            key: pdf[dict_at:end][start:stop]
+            for key, (start, stop) in inspect_pdf._dict_entries(
+                pdf[dict_at:end]
+            ).items()
+        }
+    except ValueError:
+        return None
+    byte_range = entries.get(b"ByteRange")
+    byte_range = byte_range and _byte_range(_object(pdf, byte_range))
+    if byte_range is None:
+        return None
+    a, b, c, d = byte_range
+    if a != 0 or b <= 0 or a + b > c or c + d > len(pdf) or not pdf:
+        return None
+    contents = entries.get(b"Contents")
+    if contents is None or not _contents_string(_object(pdf, contents)):
+        return None
+    sub_filter = _sub_filter(entries.get(b"SubFilter"))
+    signature_type = {"adbe.pkcs7.detached": 0, "adbe.pkcs7.sha1": 1}.get(
+        sub_filter
+    )
+    return sub_filter, signature_type
+
+
+@pytest.fixture(params=["classic", "xref_streams"])
+def base(request, stub_signer, case):
+    layout = {"xref_streams": request.param == "xref_streams"}
+    return bytes(generate._build_single(case("signed_verified"), layout=layout))
+
+
+def test_outcomes_match_parse_signature_dict(base):
+    mutator = mutations.SigMutator(base, seed=7)
+    dict_at = base.rindex(b"<<", 0, mutator.sub_filter[0])
+    assert _parse_signature_dict(base, dict_at) == ("adbe.pkcs7.detached", 0)
+    kinds = collections.Counter()
+    for kind, detail, outcome, extra, pdf in itertools.islice(mutator, COUNT):
+        kinds[kind] += 1
+        parsed = _parse_signature_dict(bytes(pdf), dict_at)
+        assert outcome == ("reject" if parsed is None else "accept"), (kind, detail)
+        if extra:
+            assert (extra["sub_filter"], extra["signature_type"]) == parsed, detail
+        if outcome == "accept":
+            # Tokens are swapped at the same width, so nothing moved.
+            assert len(pdf) == len(base)
+    assert set(kinds) == {kind for kind, _ in mutator.kinds}
+
+
+def test_seeded(base):
+    def first(seed):
+        mutator = mutations.SigMutator(base, seed)
+        return [
+            (kind, detail, bytes(pdf))
+            for kind, detail, _, _, pdf in itertools.islice(mutator, 40)
+        ]
+
+    assert first(3) == first(3)
+    assert first(3) != first(4)
+
+
+def test_written_entries(base, tmp_path):
+    sink = generate.DirectorySink(tmp_path)
+    mutator = mutations.SigMutator(base, seed=1)
+    entries = mutations._write_mutations("signed_verified", mutator, 1, 30, sink)
+    for index, entry in enumerate(entries):
+        assert entry["file"] == f"mutant_{index:05d}_{entry['mutation']}.pdf"
+        assert entry["size"] == (tmp_path / entry["file"]).stat().st_size
+        assert entry["expected_signatures"] == (entry["outcome"] == "accept")
+        assert entry["seed"] == 1
+
+
+def test_base_needs_one_signature(stub_signer):
+    pdf = generate._build_chain(
+        "two", [generate.SPEC_VERIFIED, generate.SPEC_VERIFIED]
+    )
+    with pytest.raises(ValueError, match="exactly one /Sig dict"):
+        mutations.SigMutator(pdf)
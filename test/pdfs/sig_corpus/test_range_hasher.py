@@ -0,0 +1,66 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import hashlib
+
+import pytest
+
+import generate
+
+DEPTH = 8
+
+
+@pytest.fixture
+def chain(stub_signer):
+    pdf = generate._build_revision_chain(DEPTH, scale=generate.parse_scale("pages=20"))
+    return pdf, generate._find_byte_ranges(pdf)
+
+
+def _sha256(pdf, byte_range):
+    a, b, c, d = byte_range
+    return hashlib.sha256(pdf[a:a + b] + pdf[c:c + d]).hexdigest()
+
+
+def test_resumed_digests(chain):
+    pdf, byte_ranges = chain
+    assert len(byte_ranges) == DEPTH
+    hasher = generate.RangeHasher()
+    for byte_range in byte_ranges:
+        assert hasher.hexdigest(pdf, byte_range) == _sha256(pdf, byte_range)
+    # Each byte of the file is hashed about twice, not once per revision.
+    assert hasher.hashed < 2 * len(pdf)
+    assert hasher.hashed < sum(b + d for _, b, _, d in byte_ranges) / 3
+
+
+def test_signed_digests(chain, stub_signer):
+    # The chain was signed with resumed digests too.
+    pdf, byte_ranges = chain
+    signed = [generate._spec_digests(spec)[0]["sha256"] for spec in stub_signer.specs]
+    # The first spec is pkcs7_len's dry run.
+    assert [digest.hex() for digest in signed[1:]] == [
+        _sha256(pdf, byte_range) for byte_range in byte_ranges
+    ]
+
+
+def test_other_shapes(chain):
+    pdf, byte_ranges = chain
+    first, second, third = byte_ranges[:3]
+    a, b, c, d = first
+    shapes = [
+        second,
+        # Behind the checkpoint: hashed from scratch.
+        first,
+        # Not from the start of the file.
+        [1, b - 1, c, d],
+        # The checkpoint is still good for later ranges.
+        third,
+    ]
+    hasher = generate.RangeHasher()
+    for byte_range in shapes:
+        assert hasher.hexdigest(pdf, byte_range) == _sha256(pdf, byte_range)
+    assert hasher.hexdigest(pdf, third) == generate._digest_byte_range(pdf, third)
@@ -0,0 +1,158 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import hashlib
+import re
+
+import pytest
+
+import generate
+import inspect_pdf
+import resign
+import verify
+
+# Layout options of the signed source, and the kind of xref section the
+# update then has.
+MODES = {
+    "classic": ({}, "table"),
+    "linearized": ({"linearized": True}, "table"),
+    "xref_streams": ({"xref_streams": True}, "stream"),
+}
+
+
+def _pdf(objects, trailer):
+    """A one-revision PDF with an xref table, of the (num, body) of
+    ``objects`` (numbered from 1, in order) and the ``trailer`` entries."""
+    pdf = bytearray(b"%PDF-1.7\n")
+    offsets = []
+    for num, body in objects:
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref_at = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d %s >>\n" % (len(objects) + 1, trailer)
+    pdf += b"startxref\n%d\n%%%%EOF\n" % xref_at
+    return bytes(pdf)
+
+
+def _resign(tmp_path, monkeypatch, pdf):
+    monkeypatch.setattr(generate, "SPOOL_DIR", tmp_path)
+    source = tmp_path / "source.pdf"
+    source.write_bytes(pdf)
+    out = bytes(
+        resign._build_resigned(str(source), hashlib.sha256(pdf).hexdigest())
+    )
+    path = tmp_path / "resigned.pdf"
+    path.write_bytes(out)
+    return path, out
+
+
+def _verify(path, pdf):
+    _, _, signatures = verify._verify_pdf((str(path), path.name, 0, len(pdf)))
+    return signatures
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_resign(tmp_path, monkeypatch, stub_signer, case, mode):
+    layout, kind = MODES[mode]
+    pdf = bytes(generate._build_single(case("signed_verified"), layout=layout))
+    path, out = _resign(tmp_path, monkeypatch, pdf)
+    # The original bytes are untouched, so its signature still holds.
+    assert out.startswith(pdf)
+    before = generate._signature_entries(pdf)
+    after = generate._signature_entries(out)
+    assert len(after) == 2
+    assert after[0]["sha256"] == before[0]["sha256"]
+    assert not after[0]["covers_whole_document"]
+    assert after[1]["covers_whole_document"]
+    assert [s["sha256"] for s in _verify(path, out)] == [
+        e["sha256"] for e in after
+    ]
+
+    result = inspect_pdf._inspect_pdf(path)
+    assert "error" not in result
+    assert result["revisions"] == 2
+    assert result["xref"][-1] == kind
+    assert [s["revision"] for s in result["signatures"]] == [1, 2]
+    # The new field is listed next to the old one.
+    _, _, _, _, objects, _ = resign._resign_plan(out)
+    acro_form = b"".join(body for _, body in objects)
+    field = result["signatures"][1]["object"] - 1
+    assert re.search(rb"/Fields \[[^\]]*\b%d 0 R" % field, acro_form)
+
+
+@pytest.mark.parametrize(
+    "catalog, extra, field, rewritten",
+    [
+        # No /AcroForm: one is added.
+        (b"<< /Type /Catalog /Pages 2 0 R >>", [], 3, [1]),
+        # An inline /AcroForm without /Fields.
+        (
+            b"<< /Type /Catalog /Pages 2 0 R /AcroForm << /DA (/Helv 0 Tf) >> >>",
+            [],
+            3,
+            [1],
+        ),
+        # /AcroForm and /Fields are objects of their own.
+        (
+            b"<< /Type /Catalog /Pages 2 0 R /AcroForm 3 0 R >>",
+            [b"<< /Fields 4 0 R >>", b"[]"],
+            5,
+            [4, 3],
+        ),
+    ],
+)
+def test_add_field(
+    tmp_path, monkeypatch, stub_signer, catalog, extra, field, rewritten
+):
+    objects = [(1, catalog), (2, b"<< /Type /Pages /Kids [] /Count 0 >>")]
+    objects += [(3 + i, body) for i, body in enumerate(extra)]
+    pdf = _pdf(objects, b"/Root 1 0 R /Info 2 0 R /ID [<00> <01>]")
+    path, out = _resign(tmp_path, monkeypatch, pdf)
+    assert out.startswith(pdf)
+    update = out[len(pdf):]
+    assert re.search(rb"\[\s*%d 0 R\]" % field, update)
+    assert b"/SigFlags 3" in update
+    # Only the objects holding the /Fields array are written again.
+    assert [
+        int(num) for num in re.findall(rb"\n(\d+) 0 obj\n", update)
+    ] == [field, field + 1, *rewritten]
+    # The trailer keeps /Info and /ID.
+    assert re.search(rb"/Info 2 0 R /ID \[<00> <01>\]", update)
+    [signature] = _verify(path, out)
+    assert signature["covers_whole_document"]
+
+
+def test_resign_jobs(tmp_path, stub_signer, case, capsys):
+    signed = bytes(generate._build_single(case("signed_verified")))
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a/doc.pdf").write_bytes(signed)
+    (tmp_path / "b/doc.pdf").write_bytes(signed)
+    unsigned = _pdf([(1, b"<< /Type /Catalog >>")], b"/Root 1 0 R")
+    (tmp_path / "unsigned.pdf").write_bytes(unsigned)
+    encrypted = _pdf([(1, b"<< /Type /Catalog >>")], b"/Root 1 0 R /Encrypt 1 0 R")
+    (tmp_path / "encrypted.pdf").write_bytes(encrypted)
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.7\n")
+
+    jobs = list(resign._resign_jobs([tmp_path]))
+    assert [(name, meta["expected_signatures"]) for name, _, _, meta in jobs] == [
+        ("resigned_doc", 2),
+        ("resigned_doc_2", 2),
+        ("resigned_unsigned", 1),
+    ]
+    err = capsys.readouterr().err
+    assert f"skipped {tmp_path / 'encrypted.pdf'}: encrypted" in err
+    assert f"skipped {tmp_path / 'broken.pdf'}: no startxref" in err
+
+
+def test_resign_pycms(tmp_path, monkeypatch, pycms_signer, case):
+    pdf = bytes(generate._build_single(case("signed_verified")))
+    path, out = _resign(tmp_path, monkeypatch, pdf)
+    assert [s["cms"] for s in _verify(path, out)] == ["match", "match"]
@@ -0,0 +1,162 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import hashlib
+
+import pytest
+
+import generate
+
+# A deterministic RSA key made of two Mersenne primes; far too weak for
+# anything but checking the arithmetic.
+P = 2**521 - 1
+Q = 2**607 - 1
+E = 65537
+KEY = {
+    "n": P * Q,
+    "e": E,
+    "d": pow(E, -1, (P - 1) * (Q - 1)),
+    "p": P,
+    "q": Q,
+}
+KEY_LEN = (KEY["n"].bit_length() + 7) // 8
+
+SHA1_OID = bytes.fromhex("2b0e03021a")
+SHA256_OID = bytes.fromhex("608648016503040201")
+SIGNED_DATA_OID = bytes.fromhex("2a864886f70d010702")
+CONTENT_TYPE_OID = bytes.fromhex("2a864886f70d010903")
+RSA_OID = bytes.fromhex("2a864886f70d010101")
+
+
+def _der(tag, *contents):
+    body = b"".join(contents)
+    if len(body) < 0x80:
+        length = bytes([len(body)])
+    else:
+        size = (len(body).bit_length() + 7) // 8
+        length = bytes([0x80 | size]) + len(body).to_bytes(size, "big")
+    return bytes([tag]) + length + body
+
+
+def _signer_info(digest_oid, digest_len):
+    """A SignerInfo with a zero messageDigest and signature."""
+    algorithm = _der(0x30, _der(0x06, digest_oid), _der(0x05))
+    attrs = _der(
+        0xA0,
+        _der(
+            0x30,
+            _der(0x06, CONTENT_TYPE_OID),
+            _der(0x31, _der(0x06, bytes.fromhex("2a864886f70d010701"))),
+        ),
+        _der(
+            0x30,
+            _der(0x06, generate._MESSAGE_DIGEST_OID),
+            _der(0x31, _der(0x04, bytes(digest_len))),
+        ),
+    )
+    return _der(
+        0x30,
+        _der(0x02, b"\x01"),
+        _der(0x30, _der(0x30), _der(0x02, b"\x01")),
+        algorithm,
+        attrs,
+        _der(0x30, _der(0x06, RSA_OID), _der(0x05)),
+        _der(0x04, bytes(KEY_LEN)),
+    )
+
+
+def _signed_data(*signer_infos):
+    """A SignedData shaped like pycms's, without certificates."""
+    return _der(
+        0x30,
+        _der(0x06, SIGNED_DATA_OID),
+        _der(
+            0xA0,
+            _der(
+                0x30,
+                _der(0x02, b"\x01"),
+                _der(0x31),
+                _der(0x30, _der(0x06, bytes.fromhex("2a864886f70d010701"))),
+                _der(0x31, *signer_infos),
+            ),
+        ),
+    )
+
+
+def _verify_rsa(signature, digest_info):
+    """Whether ``signature`` is KEY's PKCS#1 v1.5 signature of
+    ``digest_info``."""
+    m = pow(int.from_bytes(signature, "big"), KEY["e"], KEY["n"])
+    padded = m.to_bytes(KEY_LEN, "big")
+    return padded == (
+        b"\x00\x01"
+        + b"\xff" * (KEY_LEN - len(digest_info) - 3)
+        + b"\x00"
+        + digest_info
+    )
+
+
+def test_rsa_sign():
+    digest_info = generate._DIGEST_ALGORITHMS[SHA256_OID][1] + bytes(range(32))
+    signature = generate._rsa_sign(KEY, digest_info)
+    assert len(signature) == KEY_LEN
+    assert _verify_rsa(signature, digest_info)
+    # The CRT shortcut gives the same signature as the plain exponent.
+    plain = {k: v for k, v in KEY.items() if k not in ("p", "q")}
+    assert generate._rsa_sign(plain, digest_info) == signature
+
+
+def test_cms_template():
+    der = _signed_data(_signer_info(SHA1_OID, 20), _signer_info(SHA256_OID, 32))
+    template = generate.CmsTemplate(der)
+    assert [info[0] for info in template.signer_infos] == ["sha1", "sha256"]
+    digests = {
+        "sha1": hashlib.sha1(b"signed").digest(),
+        "sha256": hashlib.sha256(b"signed").digest(),
+    }
+    signed = template.sign(digests, KEY)
+    assert len(signed) == len(der)
+    # Only the digests and the signatures changed.
+    assert generate.CmsTemplate(signed).signer_infos == template.signer_infos
+    for name, prefix, digest_at, attrs_at, attrs_len, signature_at, _ in (
+        template.signer_infos
+    ):
+        assert signed[digest_at:digest_at + len(digests[name])] == digests[name]
+        attrs = b"\x31" + signed[attrs_at + 1:attrs_at + attrs_len]
+        signature = signed[signature_at:signature_at + KEY_LEN]
+        assert _verify_rsa(signature, prefix + hashlib.new(name, attrs).digest())
+
+
+def test_cms_template_rejects():
+    md5_oid = bytes.fromhex("2a864886f70d0205")
+    with pytest.raises(ValueError, match="unsupported digest algorithm"):
+        generate.CmsTemplate(_signed_data(_signer_info(md5_oid, 16)))
+    template = generate.CmsTemplate(_signed_data(_signer_info(SHA256_OID, 32)))
+    small = {"n": 2**512 - 569, "e": 3, "d": 1}
+    with pytest.raises(ValueError, match="does not match"):
+        template.sign({"sha256": bytes(32)}, small)
+
+
+def test_spec_digests():
+    spec = generate.SPEC_VERIFIED.format(sha256="ab" * 32)
+    digests, template = generate._spec_digests(spec)
+    assert digests == {"sha256": bytes([0xAB] * 32)}
+    assert template.format(sha256="ab" * 32) == spec
+
+
+def test_standalone_signer(tmp_path, monkeypatch, pycms_signer):
+    material = tmp_path / "signer_material.json"
+    count = generate.export_signer_material(material, generate._spec_templates())
+    assert count == len(generate._spec_templates())
+    monkeypatch.setattr(generate, "SIGNER_MATERIAL", material)
+    standalone = generate.StandaloneSigner()
+    assert standalone.identity() == pycms_signer.identity()
+    digest = hashlib.sha256(b"not the reference digest").hexdigest()
+    for spec_template in generate._spec_templates():
+        spec = spec_template.format(sha256=digest)
+        assert standalone.sign(spec) == pycms_signer.sign(spec)
@@ -0,0 +1,81 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import argparse
+
+import pytest
+
+import generate
+import verify
+
+CHUNK = generate._TAIL_SCAN_CHUNK
+SIGNED = b"%PDF-1.7\n...signed bytes...\n"
+
+
+@pytest.mark.parametrize("byte", list(generate.TAIL_WHITESPACE))
+def test_whitespace(byte):
+    data = SIGNED + bytes([byte]) * 100
+    assert generate._covers_whole_document(data, len(SIGNED))
+
+
+# Vertical tab and NEL are whitespace elsewhere, but not to pdf.js.
+@pytest.mark.parametrize("byte", [*generate.TAIL_GARBAGE, 0x0B, 0x85, 0x25])
+def test_other_bytes(byte):
+    data = SIGNED + b" " * 10 + bytes([byte]) + b" " * 10
+    assert not generate._covers_whole_document(data, len(SIGNED))
+
+
+def test_empty_tail():
+    assert generate._covers_whole_document(SIGNED, len(SIGNED))
+
+
+@pytest.mark.parametrize("at", [0, CHUNK - 1, CHUNK, 2 * CHUNK + 4])
+def test_garbage_across_chunks(at):
+    data = bytearray(SIGNED + b"\r\n" * CHUNK + b"\n" * 5)
+    data[len(SIGNED) + at] = generate.TAIL_GARBAGE[0]
+    assert not generate._covers_whole_document(data, len(SIGNED))
+    # Only bytes before ``end`` count.
+    assert generate._covers_whole_document(data, len(SIGNED), len(SIGNED) + at)
+
+
+@pytest.mark.parametrize(
+    "tail",
+    [
+        "whitespace-mb=1.5",
+        "whitespace-mb=1.5,garbage-at=1048576",
+        "whitespace-mb=0.1,garbage-at=0",
+        "updates=2",
+        "updates=1,whitespace-mb=0.1",
+    ],
+)
+def test_build_tail(tmp_path, stub_signer, tail):
+    params = generate.parse_tail(tail)
+    pdf = generate._build_tail(params)
+    [entry] = generate._signature_entries(pdf)
+    covers = generate._tail_covers_whole_document(params)
+    assert entry["covers_whole_document"] == covers
+    signed_end = entry["byte_range"][2] + entry["byte_range"][3]
+    whitespace = generate._tail_whitespace(params)
+    if params["updates"]:
+        assert pdf.count(b"startxref") == 1 + params["updates"]
+    else:
+        assert len(pdf) == signed_end + whitespace
+
+    path = tmp_path / "tail.pdf"
+    path.write_bytes(pdf)
+    _, _, [signature] = verify._verify_pdf((str(path), path.name, 0, len(pdf)))
+    assert signature["covers_whole_document"] == covers
+    assert signature["sha256"] == entry["sha256"]
+
+
+@pytest.mark.parametrize(
+    "tail", ["garbage-at=0", "whitespace-mb=1,garbage-at=1048576", "updates=-1", "x=1"]
+)
+def test_parse_tail_errors(tail):
+    with pytest.raises(argparse.ArgumentTypeError):
+        generate.parse_tail(tail)
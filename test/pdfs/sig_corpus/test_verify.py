@@ -0,0 +1,90 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import hashlib
+
+import pytest
+
+import generate
+import verify
+
+
+def _verify(tmp_path, pdf):
+    path = tmp_path / "test.pdf"
+    path.write_bytes(pdf)
+    _, _, signatures = verify._verify_pdf((str(path), path.name, 0, len(pdf)))
+    return signatures
+
+
+def _with_byte_range(pdf, byte_range):
+    """``pdf`` with its only /ByteRange replaced, at the same width."""
+    pdf = bytearray(pdf)
+    at = pdf.index(b"/ByteRange [") + len(b"/ByteRange [")
+    width = len(generate.BYTE_RANGE_PLACEHOLDER)
+    pdf[at:at + width] = b"%010d %010d %010d %010d" % tuple(byte_range)
+    return pdf
+
+
+def test_unsigned_placeholder(tmp_path, case):
+    pdf = generate._build_single(case("signed_unknown"))
+    [signature] = _verify(tmp_path, pdf)
+    assert signature["byte_range"] == generate._find_byte_ranges(pdf)[0]
+    assert signature["cms"] == "none"
+    assert signature["covers_whole_document"]
+
+
+def test_contiguous_byte_range(tmp_path, case):
+    # pdf.js accepts spans that touch (a + b == c): the signed bytes are
+    # the whole file and there is no /Contents gap left to parse.
+    pdf = generate._build_single(case("signed_unknown"))
+    _, b, _, _ = generate._find_byte_ranges(pdf)[0]
+    pdf = _with_byte_range(pdf, [0, b, b, len(pdf) - b])
+    [signature] = _verify(tmp_path, pdf)
+    assert signature["byte_range"] == [0, b, b, len(pdf) - b]
+    assert signature["cms"] == "none"
+    assert signature["sha256"] == hashlib.sha256(pdf).hexdigest()
+    assert signature["covers_whole_document"]
+
+
+@pytest.mark.parametrize(
+    "shape",
+    ["offset", "empty first span", "overlapping spans", "past the end"],
+)
+def test_byte_range_out_of_bounds(tmp_path, case, shape):
+    pdf = generate._build_single(case("signed_unknown"))
+    a, b, c, d = generate._find_byte_ranges(pdf)[0]
+    byte_range = {
+        "offset": [1, b - 1, c, d],
+        "empty first span": [0, 0, c, d],
+        "overlapping spans": [0, b, b - 1, d + 1],
+        "past the end": [0, b, c, d + 1],
+    }[shape]
+    [signature] = _verify(tmp_path, _with_byte_range(pdf, byte_range))
+    assert signature["cms"] == "malformed"
+    assert "sha256" not in signature
+
+
+def test_signed_spans(tmp_path, stub_signer, case):
+    pdf = generate._build_single(case("signed_verified"))
+    [signature] = _verify(tmp_path, pdf)
+    [entry] = generate._signature_entries(pdf)
+    assert signature["byte_range"] == entry["byte_range"]
+    assert signature["sha256"] == entry["sha256"]
+    # The stub's output is not a SignedData.
+    assert signature["cms"] == "malformed"
+    assert not verify._verify_problems(
+        {"signatures": [{**entry, "expected_status": None}]}, [signature]
+    )
+
+
+def test_signed_pycms(tmp_path, pycms_signer, case):
+    for name in ("signed_verified", "signed_invalid"):
+        pdf = generate._build_single(case(name))
+        [signature] = _verify(tmp_path, pdf)
+        expected = verify._EXPECTED_CMS.get(case(name)["status"], "match")
+        assert signature["cms"] == expected
@@ -0,0 +1,160 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+import re
+import zlib
+
+import pytest
+
+import generate
+import inspect_pdf
+import verify
+
+DEPTH = 3
+# More objects than fit in one object stream.
+SCALE = "pages=3,objects=250"
+
+_OBJ_RE = re.compile(rb"(\d+) 0 obj\n")
+_STARTXREF_RE = re.compile(rb"startxref\n(\d+)\n%%EOF\n$")
+
+
+def _stream(pdf, at):
+    """(number, dict, decompressed data) of the stream object at ``at``."""
+    header = _OBJ_RE.match(pdf, at)
+    assert header, f"no object at {at}"
+    data_at = pdf.index(b"\nstream\n", at) + len(b"\nstream\n")
+    stream_dict = pdf[header.end():data_at]
+    length = int(re.search(rb"/Length (\d+)", stream_dict).group(1))
+    assert pdf[data_at + length:data_at + length + 10] == b"\nendstream"
+    data = pdf[data_at:data_at + length]
+    if b"/FlateDecode" in stream_dict:
+        data = zlib.decompress(data)
+    return int(header.group(1)), stream_dict, data
+
+
+def _ints(stream_dict, key):
+    match = re.search(rb"/%s \[([\d ]+)\]" % key, stream_dict)
+    return [int(v) for v in match.group(1).split()]
+
+
+def _xref_streams(pdf):
+    """Every xref stream from startxref back through /Prev, newest first,
+    as (offset, dict, {num: (type, field 2, field 3)})."""
+    sections = []
+    offset = int(_STARTXREF_RE.search(pdf).group(1))
+    while offset is not None:
+        _, xref_dict, data = _stream(pdf, offset)
+        assert b"/Type /XRef" in xref_dict
+        widths = _ints(xref_dict, b"W")
+        row_len = sum(widths)
+        index = _ints(xref_dict, b"Index")
+        nums = [
+            num
+            for first, count in zip(index[::2], index[1::2])
+            for num in range(first, first + count)
+        ]
+        assert len(data) == row_len * len(nums)
+        entries = {}
+        for i, num in enumerate(nums):
+            row = data[i * row_len:(i + 1) * row_len]
+            fields = []
+            for width in widths:
+                fields.append(int.from_bytes(row[:width], "big"))
+                row = row[width:]
+            entries[num] = tuple(fields)
+        sections.append((offset, xref_dict, entries))
+        prev = re.search(rb"/Prev (\d+)", xref_dict)
+        offset = prev and int(prev.group(1))
+    return sections
+
+
+def _object_stream(pdf, at):
+    """{index: (number, value)} of the object stream at ``at``."""
+    _, stream_dict, data = _stream(pdf, at)
+    assert b"/Type /ObjStm" in stream_dict
+    count = int(re.search(rb"/N (\d+)", stream_dict).group(1))
+    first = int(re.search(rb"/First (\d+)", stream_dict).group(1))
+    pairs = [int(v) for v in data[:first].split()]
+    assert len(pairs) == 2 * count
+    objects = {}
+    for index in range(count):
+        start = first + pairs[2 * index + 1]
+        end = inspect_pdf._value_end(data, start)
+        objects[index] = (pairs[2 * index], data[start:end])
+    return objects
+
+
+@pytest.fixture
+def chain(stub_signer):
+    return bytes(
+        generate._build_revision_chain(
+            DEPTH,
+            scale=generate.parse_scale(SCALE),
+            layout={"xref_streams": True},
+        )
+    )
+
+
+def test_xref_streams(chain):
+    pdf = chain
+    sections = _xref_streams(pdf)
+    assert len(sections) == DEPTH
+    assert b"\ntrailer\n" not in pdf
+    # Each update starts after the section it links to.
+    offsets = [offset for offset, _, _ in sections]
+    assert offsets == sorted(offsets, reverse=True)
+
+    merged = {}
+    for _, _, entries in reversed(sections):
+        merged.update(entries)
+    size = int(re.search(rb"/Size (\d+)", sections[0][1]).group(1))
+    assert max(merged) == size - 1
+
+    object_streams = {}
+    for num, (kind, field2, field3) in merged.items():
+        if kind == 1:
+            header = _OBJ_RE.match(pdf, field2)
+            assert header and int(header.group(1)) == num
+            assert field3 == 0
+        elif kind == 2:
+            if field2 not in object_streams:
+                assert merged[field2][0] == 1
+                object_streams[field2] = _object_stream(pdf, merged[field2][1])
+            obj_num, value = object_streams[field2][field3]
+            assert obj_num == num
+            # Neither streams nor /Sig dicts are compressed.
+            assert b"/Type /Sig" not in value
+            assert not value.startswith(b"<< /Length")
+        else:
+            assert kind == 0
+    assert len(object_streams) > DEPTH
+    sizes = [len(objects) for objects in object_streams.values()]
+    assert max(sizes) == generate.PdfWriter.OBJECT_STREAM_LEN
+
+    # Every /Sig dict is at an offset of its own.
+    sig_nums = {
+        int(match.group(1))
+        for match in re.finditer(rb"(\d+) 0 obj\n<< /Type /Sig ", pdf)
+    }
+    assert len(sig_nums) == DEPTH
+    assert all(merged[num][0] == 1 for num in sig_nums)
+
+
+def test_inspect_and_verify(tmp_path, chain):
+    path = tmp_path / "chain.pdf"
+    path.write_bytes(chain)
+    result = inspect_pdf._inspect_pdf(path)
+    assert "error" not in result
+    assert result["revisions"] == DEPTH
+    assert result["xref"] == ["stream"] * DEPTH
+    assert [s["revision"] for s in result["signatures"]] == list(range(1, DEPTH + 1))
+
+    _, _, signatures = verify._verify_pdf((str(path), path.name, 0, len(chain)))
+    entries = generate._signature_entries(chain)
+    assert [s["sha256"] for s in signatures] == [e["sha256"] for e in entries]
+    assert signatures[-1]["covers_whole_document"]
@@ -0,0 +1,277 @@
+# Copyright 2026 Mozilla Foundation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+"""``generate.py verify``: check a generated corpus without rebuilding it.
+
+Every /ByteRange of every PDF, in a directory or an uncompressed archive,
+is hashed in place in a read-only mapping and compared with the
+messageDigest of its PKCS#7 and with the manifest, if there is one.
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import mmap
+import struct
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+
+import generate
+
+
+# What _verify_pdf finds for each signature, by the status the manifest
+# expects for it: the tampered case must not match its messageDigest and
+# the unsupported one carries no PKCS#7 at all.
+_EXPECTED_CMS = {"invalid": "mismatch", "unknown": "none"}
+
+
+def _verify_units(path):
+    """(file to map, name, offset, size) of every PDF under ``path``: a
+    directory, a PDF, or an uncompressed tar or zip archive, whose members
+    are verified in place. Also returns the manifest found alongside, if
+    any, as {file name: entry}."""
+    path = Path(path)
+    manifest = None
+    units = []
+    if path.is_dir():
+        units = [
+            (str(pdf), pdf.name, 0, pdf.stat().st_size)
+            for pdf in sorted(path.glob("*.pdf"))
+        ]
+        manifest_path = path / "manifest.json"
+        if manifest_path.is_file():
+            manifest = manifest_path.read_bytes()
+    elif tarfile.is_tarfile(path):
+        # Members of a compressed tar have no offset in the file to map.
+        try:
+            tar = tarfile.open(path, "r:")
+        except tarfile.ReadError as ex:
+            raise SystemExit(f"{path}: not an uncompressed tar archive ({ex})")
+        with tar:
+            for member in tar:
+                if member.name == "manifest.json":
+                    manifest = tar.extractfile(member).read()
+                elif member.isfile() and member.name.endswith(".pdf"):
+                    units.append(
+                        (str(path), member.name, member.offset_data, member.size)
+                    )
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+            for info in archive.infolist():
+                if info.filename == "manifest.json":
+                    manifest = archive.read(info)
+                    continue
+                if not info.filename.endswith(".pdf"):
+                    continue
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise SystemExit(f"{path}: {info.filename} is compressed")
+                # The data follows the local file header, whose name and
+                # extra field lengths may differ from the central directory.
+                f.seek(info.header_offset + 26)
+                name_len, extra_len = struct.unpack("<HH", f.read(4))
+                offset = info.header_offset + 30 + name_len + extra_len
+                units.append((str(path), info.filename, offset, info.file_size))
+    else:
+        units = [(str(path), path.name, 0, path.stat().st_size)]
+        manifest_path = path.with_name("manifest.json")
+        if manifest_path.is_file():
+            manifest = manifest_path.read_bytes()
+    if manifest is not None:
+        manifest = {e["file"]: e for e in json.loads(manifest)["cases"]}
+    return units, manifest
+
+
+def _check_cms(der, digest):
+    """Compare the messageDigest of every SignerInfo in ``der`` with
+    ``digest(hash name)`` of the signed spans: "match", "mismatch", "none"
+    (no PKCS#7, only the zero-filled placeholder) or "malformed"."""
+    if not der.strip(b"\0"):
+        return "none"
+    try:
+        signer_infos = generate.CmsTemplate(der).signer_infos
+    except (ValueError, IndexError, StopIteration):
+        return "malformed"
+    if not signer_infos:
+        return "malformed"
+    for name, _, digest_at, *_ in signer_infos:
+        value = digest(name)
+        if der[digest_at:digest_at + len(value)] != value:
+            return "mismatch"
+    return "match"
+
+
+def _verify_pdf(unit):
+    """Check every signature of one PDF, hashing its /ByteRange spans in
+    place in a read-only mapping. Returns (name, size, signatures), each
+    signature a dict with its byte_range, sha256, covers_whole_document
+    and cms result (see _check_cms)."""
+    path, name, offset, size = unit
+    signatures = []
+    if size == 0:
+        return name, size, signatures
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = offset + size
+        byte_ranges = generate._find_byte_ranges(mm, offset, end)
+        view = memoryview(mm)[offset:end]
+        try:
+            for a, b, c, d in byte_ranges:
+                signature = {"byte_range": [a, b, c, d]}
+                signatures.append(signature)
+                # The bounds pdf.js's #parseSignatureDict accepts: the
+                # spans may touch, leaving no /Contents gap to parse.
+                if not (a == 0 and b > 0 and a + b <= c and c + d <= size):
+                    signature["cms"] = "malformed"
+                    continue
+                spans = (view[a:a + b], view[c:c + d])
+                digests = {}
+
+                def digest(name):
+                    # Each algorithm hashes the spans once.
+                    if name not in digests:
+                        h = hashlib.new(name)
+                        for span in spans:
+                            h.update(span)
+                        digests[name] = h.digest()
+                    return digests[name]
+
+                signature["sha256"] = digest("sha256").hex()
+                signature["covers_whole_document"] = (
+                    generate._covers_whole_document(mm, offset + c + d, end)
+                )
+                # The gap is the /Contents hex string, with or without its
+                # angle brackets (PdfWriter signs them).
+                gap = bytes(view[a + b:c]).removeprefix(b"<").removesuffix(b">")
+                try:
+                    der = bytes.fromhex(gap.decode("latin-1"))
+                except ValueError:
+                    signature["cms"] = "malformed"
+                else:
+                    signature["cms"] = _check_cms(der, digest)
+                for span in spans:
+                    span.release()
+        finally:
+            view.release()
+    return name, size, signatures
+
+
+def _verify_problems(entry, signatures):
+    """Differences between what _verify_pdf found and a manifest entry (or
+    None): every signature must match its messageDigest, unless the entry
+    expects otherwise, and the /ByteRange and digest must agree with the
+    entry's, as must whether it covers the whole document."""
+    expected = (entry or {}).get("signatures")
+    problems = []
+    if expected is not None and len(expected) != len(signatures):
+        problems.append(
+            f"{len(signatures)} signature(s), manifest lists {len(expected)}"
+        )
+        expected = None
+    for index, signature in enumerate(signatures):
+        cms = "match"
+        if expected:
+            want = expected[index]
+            if "expected_status" in want and want["expected_status"] is None:
+                # Already in a --resign input: not ours to check.
+                cms = None
+            else:
+                cms = _EXPECTED_CMS.get(want.get("expected_status"), "match")
+            if want["byte_range"] != signature["byte_range"]:
+                problems.append(f"signature {index + 1}: /ByteRange differs")
+            elif want["sha256"] != signature.get("sha256"):
+                problems.append(f"signature {index + 1}: signed bytes differ")
+            elif "covers_whole_document" in want and want[
+                "covers_whole_document"
+            ] != signature.get("covers_whole_document"):
+                problems.append(
+                    f"signature {index + 1}: coversWholeDocument is "
+                    f"{signature.get('covers_whole_document')}, expected "
+                    f"{want['covers_whole_document']}"
+                )
+        if cms is not None and signature["cms"] != cms:
+            problems.append(
+                f"signature {index + 1}: PKCS#7 {signature['cms']}, expected {cms}"
+            )
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="generate.py verify",
+        description=(
+            "Check that a generated corpus is consistent without rebuilding "
+            "it: every /ByteRange digest must match the messageDigest in "
+            "its PKCS#7 and the manifest, if there is one."
+        ),
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=Path,
+        default=[generate.CORPUS_DIR],
+        metavar="PATH",
+        help=(
+            "Corpus directories, PDFs, or uncompressed .tar or .zip "
+            "archives (default: this script's directory)."
+        ),
+    )
+    generate._add_jobs_argument(parser, "verify files")
+    args = parser.parse_args(argv)
+
+    units = []
+    manifests = {}
+    for path in args.paths:
+        path_units, manifest = _verify_units(path)
+        units += path_units
+        for unit in path_units:
+            manifests[unit] = manifest
+    if not units:
+        raise SystemExit("No PDFs to verify")
+
+    num_workers = generate._worker_count(args.jobs, len(units))
+    start = time.perf_counter()
+    if num_workers <= 1:
+        results = map(_verify_pdf, units)
+        pool = None
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+        results = pool.map(_verify_pdf, units, chunksize=max(1, len(units) // (num_workers * 8)))
+    total_bytes = 0
+    num_signatures = 0
+    skipped = 0
+    failed = 0
+    try:
+        for unit, (name, size, signatures) in zip(units, results):
+            total_bytes += size
+            manifest = manifests[unit]
+            entry = manifest.get(name) if manifest else None
+            if entry and "outcome" in entry:
+                # Mutants are malformed on purpose.
+                skipped += 1
+                continue
+            num_signatures += len(signatures)
+            problems = _verify_problems(entry, signatures)
+            if problems:
+                failed += 1
+                print(f"  FAIL {name}: " + "; ".join(problems))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - start
+    mb = total_bytes / (1024 * 1024)
+    print(
+        f"  verified {len(units) - skipped} file(s), {num_signatures} "
+        f"signature(s), {mb:.1f} MB in {elapsed:.2f} s "
+        f"({mb / elapsed if elapsed else 0:.1f} MB/s, {num_workers} worker(s))"
+    )
+    if skipped:
+        print(f"  skipped {skipped} mutant(s)")
+    if failed:
+        raise SystemExit(f"{failed} inconsistent file(s)")